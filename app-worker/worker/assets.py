@@ -0,0 +1,118 @@
+"""
+Caché de cortinillas (intro/outro) codificadas por perfil de salida.
+
+Cada perfil tiene su directorio `{assets_dir}/profiles/{perfil.key}/` con intro.mp4 y
+outro.mp4 codificados con los mismos parámetros que los clips (ffmpeg_pipeline.encode_args),
+de modo que la unión final siempre es una copia de flujos. Se generan una vez al arrancar
+el worker, en el proceso principal antes de crear el pool (worker_init); si faltan, la
+tarea las genera con `get`. Un lock de archivo evita que varios workers (o tareas) las
+codifiquen a la vez y la escritura es atómica (archivo temporal + os.replace).
+"""
+import fcntl
+import os
+import subprocess
+from typing import Iterable, Tuple
+
+import structlog
+
+from shared.config.settings import settings
+from worker.ffmpeg_pipeline import DEFAULT_PROFILE, OutputProfile, encode_args
+
+logger = structlog.get_logger()
+
+# Maestros opcionales (cualquier formato); sin ellos se usa un color sólido de 5 s
+MASTERS = {
+    "intro": ("anb_intro_5s.mp4", "blue"),
+    "outro": ("anb_outro_5s.mp4", "red"),
+}
+BUMPER_SECONDS = 5
+
+
+class AssetError(Exception):
+    """No se pudo preparar una cortinilla"""
+
+
+class AssetCache:
+    def __init__(self, assets_dir: str = settings.assets_dir):
+        self.assets_dir = assets_dir
+
+    def profile_dir(self, profile: OutputProfile) -> str:
+        return os.path.join(self.assets_dir, "profiles", profile.key)
+
+    def paths(self, profile: OutputProfile = DEFAULT_PROFILE) -> Tuple[str, str]:
+        directory = self.profile_dir(profile)
+        return os.path.join(directory, "intro.mp4"), os.path.join(directory, "outro.mp4")
+
+    def is_ready(self, profile: OutputProfile = DEFAULT_PROFILE) -> bool:
+        return all(os.path.exists(path) for path in self.paths(profile))
+
+    def get(self, profile: OutputProfile = DEFAULT_PROFILE) -> Tuple[str, str]:
+        """Rutas de intro/outro del perfil; solo codifica si aún no existen"""
+        if not self.is_ready(profile):
+            self.build(profile)
+        return self.paths(profile)
+
+    def build(self, profile: OutputProfile) -> None:
+        directory = self.profile_dir(profile)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, ".lock"), "w") as lock:
+            # Otro proceso puede haberlas creado mientras se esperaba el lock
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                for name, path in zip(("intro", "outro"), self.paths(profile)):
+                    if not os.path.exists(path):
+                        self._encode(name, path, profile)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _encode(self, name: str, path: str, profile: OutputProfile) -> None:
+        master, color = MASTERS[name]
+        master_path = os.path.join(self.assets_dir, master)
+        if os.path.exists(master_path):
+            inputs = ["-i", master_path]
+            graph = (
+                f"[0:v:0]scale={profile.width}:{profile.height}:force_original_aspect_ratio=decrease,"
+                f"pad={profile.width}:{profile.height}:(ow-iw)/2:(oh-ih)/2:color=black,setsar=1,"
+                f"fps={profile.fps},format={profile.pix_fmt}[v];"
+                f"[0:a:0]aresample={profile.audio_rate}[a]"
+            )
+            maps = ["-filter_complex", graph, "-map", "[v]", "-map", "[a]"]
+        else:
+            inputs = [
+                "-f", "lavfi", "-i",
+                f"color=c={color}:size={profile.width}x{profile.height}"
+                f":duration={BUMPER_SECONDS}:rate={profile.fps}",
+                "-f", "lavfi", "-i",
+                f"anullsrc=channel_layout={profile.channel_layout}:sample_rate={profile.audio_rate}",
+            ]
+            maps = ["-map", "0:v", "-map", "1:a"]
+
+        tmp_path = f"{path}.{os.getpid()}.tmp.mp4"
+        cmd = [
+            "ffmpeg", "-hide_banner", "-nostdin", "-y",
+            *inputs, *maps, *encode_args(profile),
+            "-t", str(BUMPER_SECONDS),
+            "-movflags", "+faststart",
+            tmp_path,
+        ]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            if result.returncode != 0:
+                raise AssetError(f"Error codificando {name}: {result.stderr[-2000:]}")
+            # Las tareas nunca ven un archivo a medio escribir
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        logger.info("Encoded intro/outro asset", asset=name, profile=profile.key, path=path)
+
+    def warm(self, profiles: Iterable[OutputProfile] = (DEFAULT_PROFILE,)) -> None:
+        for profile in profiles:
+            try:
+                self.build(profile)
+            except Exception as e:
+                # La tarea lo reintenta con `get`
+                logger.error("Could not warm intro/outro assets", profile=profile.key, error=str(e))
+
+
+asset_cache = AssetCache()
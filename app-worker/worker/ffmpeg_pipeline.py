@@ -0,0 +1,649 @@
+"""
+Comandos de ffmpeg del procesamiento de video.
+
+- `asset_concat`: el original se recorta a 30 s y se escala/rellena a 1280x720
+  en un solo decode/encode con los parámetros exactos del perfil de salida; luego se une por
+  copia de flujos (concat demuxer, -c copy) con las cortinillas ya codificadas en ese perfil
+  (ver worker.assets). Las cortinillas no se codifican en cada tarea.
+  Si el original ya cumple el perfil (H.264 1280x720, mismos fps), el video se copia sin
+  recodificar y se recorta en un keyframe (ver plan_streams).
+- `single_pass`: una sola invocación con filter graph que también recodifica las cortinillas.
+
+Con VIDEO_OUTPUT_MODE=stream el último ffmpeg escribe MP4 fragmentado en stdout y cada
+bloque se entrega al almacenamiento (partes S3 o archivo local) mientras se produce.
+"""
+import hashlib
+import json
+import os
+import queue
+import re
+import resource
+import subprocess
+import tempfile
+import threading
+from fractions import Fraction
+from typing import List, NamedTuple, Optional
+
+import structlog
+
+from shared.config.settings import settings
+from shared.metrics.metrics import (
+    ffmpeg_cpu_seconds,
+    transcode_cpu_seconds_saved,
+    video_clip_modes,
+)
+
+logger = structlog.get_logger()
+
+# Duración máxima del video del jugador (sin cortinillas)
+MAX_DURATION_SECONDS = 30
+
+# Salida por stdout (MP4 fragmentado: no requiere seek para escribir el moov)
+PIPE_OUTPUT = "pipe:1"
+# Bloques leídos de ffmpeg pendientes de entregar: acota la memoria si el destino es lento
+STREAM_QUEUE_CHUNKS = 16
+# Perfil AAC que produce el codificador aac de ffmpeg (el de las cortinillas)
+AAC_PROFILE = "LC"
+
+
+class OutputProfile(NamedTuple):
+    """
+    Formato del video publicado. Todo lo que define los parámetros de los flujos
+    (códec, perfil H.264, resolución, fps, timebase, audio) es parte del perfil:
+    dos archivos codificados con el mismo perfil se pueden concatenar por copia.
+    """
+
+    width: int = 1280
+    height: int = 720
+    fps: int = 30
+    pix_fmt: str = "yuv420p"
+    video_codec: str = "libx264"
+    h264_profile: str = "high"
+    h264_level: str = "4.1"
+    preset: str = settings.ffmpeg_preset
+    crf: int = settings.ffmpeg_crf
+    # Timebase del track de video en MP4 (múltiplo de fps)
+    video_timescale: int = 15360
+    audio_codec: str = "aac"
+    audio_rate: int = 48000
+    audio_channels: int = 2
+    audio_bitrate: str = "128k"
+
+    @property
+    def channel_layout(self) -> str:
+        return "stereo" if self.audio_channels == 2 else "mono"
+
+    @property
+    def key(self) -> str:
+        """Identificador estable del perfil (nombre de directorio de las cortinillas)"""
+        digest = hashlib.sha1(repr(tuple(self)).encode()).hexdigest()[:10]
+        return f"{self.width}x{self.height}_{self.fps}fps_{self.video_codec}_{self.audio_codec}{self.audio_rate}_{digest}"
+
+
+DEFAULT_PROFILE = OutputProfile()
+
+
+class MediaProbe(NamedTuple):
+    duration: Optional[float]
+    has_audio: bool
+    format_name: str = ""
+    # Primer flujo de video y de audio, tal como los reporta ffprobe
+    video: Optional[dict] = None
+    audio: Optional[dict] = None
+    # Keyframes (s) del video dentro del recorte; solo si puede copiarse
+    keyframes: Optional[List[float]] = None
+
+    @classmethod
+    def from_ffprobe(cls, info: dict, keyframes: Optional[List[float]] = None) -> "MediaProbe":
+        streams = info.get("streams", [])
+        video = next((s for s in streams if s.get("codec_type") == "video"), None)
+        audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+        duration = info.get("format", {}).get("duration")
+        return cls(
+            duration=float(duration) if duration else None,
+            has_audio=audio is not None,
+            format_name=info.get("format", {}).get("format_name", ""),
+            video=video,
+            audio=audio,
+            keyframes=keyframes,
+        )
+
+
+def is_remote(source: str) -> bool:
+    return source.startswith(("http://", "https://"))
+
+
+def input_options(source: str) -> List[str]:
+    """
+    Opciones de lectura del original. Por HTTP (URL prefirmada) ffmpeg pide con Range solo
+    los bytes que necesita; se reutiliza la conexión y se reconecta ante cortes.
+    """
+    if not is_remote(source):
+        return []
+    return [
+        "-reconnect", "1",
+        "-reconnect_on_network_error", "1",
+        "-reconnect_delay_max", "5",
+        "-multiple_requests", "1",
+    ]
+
+
+def redact(text: str) -> str:
+    """Quita la query (firma) de las URL antes de registrarlas"""
+    return re.sub(r"(https?://[^\s?'\"]+)\?[^\s'\"]*", r"\1", text)
+
+
+def _ffprobe(args: List[str]) -> dict:
+    cmd = ["ffprobe", "-v", "error", "-print_format", "json", *args]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe falló: {redact(result.stderr.strip())}")
+    return json.loads(result.stdout or "{}")
+
+
+def probe_media(path: str) -> MediaProbe:
+    """Formato y flujos del original (ffprobe)"""
+    return MediaProbe.from_ffprobe(
+        _ffprobe([*input_options(path), "-show_format", "-show_streams", path])
+    )
+
+
+def probe_keyframes(path: str, max_seconds: int = MAX_DURATION_SECONDS) -> List[float]:
+    """
+    Instantes de los keyframes del video en los primeros `max_seconds`. Solo lee
+    paquetes (sin decodificar), así que cuesta lo mismo que leer ese tramo del archivo.
+    """
+    info = _ffprobe([
+        *input_options(path),
+        "-select_streams", "v:0",
+        "-read_intervals", f"%+{max_seconds + 1}",
+        "-show_entries", "packet=pts_time,flags",
+        path,
+    ])
+    return sorted(
+        float(packet["pts_time"]) for packet in info.get("packets", [])
+        if "K" in packet.get("flags", "") and packet.get("pts_time") not in (None, "N/A")
+    )
+
+
+class ProbeCache:
+    """
+    Resultado de ffprobe por video en `{PROBE_CACHE_DIR}/{video_id}.json`: los reintentos
+    de la tarea no vuelven a analizar el original. Se descarta al terminar el procesamiento.
+    """
+
+    def __init__(self, directory: str = settings.probe_cache_dir):
+        self.directory = directory
+
+    def _path(self, video_id: str) -> str:
+        return os.path.join(self.directory, f"{video_id}.json")
+
+    def get(
+        self,
+        video_id: str,
+        source: str,
+        profile: OutputProfile = DEFAULT_PROFILE,
+        max_seconds: int = MAX_DURATION_SECONDS,
+    ) -> MediaProbe:
+        path = self._path(video_id)
+        try:
+            with open(path) as f:
+                cached = json.load(f)
+            return MediaProbe.from_ffprobe(cached["ffprobe"], cached.get("keyframes"))
+        except (OSError, ValueError, KeyError):
+            pass
+
+        info = _ffprobe([*input_options(source), "-show_format", "-show_streams", source])
+        probe = MediaProbe.from_ffprobe(info)
+        keyframes = None
+        if video_matches_profile(probe.video, profile) and (
+            probe.duration is None or probe.duration > max_seconds
+        ):
+            keyframes = probe_keyframes(source, max_seconds)
+
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"ffprobe": info, "keyframes": keyframes}, f)
+        os.replace(tmp_path, path)
+        return probe._replace(keyframes=keyframes)
+
+    def discard(self, video_id: str) -> None:
+        path = self._path(video_id)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+probe_cache = ProbeCache()
+
+
+def _frame_rate(value: Optional[str]) -> Optional[Fraction]:
+    try:
+        rate = Fraction(value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    return rate or None
+
+
+def video_matches_profile(stream: Optional[dict], profile: OutputProfile) -> bool:
+    """
+    El video puede copiarse tal cual: mismo códec, perfil H.264, nivel (o menor),
+    resolución, formato de píxel, fps constantes, píxeles cuadrados y un timebase en el que
+    cada cuadro dura un número entero de ticks (el clip se remuxea a `video_timescale` sin
+    redondear tiempos). Son los parámetros que la unión por copia necesita iguales.
+
+    El SPS/PPS (extradata) no tiene que coincidir con el de las cortinillas: el concat
+    demuxer aplica h264_mp4toannexb a cada segmento (auto_convert), así que el SPS/PPS del
+    clip viaja en banda antes de cada keyframe y el decodificador lo usa desde ahí.
+    """
+    if not stream or stream.get("codec_name") != "h264":
+        return False
+    level = stream.get("level")
+    rate = _frame_rate(stream.get("avg_frame_rate"))
+    time_base = _frame_rate(stream.get("time_base"))
+    return (
+        stream.get("width") == profile.width
+        and stream.get("height") == profile.height
+        and stream.get("pix_fmt") == profile.pix_fmt
+        and (stream.get("profile") or "").lower() == profile.h264_profile
+        and isinstance(level, int) and 0 < level <= round(float(profile.h264_level) * 10)
+        and rate == profile.fps
+        and _frame_rate(stream.get("r_frame_rate")) == rate
+        and stream.get("sample_aspect_ratio", "1:1") in ("1:1", "0:1")
+        and time_base is not None
+        and (Fraction(1, profile.fps) / time_base).denominator == 1
+    )
+
+
+def audio_matches_profile(stream: Optional[dict], profile: OutputProfile) -> bool:
+    """Mismo códec, perfil AAC (HE-AAC no es copiable a una pista AAC-LC), frecuencia y canales"""
+    return (
+        stream is not None
+        and stream.get("codec_name") == profile.audio_codec
+        and stream.get("profile") == AAC_PROFILE
+        and str(stream.get("sample_rate")) == str(profile.audio_rate)
+        and stream.get("channels") == profile.audio_channels
+    )
+
+
+class StreamPlan(NamedTuple):
+    """Qué hacer con cada flujo del original"""
+
+    video: str  # copy | transcode
+    audio: str  # copy | transcode | silence
+    # Fin del recorte (s); al copiar es un keyframe
+    cut_seconds: float
+
+    @property
+    def mode(self) -> str:
+        """passthrough: nada se recodifica; remux: solo el audio; transcode: el video"""
+        if self.video == "transcode":
+            return "transcode"
+        return "passthrough" if self.audio == "copy" else "remux"
+
+
+def plan_streams(
+    probe: MediaProbe,
+    profile: OutputProfile = DEFAULT_PROFILE,
+    max_seconds: int = MAX_DURATION_SECONDS,
+) -> StreamPlan:
+    if not probe.has_audio:
+        audio = "silence"
+    elif audio_matches_profile(probe.audio, profile):
+        audio = "copy"
+    else:
+        audio = "transcode"
+
+    cut = float(max_seconds)
+    video = "transcode"
+    if settings.video_passthrough and video_matches_profile(probe.video, profile):
+        if probe.duration is not None and probe.duration <= max_seconds:
+            video, cut = "copy", probe.duration
+        elif probe.keyframes:
+            # Último keyframe dentro del recorte: el GOP anterior queda completo
+            keyframe = max((k for k in probe.keyframes if 0 < k <= max_seconds), default=0)
+            if keyframe and max_seconds - keyframe <= settings.passthrough_max_trim_loss_seconds:
+                video, cut = "copy", keyframe
+
+    # Sin copia de video el audio se recodifica con el mismo filtro que siempre
+    if video == "transcode" and audio == "copy":
+        audio = "transcode"
+    return StreamPlan(video=video, audio=audio, cut_seconds=cut)
+
+
+def container_args(output: str) -> List[str]:
+    """faststart para archivos; MP4 fragmentado (moov vacío al inicio) para stdout"""
+    if output == PIPE_OUTPUT:
+        return ["-movflags", "+frag_keyframe+empty_moov+default_base_moof", "-f", "mp4"]
+    return ["-movflags", "+faststart"]
+
+
+def _video_chain(stream: str, label: str, profile: OutputProfile) -> str:
+    w, h = profile.width, profile.height
+    return (
+        f"[{stream}]scale={w}:{h}:force_original_aspect_ratio=decrease,"
+        f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2:color=black,setsar=1,"
+        f"fps={profile.fps},format={profile.pix_fmt}[v{label}]"
+    )
+
+
+def _audio_chain(stream: str, label: str, profile: OutputProfile) -> str:
+    return (
+        f"[{stream}]aresample={profile.audio_rate},"
+        f"aformat=sample_fmts=fltp:channel_layouts={profile.channel_layout}[a{label}]"
+    )
+
+
+def encode_args(profile: OutputProfile) -> List[str]:
+    """Parámetros de codificación idénticos para clips y cortinillas"""
+    return video_encode_args(profile) + audio_encode_args(profile)
+
+
+def video_encode_args(profile: OutputProfile) -> List[str]:
+    return [
+        "-c:v", profile.video_codec,
+        "-preset", profile.preset,
+        "-crf", str(profile.crf),
+        "-profile:v", profile.h264_profile,
+        "-level:v", profile.h264_level,
+        "-pix_fmt", profile.pix_fmt,
+        # Keyframe cada 2 s: cortes y uniones limpias
+        "-g", str(profile.fps * 2),
+        "-video_track_timescale", str(profile.video_timescale),
+    ]
+
+
+def audio_encode_args(profile: OutputProfile) -> List[str]:
+    return [
+        "-c:a", profile.audio_codec,
+        "-b:a", profile.audio_bitrate,
+        "-ar", str(profile.audio_rate),
+        "-ac", str(profile.audio_channels),
+    ]
+
+
+def build_single_pass_command(
+    source: str,
+    intro_path: str,
+    outro_path: str,
+    output: str,
+    probe: MediaProbe,
+    profile: OutputProfile = DEFAULT_PROFILE,
+    max_seconds: int = MAX_DURATION_SECONDS,
+) -> List[str]:
+    """
+    Entradas: 0 = intro, 1 = original (leído solo hasta `max_seconds`), 2 = outro y,
+    si el original no tiene audio, 3 = silencio de la duración del recorte
+    (concat exige los mismos flujos en cada segmento).
+    """
+    cmd = [
+        "ffmpeg", "-hide_banner", "-nostdin", "-y",
+        "-i", intro_path,
+        *input_options(source), "-t", str(max_seconds), "-i", source,
+        "-i", outro_path,
+    ]
+
+    clip_audio = "1:a:0"
+    if not probe.has_audio:
+        clip_seconds = min(probe.duration or max_seconds, max_seconds)
+        cmd += [
+            "-f", "lavfi", "-t", f"{clip_seconds:.3f}",
+            "-i", f"anullsrc=channel_layout={profile.channel_layout}:sample_rate={profile.audio_rate}",
+        ]
+        clip_audio = "3:a:0"
+
+    graph = ";".join([
+        _video_chain("0:v:0", "intro", profile),
+        _audio_chain("0:a:0", "intro", profile),
+        _video_chain("1:v:0", "clip", profile),
+        _audio_chain(clip_audio, "clip", profile),
+        _video_chain("2:v:0", "outro", profile),
+        _audio_chain("2:a:0", "outro", profile),
+        "[vintro][aintro][vclip][aclip][voutro][aoutro]concat=n=3:v=1:a=1[v][a]",
+    ])
+
+    return cmd + [
+        "-filter_complex", graph,
+        "-map", "[v]", "-map", "[a]",
+        *encode_args(profile),
+        *container_args(output),
+        output,
+    ]
+
+
+def build_clip_command(
+    source: str,
+    output: str,
+    probe: MediaProbe,
+    profile: OutputProfile = DEFAULT_PROFILE,
+    max_seconds: int = MAX_DURATION_SECONDS,
+    plan: Optional[StreamPlan] = None,
+) -> List[str]:
+    """Recorte + escalado/relleno del original al perfil, en un solo decode/encode"""
+    plan = plan or plan_streams(probe, profile, max_seconds)
+    if plan.video == "copy":
+        return build_copy_clip_command(source, output, plan, profile)
+
+    cmd = [
+        "ffmpeg", "-hide_banner", "-nostdin", "-y",
+        *input_options(source), "-t", str(max_seconds), "-i", source,
+    ]
+
+    clip_audio = "0:a:0"
+    if not probe.has_audio:
+        clip_seconds = min(probe.duration or max_seconds, max_seconds)
+        cmd += [
+            "-f", "lavfi", "-t", f"{clip_seconds:.3f}",
+            "-i", f"anullsrc=channel_layout={profile.channel_layout}:sample_rate={profile.audio_rate}",
+        ]
+        clip_audio = "1:a:0"
+
+    graph = ";".join([
+        _video_chain("0:v:0", "clip", profile),
+        _audio_chain(clip_audio, "clip", profile),
+    ])
+    return cmd + [
+        "-filter_complex", graph,
+        "-map", "[vclip]", "-map", "[aclip]",
+        *encode_args(profile),
+        output,
+    ]
+
+
+def build_copy_clip_command(
+    source: str, output: str, plan: StreamPlan, profile: OutputProfile = DEFAULT_PROFILE
+) -> List[str]:
+    """Video copiado (recortado en un keyframe); el audio se copia o se recodifica"""
+    cmd = [
+        "ffmpeg", "-hide_banner", "-nostdin", "-y",
+        *input_options(source), "-t", f"{plan.cut_seconds:.3f}", "-i", source,
+    ]
+    audio_map = "0:a:0"
+    if plan.audio == "silence":
+        cmd += [
+            "-f", "lavfi", "-t", f"{plan.cut_seconds:.3f}",
+            "-i", f"anullsrc=channel_layout={profile.channel_layout}:sample_rate={profile.audio_rate}",
+        ]
+        audio_map = "1:a:0"
+
+    cmd += [
+        "-map", "0:v:0", "-map", audio_map,
+        "-c:v", "copy",
+        "-video_track_timescale", str(profile.video_timescale),
+    ]
+    cmd += ["-c:a", "copy"] if plan.audio == "copy" else audio_encode_args(profile)
+    return cmd + [output]
+
+
+def build_concat_command(list_file: str, output: str) -> List[str]:
+    """Une intro, clip y outro (mismo perfil) por copia de flujos, sin recodificar"""
+    return [
+        "ffmpeg", "-hide_banner", "-nostdin", "-y",
+        "-f", "concat", "-safe", "0", "-i", list_file,
+        "-c", "copy",
+        *container_args(output),
+        output,
+    ]
+
+
+def children_cpu_seconds() -> float:
+    """CPU (usuario + sistema) acumulada por los subprocesos terminados"""
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class TranscodeCostEstimator:
+    """CPU-s por segundo de clip al recodificar (media móvil de los clips recodificados)"""
+
+    def __init__(self, initial: float = settings.transcode_cpu_seconds_per_second, alpha: float = 0.2):
+        self.cpu_per_second = initial
+        self.alpha = alpha
+
+    def observe(self, cpu_seconds: float, clip_seconds: float) -> None:
+        if clip_seconds > 0:
+            sample = cpu_seconds / clip_seconds
+            self.cpu_per_second += self.alpha * (sample - self.cpu_per_second)
+
+    def estimate(self, clip_seconds: float) -> float:
+        return self.cpu_per_second * clip_seconds
+
+
+transcode_cost = TranscodeCostEstimator()
+
+
+def run_ffmpeg(cmd: List[str], sink=None) -> bool:
+    if sink is not None:
+        return stream_ffmpeg(cmd, sink)
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        # Las últimas líneas de stderr tienen el error real
+        logger.error("FFmpeg error", stderr=redact(result.stderr[-4000:]))
+    return result.returncode == 0
+
+
+def stream_ffmpeg(cmd: List[str], sink, chunk_size: int = settings.upload_chunk_size) -> bool:
+    """
+    Ejecuta ffmpeg con salida a stdout y entrega cada bloque a `sink.write` mientras sigue
+    codificando. Un hilo lee stdout para que ffmpeg no se detenga mientras se sube un bloque;
+    si el destino se atrasa, la cola llena frena a ffmpeg. Si `sink.write` falla se
+    termina ffmpeg y se propaga el error.
+    """
+    chunks = queue.Queue(maxsize=STREAM_QUEUE_CHUNKS)
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr)
+
+        def read_output():
+            try:
+                while True:
+                    data = process.stdout.read(chunk_size)
+                    chunks.put(data)
+                    if not data:
+                        break
+            except (OSError, ValueError):
+                chunks.put(b"")
+
+        reader = threading.Thread(target=read_output, daemon=True)
+        reader.start()
+        try:
+            while True:
+                data = chunks.get()
+                if not data:
+                    break
+                sink.write(data)
+        except BaseException:
+            process.kill()
+            # Liberar al lector si quedó bloqueado con la cola llena
+            while reader.is_alive():
+                try:
+                    chunks.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            process.wait()
+            raise
+        finally:
+            process.stdout.close()
+
+        returncode = process.wait()
+        reader.join()
+        if returncode != 0:
+            stderr.seek(0)
+            output = stderr.read().decode(errors="replace")
+            logger.error("FFmpeg error", stderr=redact(output[-4000:]))
+    return returncode == 0
+
+
+def process_single_pass(
+    input_path: str, output_path: str, intro_path: str, outro_path: str, sink=None
+) -> bool:
+    """Con `sink` la salida se entrega por bloques (MP4 fragmentado) en vez de a `output_path`"""
+    try:
+        probe = probe_media(input_path)
+        output = PIPE_OUTPUT if sink is not None else output_path
+        cmd = build_single_pass_command(input_path, intro_path, outro_path, output, probe)
+        return run_ffmpeg(cmd, sink)
+    except Exception as e:
+        logger.error("Error processing video", error=redact(str(e)), input_path=redact(input_path))
+        return False
+
+
+def record_clip_mode(plan: StreamPlan, probe: MediaProbe, cpu_seconds: float) -> None:
+    clip_seconds = min(probe.duration or plan.cut_seconds, plan.cut_seconds)
+    video_clip_modes.labels(mode=plan.mode).inc()
+    ffmpeg_cpu_seconds.labels(mode=plan.mode).inc(cpu_seconds)
+    if plan.mode == "transcode":
+        transcode_cost.observe(cpu_seconds, clip_seconds)
+    else:
+        transcode_cpu_seconds_saved.inc(max(0.0, transcode_cost.estimate(clip_seconds) - cpu_seconds))
+    logger.info(
+        "Clip prepared",
+        mode=plan.mode,
+        video=plan.video,
+        audio=plan.audio,
+        clip_seconds=round(clip_seconds, 3),
+        cpu_seconds=round(cpu_seconds, 3),
+    )
+
+
+def process_with_assets(
+    input_path: str,
+    output_path: str,
+    clip_path: str,
+    intro_path: str,
+    outro_path: str,
+    profile: OutputProfile = DEFAULT_PROFILE,
+    probe: Optional[MediaProbe] = None,
+    sink=None,
+) -> bool:
+    """
+    Prepara solo el clip del jugador (copiado si ya cumple el perfil, si no codificado)
+    y lo une por copia con las cortinillas del perfil. Con `sink` la unión se entrega por
+    bloques (MP4 fragmentado) en vez de escribirse en `output_path`.
+    """
+    list_file = None
+    try:
+        probe = probe or probe_media(input_path)
+        plan = plan_streams(probe, profile)
+        cpu_before = children_cpu_seconds()
+        if not run_ffmpeg(build_clip_command(input_path, clip_path, probe, profile, plan=plan)):
+            return False
+        record_clip_mode(plan, probe, children_cpu_seconds() - cpu_before)
+
+        # Si una parte no se puede abrir, el demuxer concat termina la entrada sin error
+        # (código 0): la salida quedaría truncada y se subiría como completa
+        missing = [path for path in (intro_path, clip_path, outro_path) if not os.path.exists(path)]
+        if missing:
+            raise FileNotFoundError(f"Partes de la unión no encontradas: {missing}")
+
+        fd, list_file = tempfile.mkstemp(prefix="concat_", suffix=".txt")
+        with os.fdopen(fd, "w") as f:
+            for path in (intro_path, clip_path, outro_path):
+                f.write(f"file '{os.path.abspath(path)}'\n")
+        output = PIPE_OUTPUT if sink is not None else output_path
+        return run_ffmpeg(build_concat_command(list_file, output), sink)
+    except Exception as e:
+        logger.error("Error processing video", error=redact(str(e)), input_path=redact(input_path))
+        return False
+    finally:
+        for path in (list_file, clip_path):
+            if path and os.path.exists(path):
+                os.remove(path)
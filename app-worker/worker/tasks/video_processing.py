@@ -1,3 +1,4 @@
+import hashlib
 import subprocess
 import os
 import structlog
@@ -11,11 +12,24 @@ from shared.storage import storage_manager
 from shared.db.models.video import Video, VideoStatus
 from shared.db.models.user import User
 from shared.db.models.vote import Vote
+from shared.db.rankings import add_processed_video
+from shared.db.dedup import find_processed_duplicate
+from shared.cache import invalidate_public_reads
+from worker.assets import asset_cache
+from worker.ffmpeg_pipeline import (
+    input_options,
+    is_remote,
+    probe_cache,
+    process_single_pass,
+    process_with_assets,
+    redact,
+)
 
 # Importar métricas
 from shared.metrics.process_exporter import start_exporter
+from shared.metrics.metrics import video_dedup_lookups, video_dedup_hits
 
-from celery.signals import worker_process_init
+from celery.signals import worker_init, worker_process_init
 
 logger = structlog.get_logger()
 
@@ -25,6 +39,15 @@ def init_worker_exporter(**kwargs):
     # Ejecuta el exporter de métricas del proceso real (CPU, RAM, I/O)
     start_exporter(port=9001)
 
+
+@worker_init.connect
+def warm_intro_outro_assets(**kwargs):
+    # Cortinillas del perfil de salida listas antes de la primera tarea. Una sola vez, en el
+    # proceso principal antes de crear el pool: en worker_process_init la codificación
+    # superaría worker_proc_alive_timeout (4 s) y Celery reiniciaría los procesos sin fin.
+    # Con --pool=solo es además la única señal de arranque.
+    asset_cache.warm()
+
 @celery_app.task(
     bind=True,
     name="worker.tasks.video_processing.process_video_task",
@@ -37,8 +60,12 @@ def process_video_task(self, video_id: str):
     1. Recortar a máximo 30 segundos
     2. Ajustar a 720p 16:9
     3. Agregar cortinillas ANB (5s inicio + 5s final)
+    Con VIDEO_PIPELINE=asset_concat solo se prepara el clip (copiado si ya cumple el
+    perfil) y se une por copia con las cortinillas precodificadas; con single_pass los tres
+    pasos son una sola invocación de ffmpeg.
     """
     start_time = datetime.utcnow()
+    output_writer = None
     logger.info("Starting video processing", video_id=video_id, task_id=self.request.id)
 
     try:
@@ -50,6 +77,9 @@ def process_video_task(self, video_id: str):
                 f"Video con ID {video_id} no encontrado en la base de datos"
             )
 
+        # Una entrega repetida de la tarea no debe sumar el video dos veces al ranking
+        already_processed = video.status == VideoStatus.PROCESSED.value
+
         video.status = VideoStatus.PROCESSING.value
         video.processing_started_at = datetime.utcnow()
         db.commit()
@@ -60,38 +90,94 @@ def process_video_task(self, video_id: str):
         input_path = f"{settings.uploads_dir}/temp_input_{video_id}.mp4"
         temp_path = f"{settings.uploads_dir}/temp_{video_id}.mp4"
         output_path = f"{settings.uploads_dir}/temp_processed_{video_id}.mp4"
-
-        # Descargar video original desde storage
-        try:
-            storage_manager.download_video(video.file_original_url, input_path)
-        except Exception as e:
-            raise FileNotFoundError(f"Error descargando video original: {str(e)}")
-
-        # Verificar que existe el archivo descargado
-        if not os.path.exists(input_path):
-            raise FileNotFoundError(
-                f"Video original no encontrado después de descarga: {input_path}"
+        clip_path = f"{settings.uploads_dir}/temp_clip_{video_id}.mp4"
+
+        if settings.video_source_mode == "download":
+            # Descargar video original desde storage
+            try:
+                storage_manager.download_video(video.file_original_url, input_path)
+            except Exception as e:
+                raise FileNotFoundError(f"Error descargando video original: {str(e)}")
+            source = input_path
+        else:
+            # ffmpeg lee el original directamente (URL prefirmada o ruta local)
+            source = storage_manager.get_video_source(
+                video.file_original_url, settings.source_url_expire_seconds
             )
 
-        logger.info("Step 1: Trimming video to 30 seconds", video_id=video_id)
-        if not trim_video_to_30s(input_path, temp_path):
-            raise Exception("Error en recorte de video")
-
-        logger.info("Step 2: Resizing to 720p 16:9", video_id=video_id)
-        temp_resized_path = f"{settings.uploads_dir}/temp_resized_{video_id}.mp4"
-        if not resize_to_720p_16_9(temp_path, temp_resized_path):
-            raise Exception("Error en redimensionado de video")
-
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-        os.rename(temp_resized_path, temp_path)
-
-        logger.info("Step 3: Adding ANB intro/outro", video_id=video_id)
-        if not add_anb_intro_outro(temp_path, output_path):
-            raise Exception("Error al agregar cortinillas ANB")
-
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        # Verificar que existe el archivo (las URL las valida ffprobe/ffmpeg)
+        if not is_remote(source) and not os.path.exists(source):
+            raise FileNotFoundError(f"Video original no encontrado: {source}")
+
+        # Las subidas reanudables y directas llegan sin hash: la API no lee el archivo
+        # completo, el worker sí
+        if video.content_sha256 is None:
+            video.content_sha256 = source_sha256(video.file_original_url, source)
+            video_dedup_lookups.inc()
+            duplicate = find_processed_duplicate(db, video.content_sha256, exclude_id=video.id)
+            if duplicate is not None:
+                logger.info("Reusing processed duplicate", video_id=video_id)
+                video.status = VideoStatus.PROCESSED.value
+                video.file_processed_url = duplicate.file_processed_url
+                video.processed_duration_seconds = duplicate.processed_duration_seconds
+                video.processed_resolution = duplicate.processed_resolution
+                video.processed_at = datetime.utcnow()
+                if not already_processed:
+                    add_processed_video(db, video.id_user, video.votes)
+                db.commit()
+                video_dedup_hits.inc()
+                if os.path.exists(input_path):
+                    os.remove(input_path)
+                if settings.response_cache_backend == "redis":
+                    invalidate_public_reads()
+                return {
+                    "status": "deduplicated",
+                    "video_id": video_id,
+                    "output_path": video.file_processed_url,
+                    "processed_at": video.processed_at.isoformat(),
+                }
+            db.commit()
+
+        if settings.video_output_mode == "stream" and settings.video_pipeline != "multi_pass":
+            # El último ffmpeg escribe MP4 fragmentado que se sube mientras se produce
+            output_writer = storage_manager.open_processed_video_writer(video_id)
+
+        if settings.video_pipeline == "multi_pass":
+            logger.info("Step 1: Trimming video to 30 seconds", video_id=video_id)
+            if not trim_video_to_30s(source, temp_path):
+                raise Exception("Error en recorte de video")
+
+            logger.info("Step 2: Resizing to 720p 16:9", video_id=video_id)
+            temp_resized_path = f"{settings.uploads_dir}/temp_resized_{video_id}.mp4"
+            if not resize_to_720p_16_9(temp_path, temp_resized_path):
+                raise Exception("Error en redimensionado de video")
+
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            os.rename(temp_resized_path, temp_path)
+
+            logger.info("Step 3: Adding ANB intro/outro", video_id=video_id)
+            if not add_anb_intro_outro(temp_path, output_path):
+                raise Exception("Error al agregar cortinillas ANB")
+
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        elif settings.video_pipeline == "single_pass":
+            logger.info("Trimming, resizing and adding ANB intro/outro in one pass", video_id=video_id)
+            intro_path, outro_path = asset_cache.get()
+            if not process_single_pass(
+                source, output_path, intro_path, outro_path, sink=output_writer
+            ):
+                raise Exception("Error en procesamiento de video")
+        else:
+            logger.info("Preparing clip and joining pre-encoded ANB intro/outro", video_id=video_id)
+            intro_path, outro_path = asset_cache.get()
+            probe = probe_cache.get(video_id, source)
+            if not process_with_assets(
+                source, output_path, clip_path, intro_path, outro_path,
+                probe=probe, sink=output_writer,
+            ):
+                raise Exception("Error en procesamiento de video")
 
         logger.info(
             "Video processing completed successfully",
@@ -99,11 +185,15 @@ def process_video_task(self, video_id: str):
             output_path=output_path,
         )
 
-        # Subir video procesado a storage
+        # Subir video procesado a storage (en modo stream solo falta cerrar la subida)
         try:
-            processed_url = storage_manager.upload_processed_video(
-                output_path, video_id
-            )
+            if output_writer is not None:
+                processed_url = output_writer.close()
+                output_writer = None
+            else:
+                processed_url = storage_manager.upload_processed_video(
+                    output_path, video_id
+                )
             logger.info(
                 "Video uploaded to storage",
                 video_id=video_id,
@@ -120,6 +210,7 @@ def process_video_task(self, video_id: str):
             input_path,
             temp_path,
             output_path,
+            clip_path,
             f"{settings.uploads_dir}/temp_resized_{video_id}.mp4",
         ]
 
@@ -135,10 +226,19 @@ def process_video_task(self, video_id: str):
                         error=str(e),
                     )
 
+        probe_cache.discard(video_id)
+
         video.status = VideoStatus.PROCESSED.value
         video.file_processed_url = processed_url
         video.processed_at = datetime.utcnow()
+        if not already_processed:
+            # En la misma transacción que el cambio de estado
+            add_processed_video(db, video.id_user, video.votes)
         db.commit()
+        # Solo la caché en Redis es compartida con la API; con `memory` la
+        # invalidación se quedaría en este proceso
+        if settings.response_cache_backend == "redis":
+            invalidate_public_reads()
 
         return {
             "status": "completed",
@@ -155,12 +255,20 @@ def process_video_task(self, video_id: str):
             task_id=self.request.id,
         )
 
+        # Descartar la subida parcial del video procesado
+        if output_writer is not None:
+            try:
+                output_writer.abort()
+            except Exception as e:
+                logger.warning("Could not abort processed video upload", error=str(e))
+
         # Limpiar archivos temporales en caso de error
         temp_files_to_clean = [
             f"{settings.uploads_dir}/temp_input_{video_id}.mp4",
             f"{settings.uploads_dir}/temp_{video_id}.mp4",
             f"{settings.uploads_dir}/temp_processed_{video_id}.mp4",
             f"{settings.uploads_dir}/temp_resized_{video_id}.mp4",
+            f"{settings.uploads_dir}/temp_clip_{video_id}.mp4",
         ]
 
         for temp_file in temp_files_to_clean:
@@ -203,13 +311,27 @@ def process_video_task(self, video_id: str):
 # ---------- Funciones auxiliares (trim, resize, intro/outro) ----------
 
 
+def source_sha256(video_url: str, source: str) -> str:
+    """SHA-256 del original: del archivo local si ya está en disco, si no del almacenamiento"""
+    if is_remote(source):
+        return storage_manager.sha256_video(video_url)
+    digest = hashlib.sha256()
+    with open(source, "rb") as f:
+        for block in iter(lambda: f.read(settings.upload_chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
 def trim_video_to_30s(input_path: str, output_path: str) -> bool:
     try:
-        cmd = ["ffmpeg", "-i", input_path, "-t", "30", "-c", "copy", "-y", output_path]
+        cmd = [
+            "ffmpeg", *input_options(input_path), "-i", input_path,
+            "-t", "30", "-c", "copy", "-y", output_path,
+        ]
         result = subprocess.run(cmd, capture_output=True, text=True)
         return result.returncode == 0
     except Exception as e:
-        logger.error("Error trimming video", error=str(e), input_path=input_path)
+        logger.error("Error trimming video", error=str(e), input_path=redact(input_path))
         return False
 
 
@@ -235,13 +357,19 @@ def resize_to_720p_16_9(input_path: str, output_path: str) -> bool:
         return False
 
 
+def ensure_intro_outro():
+    """Rutas de las cortinillas; las genera si no existen"""
+    os.makedirs(settings.assets_dir, exist_ok=True)
+    intro_path = f"{settings.assets_dir}/anb_intro_5s.mp4"
+    outro_path = f"{settings.assets_dir}/anb_outro_5s.mp4"
+    if not os.path.exists(intro_path) or not os.path.exists(outro_path):
+        create_simple_intro_outro(intro_path, outro_path)
+    return intro_path, outro_path
+
+
 def add_anb_intro_outro(input_path: str, output_path: str) -> bool:
     try:
-        os.makedirs(settings.assets_dir, exist_ok=True)
-        intro_path = f"{settings.assets_dir}/anb_intro_5s.mp4"
-        outro_path = f"{settings.assets_dir}/anb_outro_5s.mp4"
-        if not os.path.exists(intro_path) or not os.path.exists(outro_path):
-            create_simple_intro_outro(intro_path, outro_path)
+        intro_path, outro_path = ensure_intro_outro()
 
         # Crear archivo de concatenación
         concat_file = f"/tmp/concat_{os.path.basename(input_path)}.txt"
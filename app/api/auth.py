@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException
-from starlette.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from datetime import timedelta
 
@@ -7,29 +7,41 @@ from shared.config.settings import settings
 from shared.db.models.user import User
 from shared.db.config import get_db
 
+from ..core.responses import FastJSONResponse
 from ..schemas.auth_schemas import UserCreate, UserLogin
-from ..core.security import get_password_hash, verify_password, create_access_token
+from ..core.security import create_access_token
+from ..core.password_hashing import password_hasher
 
 import uuid
 
 router = APIRouter()
 
 
+def get_user_by_email(db: Session, email: str):
+    return db.query(User).filter(User.email == email).first()
+
+
+def create_user(db: Session, new_user: User) -> None:
+    db.add(new_user)
+    db.commit()
+
+
 @router.post("/signup")
-def signup(user: UserCreate, db: Session = Depends(get_db)):
+async def signup(user: UserCreate, db: Session = Depends(get_db)):
     if user.password1 != user.password2:
         raise HTTPException(
             status_code=400,
             detail={"message": "Error de validación (email duplicado, contraseñas no coinciden)."},
         )
     # Verificar si el email ya existe
-    db_user = db.query(User).filter(User.email == user.email).first()
+    db_user = await run_in_threadpool(get_user_by_email, db, user.email)
     if db_user:
         raise HTTPException(
             status_code=400,
             detail={"message": "Error de validación (email duplicado, contraseñas no coinciden)."},
         )
-    hashed_password = get_password_hash(user.password1)
+    # Hashing en el pool de procesos (503 si está saturado)
+    hashed_password = await password_hasher.hash(user.password1)
     new_user = User(
         id=str(uuid.uuid4()),
         email=user.email,
@@ -39,22 +51,20 @@ def signup(user: UserCreate, db: Session = Depends(get_db)):
         country=user.country,
         password_hash=hashed_password,
     )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    return JSONResponse(
+    await run_in_threadpool(create_user, db, new_user)
+    return FastJSONResponse(
         status_code=201, content={"message": "Usuario creado exitosamente."}
     )
 
 
 @router.post("/login", response_model=dict)
-def login(user: UserLogin, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user.email).first()
-    if not db_user or not verify_password(user.password, db_user.password_hash):
+async def login(user: UserLogin, db: Session = Depends(get_db)):
+    db_user = await run_in_threadpool(get_user_by_email, db, user.email)
+    if not db_user or not await password_hasher.verify(user.password, db_user.password_hash):
         raise HTTPException(status_code=401, detail={"message": "Credenciales inválidas."})
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
-        data={"sub": db_user.email}, expires_delta=access_token_expires
+        data={"sub": db_user.email, "uid": db_user.id}, expires_delta=access_token_expires
     )
     return {
         "access_token": access_token,
@@ -0,0 +1,194 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security.http import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy.orm import Session
+from datetime import timedelta
+import tempfile
+import uuid
+import logging
+
+from ..core.responses import FastJSONResponse
+from ..core.security import get_current_principal, create_upload_token, verify_upload_token
+from ..schemas.videos_schemas import (
+    CreateDirectUploadRequest,
+    CompleteDirectUploadRequest,
+)
+from .videos_api import register_uploaded_video
+
+from shared.storage import storage_manager
+from shared.media import probe_mp4, MP4ProbeError
+from shared.config.settings import settings
+from shared.db.config import get_db
+from shared.db.models.video import Video
+
+logger = logging.getLogger(__name__)
+
+router_direct_uploads = APIRouter()
+
+bearer = HTTPBearer()
+
+
+@router_direct_uploads.post("", response_class=FastJSONResponse)
+def create_direct_upload(
+    request_data: CreateDirectUploadRequest,
+    db: Session = Depends(get_db),
+    auth: HTTPAuthorizationCredentials = Depends(bearer),
+):
+    """
+    Obtener una petición firmada para subir el video directamente al almacenamiento
+    (POST de formulario en S3 con límite de tamaño, PUT en almacenamiento local).
+    Luego se confirma con /{video_id}/complete enviando el `upload_token`.
+    """
+
+    # Autenticación
+    user = get_current_principal(db, auth.credentials)
+
+    if not request_data.filename.lower().endswith(".mp4"):
+        raise HTTPException(
+            status_code=400, detail={"message": "El archivo debe ser MP4"}
+        )
+
+    video_id = str(uuid.uuid4())
+    expires_in = settings.direct_upload_expire_seconds
+
+    try:
+        upload_request = storage_manager.get_video_upload_request(video_id, expires_in)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail={"message": f"Error al generar la URL de subida: {str(e)}"},
+        )
+
+    # La confirmación puede llegar después de que venza la URL (subidas lentas)
+    upload_token = create_upload_token(
+        video_id, user.id, request_data.title, timedelta(seconds=expires_in * 2)
+    )
+
+    return FastJSONResponse(
+        status_code=201,
+        content={
+            "video_id": video_id,
+            "upload_url": upload_request["url"],
+            "method": upload_request["method"],
+            "fields": upload_request["fields"],
+            "headers": upload_request["headers"],
+            "expires_in": expires_in,
+            "max_size_bytes": settings.max_upload_bytes,
+            "upload_token": upload_token,
+        },
+    )
+
+
+@router_direct_uploads.post("/{video_id}/complete", response_class=FastJSONResponse)
+def complete_direct_upload(
+    video_id: str,
+    request_data: CompleteDirectUploadRequest,
+    db: Session = Depends(get_db),
+    auth: HTTPAuthorizationCredentials = Depends(bearer),
+):
+    """
+    Confirmar una subida directa: verifica el objeto en el almacenamiento,
+    crea el video y encola su procesamiento. Solo lee las cabeceras del MP4: el SHA-256
+    para deduplicar lo calcula el worker al leer el original.
+    """
+
+    # Autenticación
+    user = get_current_principal(db, auth.credentials)
+
+    upload = verify_upload_token(request_data.upload_token)
+    if upload["video_id"] != video_id or upload["uid"] != user.id:
+        raise HTTPException(
+            status_code=400,
+            detail={"message": "Token de subida inválido o expirado."},
+        )
+
+    if db.query(Video.id).filter(Video.id == video_id).first() is not None:
+        raise HTTPException(
+            status_code=400, detail={"message": "El video ya fue registrado"}
+        )
+
+    filename = f"{video_id}.mp4"
+    # Un reintento tras un fallo al registrar encuentra el archivo ya movido
+    if storage_manager.get_video_size(video_id, filename) is None:
+        incoming_size = storage_manager.get_incoming_video_size(video_id)
+        if incoming_size is None:
+            raise HTTPException(
+                status_code=400,
+                detail={"message": "El archivo aún no ha sido subido al almacenamiento"},
+            )
+        if incoming_size > settings.max_upload_bytes:
+            storage_manager.delete_incoming_video(video_id)
+            raise HTTPException(
+                status_code=400, detail={"message": "El archivo excede el límite de 100MB"}
+            )
+        # Fuera de `incoming/` la URL firmada ya no puede sobrescribir el archivo validado
+        storage_manager.promote_incoming_video(video_id, filename)
+
+    file_url = storage_manager.get_video_url(video_id, filename)
+    file_size = storage_manager.get_video_size(video_id, filename)
+
+    # Validar cabeceras MP4 con lecturas por rango, sin descargar el archivo
+    try:
+        with storage_manager.open_video(file_url) as video_file:
+            media_info = probe_mp4(video_file)
+    except MP4ProbeError:
+        storage_manager.delete_video(file_url)
+        raise HTTPException(
+            status_code=400, detail={"message": "El archivo no es un video MP4 válido"}
+        )
+
+    return register_uploaded_video(
+        db,
+        video_id=video_id,
+        title=upload["title"],
+        id_user=user.id,
+        file_url=file_url,
+        file_size=file_size,
+        content_sha256=None,
+        media_info=media_info,
+        delete_file_on_error=False,
+    )
+
+
+@router_direct_uploads.put("/storage/{key:path}", response_class=FastJSONResponse)
+async def local_signed_upload(
+    key: str,
+    request: Request,
+    expires: int = Query(...),
+    signature: str = Query(...),
+):
+    """
+    Destino de las URLs firmadas de LocalStorage (equivalente local de S3 para pruebas).
+    """
+    backend = storage_manager.backend
+    if storage_manager.storage_type != "local" or not backend.verify_upload_signature(
+        key, expires, signature
+    ):
+        raise HTTPException(
+            status_code=403, detail={"message": "Firma inválida o expirada"}
+        )
+
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > settings.max_upload_bytes:
+        raise HTTPException(
+            status_code=400, detail={"message": "El archivo excede el límite de 100MB"}
+        )
+
+    # El cuerpo se acumula en un archivo temporal (en disco si supera el bloque)
+    spool = tempfile.SpooledTemporaryFile(max_size=settings.upload_chunk_size)
+    try:
+        received = 0
+        async for data in request.stream():
+            received += len(data)
+            if received > settings.max_upload_bytes:
+                raise HTTPException(
+                    status_code=400,
+                    detail={"message": "El archivo excede el límite de 100MB"},
+                )
+            await run_in_threadpool(spool.write, data)
+        spool.seek(0)
+        await run_in_threadpool(backend.upload_fileobj, spool, key)
+    finally:
+        spool.close()
+
+    return FastJSONResponse(status_code=200, content={"message": "Archivo almacenado"})
@@ -0,0 +1,181 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.security.http import HTTPAuthorizationCredentials, HTTPBearer
+from starlette.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from enum import Enum
+from typing import Iterator, Optional
+import csv
+import datetime
+import io
+
+import orjson
+
+from ..core.security import get_current_admin
+
+from shared.config.settings import settings
+from shared.db.config import get_db
+from shared.db.models.video import Video, VideoStatus
+from shared.db.models.vote import Vote
+from shared.db.models.user_ranking import UserRanking
+
+router_exports = APIRouter()
+bearer = HTTPBearer()
+
+# Límite superior (incluido) de la exportación: usarlo como `since` en la siguiente
+WATERMARK_HEADER = "X-Export-Watermark"
+
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+MEDIA_TYPES = {
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+    ExportFormat.NDJSON: "application/x-ndjson",
+}
+
+
+def to_utc_naive(value: Optional[datetime.datetime]) -> Optional[datetime.datetime]:
+    """Las fechas se guardan en UTC sin zona horaria"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def _csv_value(value):
+    return value.isoformat() if isinstance(value, datetime.datetime) else value
+
+
+def stream_rows(db: Session, statement, fmt: ExportFormat) -> Iterator[bytes]:
+    """
+    Recorre la consulta con un cursor del lado del servidor (yield_per: stream_results
+    en PostgreSQL) y emite un bloque por lote: memoria constante sin importar el tamaño.
+    """
+    result = db.execute(statement.execution_options(yield_per=settings.export_batch_size))
+    columns = list(result.keys())
+
+    if fmt == ExportFormat.CSV:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield buffer.getvalue().encode()
+
+    for rows in result.partitions():
+        if fmt == ExportFormat.CSV:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerows([_csv_value(value) for value in row] for row in rows)
+            yield buffer.getvalue().encode()
+        else:
+            yield b"".join(orjson.dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+
+
+def export_response(
+    db: Session,
+    dataset: str,
+    statement,
+    timestamp_column,
+    since: Optional[datetime.datetime],
+    fmt: ExportFormat,
+) -> StreamingResponse:
+    """
+    Filtra `since < timestamp <= watermark` y ordena por la marca de tiempo. La marca de
+    agua va unos segundos atrás para no perder filas cuyas transacciones aún no hacen commit.
+    """
+    watermark = datetime.datetime.utcnow() - datetime.timedelta(
+        seconds=settings.export_watermark_lag_seconds
+    )
+    statement = statement.where(timestamp_column <= watermark)
+    if since is not None:
+        statement = statement.where(timestamp_column > to_utc_naive(since))
+
+    filename = f"{dataset}-{watermark.strftime('%Y%m%dT%H%M%S')}.{fmt.value}"
+    return StreamingResponse(
+        stream_rows(db, statement, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={
+            WATERMARK_HEADER: watermark.isoformat(),
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store",
+        },
+    )
+
+
+@router_exports.get("/videos")
+def export_videos(
+    format: ExportFormat = Query(ExportFormat.NDJSON, description="csv o ndjson"),
+    since: datetime.datetime = Query(None, description="Solo videos procesados después de esta fecha"),
+    db: Session = Depends(get_db),
+    auth: HTTPAuthorizationCredentials = Depends(bearer),
+):
+    """
+    Exportar los videos procesados ordenados por `processed_at`.
+    Para cargas incrementales, enviar en `since` la cabecera X-Export-Watermark anterior.
+    """
+    get_current_admin(db, auth.credentials)
+
+    statement = (
+        select(
+            Video.id,
+            Video.title,
+            Video.id_user,
+            Video.uploaded_at,
+            Video.processed_at,
+            Video.processed_duration_seconds,
+            Video.file_processed_url,
+            Video.votes,
+        )
+        .where(Video.status == VideoStatus.PROCESSED.value)
+        .order_by(Video.processed_at, Video.id)
+    )
+    return export_response(db, "videos", statement, Video.processed_at, since, format)
+
+
+@router_exports.get("/votes")
+def export_votes(
+    format: ExportFormat = Query(ExportFormat.NDJSON, description="csv o ndjson"),
+    since: datetime.datetime = Query(None, description="Solo votos emitidos después de esta fecha"),
+    db: Session = Depends(get_db),
+    auth: HTTPAuthorizationCredentials = Depends(bearer),
+):
+    """
+    Exportar los votos ordenados por `voted_at`.
+    Para cargas incrementales, enviar en `since` la cabecera X-Export-Watermark anterior.
+    """
+    get_current_admin(db, auth.credentials)
+
+    statement = (
+        select(Vote.id_video, Vote.id_user, Vote.voted_at)
+        .order_by(Vote.voted_at, Vote.id_video, Vote.id_user)
+    )
+    return export_response(db, "votes", statement, Vote.voted_at, since, format)
+
+
+@router_exports.get("/rankings")
+def export_rankings(
+    format: ExportFormat = Query(ExportFormat.NDJSON, description="csv o ndjson"),
+    since: datetime.datetime = Query(None, description="Solo filas actualizadas después de esta fecha"),
+    db: Session = Depends(get_db),
+    auth: HTTPAuthorizationCredentials = Depends(bearer),
+):
+    """
+    Exportar el ranking precalculado (votos y videos procesados por usuario)
+    ordenado por `updated_at`. La posición se calcula a partir de `total_votes`.
+    """
+    get_current_admin(db, auth.credentials)
+
+    statement = (
+        select(
+            UserRanking.id_user,
+            UserRanking.first_name,
+            UserRanking.last_name,
+            UserRanking.city,
+            UserRanking.total_votes,
+            UserRanking.processed_videos,
+            UserRanking.updated_at,
+        )
+        .order_by(UserRanking.updated_at, UserRanking.id_user)
+    )
+    return export_response(db, "rankings", statement, UserRanking.updated_at, since, format)
@@ -1,43 +1,157 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.security.http import HTTPAuthorizationCredentials, HTTPBearer
-from starlette.responses import JSONResponse
+from starlette.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import func, select, update, literal, tuple_, DateTime
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from fastapi import Query
+import asyncio
+import datetime
 import logging
 
-from ..core.security import verify_token
+from ..core.responses import FastJSONResponse
+from ..core.security import get_current_principal
+from ..core.vote_aggregator import vote_aggregator
+from ..core.live_updates import live_updates
+from ..core.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    encode_cursor,
+    decode_cursor,
+    next_cursor_headers,
+)
+from ..core.conditional import (
+    conditional_headers,
+    is_not_modified,
+    make_etag,
+    not_modified_response,
+    public_cache_control,
+)
 
+from shared.cache import (
+    response_cache,
+    invalidate_public_reads,
+    PUBLIC_VIDEOS_CACHE,
+    RANKINGS_CACHE,
+)
+from shared.config.settings import settings
 from shared.db.config import get_db
-from shared.db.models.user import User
 from shared.db.models.video import Video, VideoStatus
 from shared.db.models.vote import Vote
+from shared.db.models.user_ranking import UserRanking
+from shared.db.rankings import add_video_votes_statement, normalize_city
 
 logger = logging.getLogger(__name__)
 
 router_public = APIRouter()
 bearer = HTTPBearer()
 
+
+def cached_json_response(request: Request, namespace: str, key: str, ttl: float, build) -> Response:
+    """
+    Sirve la respuesta desde la caché de lecturas públicas o la construye con `build`
+    (que retorna (contenido, cabeceras)). El ETag se calcula una vez al llenar la caché,
+    así un If-None-Match que coincide se responde con 304 sin consultar la BD.
+    Cabecera X-Cache: HIT | MISS.
+    """
+    def render():
+        content, headers = build()
+        body = FastJSONResponse(content=content).body
+        return body, {**headers, "ETag": make_etag(body)}
+
+    cached, hit = response_cache.get_or_set(namespace, key, ttl, render)
+    last_modified = datetime.datetime.fromtimestamp(cached.stored_at, datetime.timezone.utc)
+    validators = conditional_headers(cached.headers["ETag"], public_cache_control(ttl), last_modified)
+    cache_header = {"X-Cache": "HIT" if hit else "MISS"}
+
+    if is_not_modified(request, cached.headers["ETag"], last_modified):
+        return not_modified_response({**validators, **cache_header})
+
+    return Response(
+        content=cached.body,
+        media_type="application/json",
+        headers={**cached.headers, **validators, **cache_header},
+    )
+
+
 @router_public.get("/videos")
-def get_all_public_videos(db: Session = Depends(get_db)):
+def get_all_public_videos(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Videos por página"),
+    cursor: str = Query(None, description="Cursor de la cabecera X-Next-Cursor"),
+    db: Session = Depends(get_db)
+):
+    """
+    Obtener los videos que ya fueron procesados y estan listos para votacion,
+    del más reciente al más antiguo. La siguiente página se pide con `cursor`.
+    """
+    after = decode_cursor(cursor, (datetime.datetime, str))
+
+    def build():
+        videos, next_cursor = public_videos_page(db, limit, after)
+        return videos, next_cursor_headers(next_cursor)
+
+    return cached_json_response(
+        request,
+        PUBLIC_VIDEOS_CACHE,
+        f"{limit}:{cursor or ''}",
+        settings.cache_ttl_public_videos,
+        build,
+    )
+
+
+def public_videos_page(db: Session, limit: int, after=None):
     """
-    Obtener todos los videos que ya fueron procesados y estan listos para votacion
+    Página de videos procesados ordenada por (processed_at, id) descendente (keyset).
+    Recorre el índice parcial ix_videos_public_processed_at; un video procesado
+    siempre tiene processed_at (lo fijan el worker y la deduplicación).
     """
-    videos = db.query(Video).filter(Video.status == VideoStatus.PROCESSED.value).all()
-    
-    return [
+    query = db.query(
+        Video.id,
+        Video.title,
+        Video.file_processed_url,
+        Video.uploaded_at,
+        Video.processed_at,
+        Video.votes,
+    ).filter(
+        Video.status == VideoStatus.PROCESSED.value,
+        Video.processed_at.isnot(None),
+    )
+
+    if after is not None:
+        processed_at, video_id = after
+        query = query.filter(
+            tuple_(Video.processed_at, Video.id) < tuple_(processed_at, video_id)
+        )
+
+    rows = (
+        query
+        .order_by(Video.processed_at.desc(), Video.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1].processed_at, rows[-1].id])
+
+    videos = [
         {
-            "id": video.id,
-            "title": video.title,
-            "file_processed_url": video.file_processed_url,
-            "uploaded_at": video.uploaded_at,
-            "processed_at": video.processed_at,
-            "votes": video.votes
+            "id": row.id,
+            "title": row.title,
+            "file_processed_url": row.file_processed_url,
+            "uploaded_at": row.uploaded_at,
+            "processed_at": row.processed_at,
+            "votes": row.votes
         }
-        for video in videos
+        for row in rows
     ]
+    return videos, next_cursor
+
 
-@router_public.post('/videos/{video_id}/vote', response_class=JSONResponse)
+@router_public.post('/videos/{video_id}/vote', response_class=FastJSONResponse)
 def vote_for_video(
     video_id: str,
     db: Session = Depends(get_db),
@@ -47,82 +161,217 @@ def vote_for_video(
     Emitir un voto por un video público (solo 1 voto por usuario por video).
     """
     # Obtener usuario desde JWT
-    user_email = verify_token(auth.credentials)
-    user = db.query(User).filter(User.email == user_email).first()
+    user = get_current_principal(db, auth.credentials)
 
     if not user:
         raise HTTPException(status_code=401, detail={"message": "Usuario no autorizado"})
 
-    # Verificar existencia del video y que esté procesado
-    video = db.query(Video).filter(Video.id == video_id, Video.status == VideoStatus.PROCESSED.value).first()
-
-    if not video:
-        raise HTTPException(status_code=404, detail={"message": "Video no encontrado o aún no está disponible públicamente"})
-
-    # Verificar si ya votó por ese video
-    existing_vote = db.query(Vote).filter(Vote.id_user == user.id, Vote.id_video == video_id).first()
-
-    if existing_vote:
-        raise HTTPException(status_code=400, detail={"message": "Ya has votado por este video"})
-
-    # Crear voto
-    new_vote = Vote(id_user=user.id, id_video=video_id)
-
+    write_behind = settings.vote_write_behind
     try:
-        db.add(new_vote)
-        # Incrementar contador de votos
-        video.votes += 1
+        inserted, video_found = cast_vote(db, video_id, user.id, increment=not write_behind)
         db.commit()
     except Exception as e:
         db.rollback()
+        logger.error(f"Error registrando voto: {str(e)}")
         raise HTTPException(status_code=400, detail={"message": "Error al registrar el voto"})
 
-    return JSONResponse(status_code=200,
+    if not video_found:
+        raise HTTPException(status_code=404, detail={"message": "Video no encontrado o aún no está disponible públicamente"})
+
+    if not inserted:
+        raise HTTPException(status_code=400, detail={"message": "Ya has votado por este video"})
+
+    if write_behind:
+        # El voto ya es durable; el contador se suma (e invalida la caché) por lotes
+        vote_aggregator.add(video_id)
+    else:
+        invalidate_public_reads()
+
+    return FastJSONResponse(status_code=200,
                         content={'message': "Voto registrado exitosamente."})
 
+
+def cast_vote(db: Session, video_id: str, user_id: str, increment: bool = True):
+    """
+    Registra el voto e incrementa `videos.votes` y el ranking del dueño solo si el voto
+    se insertó (INSERT ... ON CONFLICT DO NOTHING + UPDATE ... + 1, sin leer y reescribir contadores).
+    Con `increment=False` solo registra el voto (conteo diferido).
+    Retorna (voto insertado, video existe y está procesado). No hace commit.
+    """
+    now = literal(datetime.datetime.utcnow(), DateTime)
+    processed_video = select(Video.id, Video.id_user.label("owner")).where(
+        Video.id == video_id, Video.status == VideoStatus.PROCESSED.value
+    )
+
+    if db.get_bind().dialect.name == "postgresql":
+        # Un solo round trip: los CTE de escritura se ejecutan siempre, completos
+        video = processed_video.cte("video")
+        inserted = (
+            pg_insert(Vote)
+            .from_select(
+                ["id_video", "id_user", "voted_at"],
+                select(video.c.id, literal(user_id), now),
+            )
+            .on_conflict_do_nothing()
+            .returning(Vote.id_video)
+            .cte("inserted")
+        )
+        statement = select(
+            select(func.count()).select_from(video).scalar_subquery().label("found"),
+            select(func.count()).select_from(inserted).scalar_subquery().label("inserted"),
+        )
+        if increment:
+            statement = statement.add_cte(
+                update(Video)
+                .where(Video.id.in_(select(inserted.c.id_video)))
+                .values(votes=Video.votes + 1)
+                .cte("updated_video"),
+                update(UserRanking)
+                .where(
+                    UserRanking.id_user.in_(
+                        select(video.c.owner).where(
+                            video.c.id.in_(select(inserted.c.id_video))
+                        )
+                    )
+                )
+                .values(total_votes=UserRanking.total_votes + 1)
+                .cte("updated_ranking"),
+            )
+        row = db.execute(statement).one()
+        return row.inserted > 0, row.found > 0
+
+    # SQLite (pruebas): misma semántica dentro de la transacción, que serializa escrituras
+    result = db.execute(
+        sqlite_insert(Vote)
+        .from_select(
+            ["id_video", "id_user", "voted_at"],
+            processed_video.with_only_columns(Video.id, literal(user_id), now),
+        )
+        .on_conflict_do_nothing()
+    )
+    if result.rowcount:
+        if increment:
+            db.execute(
+                update(Video).where(Video.id == video_id).values(votes=Video.votes + 1)
+            )
+            db.execute(add_video_votes_statement(), {"b_video_id": video_id, "b_votes": 1})
+        return True, True
+
+    video_found = db.execute(
+        select(Video.id).where(
+            Video.id == video_id, Video.status == VideoStatus.PROCESSED.value
+        )
+    ).first()
+    return False, video_found is not None
+
+
 @router_public.get("/rankings")
 def get_rankings(
+    request: Request,
     city: str = Query(None, description="Filtrar por ciudad"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Posiciones por página"),
+    cursor: str = Query(None, description="Cursor de la cabecera X-Next-Cursor"),
     db: Session = Depends(get_db)
 ):
     """
-    Devuelve el ranking de usuarios basado en la suma de votos de sus videos procesados,
-    agrupados por usuario. Soporta filtro opcional por ciudad.
+    Devuelve el ranking de usuarios según la suma de votos de sus videos procesados
+    (tabla precalculada `user_rankings`). Soporta filtro opcional por ciudad
+    y paginación con `cursor`.
     """
-    try:
-        query = (
-            db.query(
-                Video.id_user,
-                func.sum(Video.votes).label("total_votes"),
-                User.first_name,
-                User.last_name,
-                User.city,
-            )
-            .join(User, User.id == Video.id_user)
-            .filter(Video.status == VideoStatus.PROCESSED.value)
-        )
+    after = decode_cursor(cursor, (int, str, int))
+
+    def build():
+        try:
+            rankings, next_cursor = rankings_page(db, city, limit, after)
+        except Exception:
+            logger.exception("Error obteniendo el ranking")
+            raise HTTPException(status_code=400, detail={"message": "Error al obtener el ranking"})
+        return rankings, next_cursor_headers(next_cursor)
+
+    city_key = normalize_city(city) if city else ""
+    return cached_json_response(
+        request,
+        RANKINGS_CACHE,
+        f"{city_key}:{limit}:{cursor or ''}",
+        settings.cache_ttl_rankings,
+        build,
+    )
+
 
-        if city:
-            query = query.filter(func.lower(User.city) == city.lower())
+def rankings_page(db: Session, city, limit: int, after=None):
+    """Página del ranking ordenada por (total_votes, id_user) descendente (keyset)"""
+    query = db.query(
+        UserRanking.id_user,
+        UserRanking.first_name,
+        UserRanking.last_name,
+        UserRanking.city,
+        UserRanking.total_votes,
+    )
 
-        result = (
-            query
-            .group_by(Video.id_user, User.first_name, User.last_name, User.city)
-            .order_by(desc("total_votes"))
-            .all()
+    if city:
+        query = query.filter(UserRanking.city_normalized == normalize_city(city))
+
+    position = 0
+    if after is not None:
+        total_votes, id_user, position = after
+        query = query.filter(
+            tuple_(UserRanking.total_votes, UserRanking.id_user) < tuple_(total_votes, id_user)
         )
 
-        rankings = []
-        for idx, row in enumerate(result):
-            rankings.append({
-                "position": idx + 1,
-                "username": f"{row.first_name} {row.last_name}",
-                "city": row.city,
-                "votes": row.total_votes or 0
-            })
+    # Recorre el índice (ciudad, votos, usuario) y se detiene en `limit`
+    rows = (
+        query
+        .order_by(UserRanking.total_votes.desc(), UserRanking.id_user.desc())
+        .limit(limit + 1)
+        .all()
+    )
 
-        return rankings
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([last.total_votes, last.id_user, position + limit])
 
-    except Exception as e:
-        print("Error en get_rankings:", e)
-        raise HTTPException(status_code=400, detail="Error al obtener el ranking")
+    rankings = []
+    for idx, row in enumerate(rows):
+        rankings.append({
+            "position": position + idx + 1,
+            "username": f"{row.first_name} {row.last_name}",
+            "city": row.city,
+            "votes": row.total_votes
+        })
+    return rankings, next_cursor
+
+
+@router_public.get("/live")
+async def live_rankings():
+    """
+    Server-Sent Events con el ranking y los votos en vivo: un evento `snapshot` con el
+    top del ranking y luego eventos `update` con los cambios, como máximo uno por intervalo
+    ({"rankings": {posición: entrada}, "videos": {video_id: votos}}).
+    El stream termina cuando la API se apaga (live_updates.shutdown).
+    """
+    async def events():
+        subscriber = live_updates.subscribe()
+        try:
+            yield live_updates.snapshot_message()
+            while not live_updates.closing:
+                try:
+                    await asyncio.wait_for(
+                        subscriber.event.wait(), settings.live_updates_keepalive_seconds
+                    )
+                except asyncio.TimeoutError:
+                    # Mantiene viva la conexión a través de proxies
+                    yield b": ping\n\n"
+                    continue
+                if live_updates.closing:
+                    break
+                yield subscriber.take()
+        finally:
+            live_updates.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,304 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security.http import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy.orm import Session
+import io
+import math
+import uuid
+import logging
+
+from ..core.responses import FastJSONResponse
+from ..core.security import get_current_principal
+from ..schemas.videos_schemas import CreateUploadSessionRequest
+from .videos_api import register_uploaded_video
+
+from shared.storage import storage_manager
+from shared.media import probe_mp4, MP4ProbeError
+from shared.config.settings import settings
+from shared.db.config import get_db
+from shared.db.models.upload_session import UploadSession, UploadPart
+
+logger = logging.getLogger(__name__)
+
+router_uploads = APIRouter()
+
+bearer = HTTPBearer()
+
+
+def get_user_session(db: Session, token: str, upload_id: str) -> UploadSession:
+    """Obtiene la sesión de subida del usuario autenticado o responde 404"""
+    user = get_current_principal(db, token)
+
+    upload = (
+        db.query(UploadSession)
+        .filter(UploadSession.id == upload_id, UploadSession.id_user == user.id)
+        .first()
+    )
+    if upload is None:
+        raise HTTPException(
+            status_code=404,
+            detail={"message": "La sesión de subida no existe o no pertenece al usuario"},
+        )
+    return upload
+
+
+def upload_progress(db: Session, upload: UploadSession) -> dict:
+    total_chunks = math.ceil(upload.total_size / upload.chunk_size)
+    received = dict(
+        db.query(UploadPart.part_number, UploadPart.size)
+        .filter(UploadPart.id_session == upload.id)
+        .all()
+    )
+    return {
+        "upload_id": upload.id,
+        "total_size": upload.total_size,
+        "chunk_size": upload.chunk_size,
+        "total_chunks": total_chunks,
+        "received_bytes": sum(received.values()),
+        "received_chunks": sorted(received),
+        "missing_chunks": [
+            n for n in range(1, total_chunks + 1) if n not in received
+        ],
+    }
+
+
+@router_uploads.post("", response_class=FastJSONResponse)
+def create_upload_session(
+    request_data: CreateUploadSessionRequest,
+    db: Session = Depends(get_db),
+    auth: HTTPAuthorizationCredentials = Depends(bearer),
+):
+    """
+    Crear una sesión de subida reanudable.
+    El cliente envía luego las partes numeradas (desde 1) de `chunk_size` bytes.
+    """
+
+    # Autenticación
+    user = get_current_principal(db, auth.credentials)
+
+    if not request_data.filename.lower().endswith(".mp4"):
+        raise HTTPException(
+            status_code=400, detail={"message": "El archivo debe ser MP4"}
+        )
+
+    if request_data.total_size > settings.max_upload_bytes:
+        raise HTTPException(
+            status_code=400, detail={"message": "El archivo excede el límite de 100MB"}
+        )
+
+    video_id = str(uuid.uuid4())
+    filename = f"{video_id}.mp4"
+
+    try:
+        storage_upload_id = storage_manager.start_video_multipart(video_id, filename)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail={"message": f"Error al iniciar la subida: {str(e)}"},
+        )
+
+    upload = UploadSession(
+        id=video_id,
+        id_user=user.id,
+        title=request_data.title,
+        filename=filename,
+        total_size=request_data.total_size,
+        chunk_size=settings.upload_session_chunk_size,
+        storage_upload_id=storage_upload_id,
+    )
+    db.add(upload)
+    db.commit()
+
+    return FastJSONResponse(status_code=201, content=upload_progress(db, upload))
+
+
+@router_uploads.get("/{upload_id}", response_class=FastJSONResponse)
+def get_upload_session(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    auth: HTTPAuthorizationCredentials = Depends(bearer),
+):
+    """
+    Consultar el progreso de una subida (partes recibidas y faltantes)
+    """
+    upload = get_user_session(db, auth.credentials, upload_id)
+    return FastJSONResponse(status_code=200, content=upload_progress(db, upload))
+
+
+def expected_chunk_size(upload: UploadSession, part_number: int, offset: int) -> int:
+    """Tamaño que debe tener la parte; 400 si el número de parte o el offset no son válidos"""
+    total_chunks = math.ceil(upload.total_size / upload.chunk_size)
+    if part_number < 1 or part_number > total_chunks:
+        raise HTTPException(
+            status_code=400, detail={"message": "Número de parte inválido"}
+        )
+
+    if offset != (part_number - 1) * upload.chunk_size:
+        raise HTTPException(
+            status_code=400,
+            detail={"message": "El offset no corresponde al número de parte"},
+        )
+
+    return min(upload.chunk_size, upload.total_size - offset)
+
+
+def store_chunk(
+    db: Session, upload: UploadSession, part_number: int, offset: int, body: bytes
+) -> FastJSONResponse:
+    if len(body) != expected_chunk_size(upload, part_number, offset):
+        raise HTTPException(
+            status_code=400, detail={"message": "Tamaño de parte inválido"}
+        )
+
+    try:
+        etag = storage_manager.upload_video_part(
+            upload.id,
+            upload.filename,
+            upload.storage_upload_id,
+            part_number,
+            io.BytesIO(body),
+            offset,
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail={"message": f"Error al guardar la parte: {str(e)}"}
+        )
+
+    # Reenviar una parte la reemplaza
+    db.merge(
+        UploadPart(
+            id_session=upload.id, part_number=part_number, size=len(body), etag=etag
+        )
+    )
+    db.commit()
+
+    return FastJSONResponse(status_code=200, content=upload_progress(db, upload))
+
+
+@router_uploads.put("/{upload_id}/chunks/{part_number}", response_class=FastJSONResponse)
+async def upload_chunk(
+    upload_id: str,
+    part_number: int,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    db: Session = Depends(get_db),
+    auth: HTTPAuthorizationCredentials = Depends(bearer),
+):
+    """
+    Subir una parte (cuerpo binario). Cada petición transfiere como máximo `chunk_size` bytes.
+    """
+    # Usuario, sesión y tamaño esperado antes de leer el cuerpo
+    upload = await run_in_threadpool(get_user_session, db, auth.credentials, upload_id)
+    max_chunk = expected_chunk_size(upload, part_number, offset)
+
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_chunk:
+        raise HTTPException(
+            status_code=400, detail={"message": "Tamaño de parte inválido"}
+        )
+
+    body = bytearray()
+    async for data in request.stream():
+        body.extend(data)
+        if len(body) > max_chunk:
+            raise HTTPException(
+                status_code=400, detail={"message": "Tamaño de parte inválido"}
+            )
+
+    # Almacenamiento y BD son bloqueantes: fuera del event loop
+    return await run_in_threadpool(
+        store_chunk, db, upload, part_number, offset, bytes(body)
+    )
+
+
+@router_uploads.post("/{upload_id}/complete", response_class=FastJSONResponse)
+def complete_upload_session(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    auth: HTTPAuthorizationCredentials = Depends(bearer),
+):
+    """
+    Finalizar la subida: une las partes, valida el MP4, crea el video y encola el procesamiento.
+    El SHA-256 para deduplicar lo calcula el worker al leer el original: aquí ninguna
+    operación lee el archivo completo.
+    """
+    upload = get_user_session(db, auth.credentials, upload_id)
+
+    progress = upload_progress(db, upload)
+    if progress["missing_chunks"]:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": "Faltan partes por subir",
+                "missing_chunks": progress["missing_chunks"],
+            },
+        )
+
+    # Un reintento tras un fallo al registrar encuentra las partes ya unidas
+    if storage_manager.get_video_size(upload.id, upload.filename) == upload.total_size:
+        file_url = storage_manager.get_video_url(upload.id, upload.filename)
+    else:
+        parts = [(part.part_number, part.etag) for part in upload.parts]
+        try:
+            file_url = storage_manager.complete_video_multipart(
+                upload.id, upload.filename, upload.storage_upload_id, parts
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail={"message": f"Error al unir las partes: {str(e)}"},
+            )
+
+    # Validar cabeceras MP4 leyendo solo los átomos necesarios del archivo almacenado
+    try:
+        with storage_manager.open_video(file_url) as video_file:
+            media_info = probe_mp4(video_file)
+    except MP4ProbeError:
+        storage_manager.delete_video(file_url)
+        db.delete(upload)
+        db.commit()
+        raise HTTPException(
+            status_code=400, detail={"message": "El archivo no es un video MP4 válido"}
+        )
+
+    # La sesión se elimina en la misma transacción que crea el video; si la BD falla
+    # el archivo unido se conserva y /complete se puede reintentar
+    db.delete(upload)
+    return register_uploaded_video(
+        db,
+        video_id=upload.id,
+        title=upload.title,
+        id_user=upload.id_user,
+        file_url=file_url,
+        file_size=upload.total_size,
+        content_sha256=None,
+        media_info=media_info,
+        delete_file_on_error=False,
+    )
+
+
+@router_uploads.delete("/{upload_id}", response_class=FastJSONResponse)
+def abort_upload_session(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    auth: HTTPAuthorizationCredentials = Depends(bearer),
+):
+    """
+    Cancelar una subida y descartar las partes recibidas
+    """
+    upload = get_user_session(db, auth.credentials, upload_id)
+
+    try:
+        storage_manager.abort_video_multipart(
+            upload.id, upload.filename, upload.storage_upload_id
+        )
+    except Exception as e:
+        logger.warning(f"Error descartando partes: {str(e)}")
+
+    db.delete(upload)
+    db.commit()
+
+    return FastJSONResponse(
+        status_code=200,
+        content={"message": "La subida fue cancelada", "upload_id": upload_id},
+    )
@@ -1,24 +1,41 @@
-from celery import Celery
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security.http import HTTPAuthorizationCredentials, HTTPBearer
-from fastapi.encoders import jsonable_encoder
-from starlette.responses import JSONResponse
 from sqlalchemy.orm import Session
+from sqlalchemy import or_, and_, case, func, tuple_
+from typing import Optional
 import uuid
 import datetime
-import os
-import shutil
 import logging
 
-from ..core.security import verify_token
-
-from shared.broker import create_celery_app
-from shared.storage import storage_manager
+from ..core.responses import FastJSONResponse
+from ..core.security import get_current_principal
+from ..core.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    encode_cursor,
+    decode_cursor,
+    next_cursor_headers,
+)
+from ..core.conditional import (
+    PRIVATE_CACHE_CONTROL,
+    conditional_headers,
+    is_not_modified,
+    make_etag,
+    not_modified_response,
+)
+
+from shared.broker import PROCESS_VIDEO_TASK
+from shared.storage import storage_manager, AsyncLimitedReader, UploadTooLargeError
+from shared.media import probe_mp4, MP4Info, MP4ProbeError
 from shared.config.settings import settings
 from shared.db.config import get_db
-from shared.db.models.user import User
 from shared.db.models.video import Video, VideoStatus
-from shared.db.models.vote import Vote
+from shared.db.models.outbox import OutboxMessage
+from shared.db.rankings import add_processed_video
+from shared.db.dedup import find_processed_duplicate
+from shared.cache import invalidate_public_reads
+from shared.metrics.api_metrics import upload_dedup_lookups, upload_dedup_hits
 
 logger = logging.getLogger(__name__)
 
@@ -27,8 +44,8 @@ router_videos = APIRouter()
 bearer = HTTPBearer()
 
 
-@router_videos.post("/upload", response_class=JSONResponse)
-def upload_video(
+@router_videos.post("/upload", response_class=FastJSONResponse)
+async def upload_video(
     title: str = Form(..., min_length=1, max_length=255),
     video_file: UploadFile = File(...),
     db: Session = Depends(get_db),
@@ -40,9 +57,8 @@ def upload_video(
     - title: Título descriptivo del video
     """
 
-    # Autenticación
-    user_email = verify_token(auth.credentials)
-    user = db.query(User).filter(User.email == user_email).first()
+    # Autenticación (BD bloqueante: fuera del event loop)
+    user = await run_in_threadpool(get_current_principal, db, auth.credentials)
 
     # Validaciones del archivo
     if not video_file.filename:
@@ -55,94 +71,142 @@ def upload_video(
             status_code=400, detail={"message": "El archivo debe ser MP4"}
         )
 
-    # Verificar tamaño del archivo (100MB máximo)
-    file_size = 0
-    content = video_file.file.read()
-    file_size = len(content)
-    video_file.file.seek(0)  # Resetear posición del archivo
-
-    if file_size > 100 * 1024 * 1024:  # 100MB en bytes
+    # Validar cabeceras MP4 (sin ffprobe) antes de guardar o encolar
+    try:
+        media_info = await run_in_threadpool(probe_mp4, video_file.file)
+    except MP4ProbeError:
         raise HTTPException(
-            status_code=400, detail={"message": "El archivo excede el límite de 100MB"}
+            status_code=400, detail={"message": "El archivo no es un video MP4 válido"}
         )
 
     # Generar nombre único para el archivo
     video_id = str(uuid.uuid4())
     filename = f"{video_id}.mp4"
 
-    # Guardar archivo
+    # Guardar archivo por bloques con E/S asíncrona, verificando el tamaño (100MB máximo)
+    reader = AsyncLimitedReader(video_file, settings.max_upload_bytes)
     try:
-        file_url = storage_manager.upload_video(video_file.file, video_id, filename)
+        file_url = await storage_manager.upload_video_async(reader, video_id, filename)
+    except UploadTooLargeError:
+        raise HTTPException(
+            status_code=400, detail={"message": "El archivo excede el límite de 100MB"}
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500, detail={"message": f"Error al guardar archivo: {str(e)}"}
         )
 
+    return await run_in_threadpool(
+        register_uploaded_video,
+        db,
+        video_id=video_id,
+        title=title,
+        id_user=user.id,
+        file_url=file_url,
+        file_size=reader.bytes_read,
+        content_sha256=reader.sha256,
+        media_info=media_info,
+    )
+
+
+def register_uploaded_video(
+    db: Session,
+    video_id: str,
+    title: str,
+    id_user: str,
+    file_url: str,
+    file_size: int,
+    content_sha256: Optional[str],
+    media_info: Optional[MP4Info] = None,
+    delete_file_on_error: bool = True,
+) -> FastJSONResponse:
+    """
+    Crea el registro del video ya almacenado y encola su procesamiento (outbox),
+    o reutiliza la versión procesada de un video con el mismo contenido.
+    Con `delete_file_on_error=False` el archivo se conserva si falla la BD (para reintentar).
+    """
+    now = datetime.datetime.utcnow()
+
+    # Deduplicación por contenido: un video idéntico ya procesado no se vuelve a procesar
+    duplicate = None
+    if content_sha256:
+        upload_dedup_lookups.inc()
+        duplicate = find_processed_duplicate(db, content_sha256)
+
+    # Para pruebas de carga, no se envía tarea a Celery
+    testing = settings.environment == "testing"
+    task_id = None
+    if duplicate is None:
+        task_id = "test-task-id" if testing else str(uuid.uuid4())
+
     # Crear registro en base de datos
     video_new = Video(
         id=video_id,
         title=title,
         status=VideoStatus.UPLOADED.value,
-        id_user=user.id,
-        uploaded_at=datetime.datetime.now(datetime.timezone.utc),
+        id_user=id_user,
+        uploaded_at=now,
         file_original_url=file_url,
         file_size_bytes=file_size,
+        content_sha256=content_sha256,
+        original_duration_seconds=media_info.duration_seconds if media_info else None,
+        original_resolution=media_info.resolution if media_info else None,
+        celery_task_id=None if testing else task_id,
     )
 
+    if duplicate is not None:
+        video_new.status = VideoStatus.PROCESSED.value
+        video_new.file_processed_url = duplicate.file_processed_url
+        video_new.processed_duration_seconds = duplicate.processed_duration_seconds
+        video_new.processed_resolution = duplicate.processed_resolution
+        video_new.processing_started_at = now
+        video_new.processed_at = now
+
     try:
         db.add(video_new)
+        if duplicate is not None:
+            add_processed_video(db, id_user)
+        if task_id is not None and not testing:
+            # Mensaje para la cola 'uploaded-videos' en la misma transacción;
+            # el outbox relay lo publica en el broker
+            db.add(
+                OutboxMessage(
+                    id=task_id,
+                    task_name=PROCESS_VIDEO_TASK,
+                    queue=settings.queue_name,
+                    payload={"args": [video_id]},
+                    id_video=video_id,
+                )
+            )
         db.commit()
-        db.refresh(video_new)
     except Exception as e:
         db.rollback()
         # Limpiar archivo si falla la BD
-        try:
-            storage_manager.delete_video(file_url)
-        except:
-            pass
+        if delete_file_on_error:
+            try:
+                storage_manager.delete_video(file_url)
+            except:
+                pass
         raise HTTPException(
             status_code=500,
             detail={"message": f"Error al guardar en base de datos: {str(e)}"},
         )
 
-    # Para pruebas de carga, no se envía tarea a Celery
-    if settings.environment == "testing":
-        return JSONResponse(
-            status_code=202,
+    if duplicate is not None:
+        upload_dedup_hits.inc()
+        invalidate_public_reads()
+        return FastJSONResponse(
+            status_code=201,
             content={
-                "message": "Video subido correctamente. Procesamiento en curso.",
-                "task_id": "test-task-id",
+                "message": "Video subido correctamente. Se reutilizó una versión ya procesada.",
+                "task_id": None,
             },
+            # task_id: null indica que no hay procesamiento en curso
+            exclude_none=False,
         )
 
-    # Enviar mensaje a cola 'uploaded-videos' con Celery
-    try:
-        # Configuración de Celery
-        celery_app = create_celery_app(
-            "video_processor", ["worker.tasks.video_processing"]
-        )
-
-        # Enviar tarea a la cola
-        task = celery_app.send_task(
-            "worker.tasks.video_processing.process_video_task",
-            args=[video_new.id],
-            queue=settings.queue_name,
-        )
-
-        # Actualizar video con task_id
-        video_new.celery_task_id = task.id
-        video_new.status = VideoStatus.PROCESSING.value
-        video_new.processing_started_at = datetime.datetime.now(datetime.timezone.utc)
-        db.commit()
-
-        task_id = task.id
-
-    except Exception as e:
-        logger.error(f"Error enviando tarea a Celery: {str(e)}")
-        task_id = "error-celery"
-
-    return JSONResponse(
-        status_code=201,
+    return FastJSONResponse(
+        status_code=202 if testing else 201,
         content={
             "message": "Video subido correctamente. Procesamiento en curso.",
             "task_id": task_id,
@@ -150,74 +214,168 @@ def upload_video(
     )
 
 
-@router_videos.get("/", response_class=JSONResponse)
+@router_videos.get("/", response_class=FastJSONResponse)
 def get_videos(
-    db: Session = Depends(get_db), auth: HTTPAuthorizationCredentials = Depends(bearer)
+    request: Request,
+    status: Optional[VideoStatus] = Query(None, description="Filtrar por estado"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Videos por página"),
+    cursor: str = Query(None, description="Cursor de la cabecera X-Next-Cursor"),
+    db: Session = Depends(get_db),
+    auth: HTTPAuthorizationCredentials = Depends(bearer),
 ):
     """
-    Obtener todos los videos del usuario autenticado
+    Obtener los videos del usuario autenticado, agrupados por estado y del más reciente
+    al más antiguo. Filtro opcional por `status`; la siguiente página se pide con `cursor`.
+    Responde 304 si If-None-Match coincide, sin consultar ni serializar la página.
     """
 
     # Autenticación
-    user_email = verify_token(auth.credentials)
-    user = db.query(User).filter(User.email == user_email).first()
+    user = get_current_principal(db, auth.credentials)
+    after = decode_cursor(cursor, (int, datetime.datetime, str))
 
-    processed_videos = (
-        db.query(Video)
-        .filter(Video.id_user == user.id, Video.status == VideoStatus.PROCESSED.value)
-        .all()
+    # Validador barato (un agregado sobre los videos del usuario) antes de armar la página
+    etag = make_etag(
+        [user_videos_version(db, user.id), status, limit, cursor], weak=True
     )
+    validators = conditional_headers(etag, PRIVATE_CACHE_CONTROL)
+    if is_not_modified(request, etag):
+        return not_modified_response(validators)
 
-    not_processed_videos = (
-        db.query(Video)
-        .filter(Video.id_user == user.id, Video.status != VideoStatus.PROCESSED.value)
-        .all()
+    videos, next_cursor = user_videos_page(db, user.id, status, limit, after)
+    return FastJSONResponse(
+        status_code=200,
+        content=videos,
+        headers={**validators, **next_cursor_headers(next_cursor)},
     )
 
-    videos = []
-    for video in processed_videos:
-        videos.append(
-            {
-                "video_id": video.id,
-                "title": video.title,
-                "status": video.status,
-                "uploaded_at": video.uploaded_at,
-                "processed_at": video.processed_at,
-                "processed_url": video.file_processed_url,
-            }
+
+def user_videos_version(db: Session, user_id: str) -> list:
+    """
+    Versión del listado del usuario: videos por estado y últimas fechas de subida,
+    inicio de procesamiento y procesamiento. Cambia con cada alta, baja o cambio de
+    estado (el worker y la deduplicación fijan esas fechas).
+    """
+    row = (
+        db.query(
+            *[
+                func.sum(case((Video.status == video_status.value, 1), else_=0))
+                for video_status in VideoStatus
+            ],
+            func.max(Video.uploaded_at),
+            func.max(Video.processing_started_at),
+            func.max(Video.processed_at),
         )
+        .filter(Video.id_user == user_id)
+        .one()
+    )
+    return list(row)
+
+
+# Orden del listado del usuario: primero los procesados (como antes), luego los que
+# están en curso y al final los fallidos
+USER_VIDEOS_STATUS_ORDER = [
+    VideoStatus.PROCESSED,
+    VideoStatus.PROCESSING,
+    VideoStatus.UPLOADED,
+    VideoStatus.FAILED,
+]
+status_rank = case(
+    {video_status.value: rank for rank, video_status in enumerate(USER_VIDEOS_STATUS_ORDER)},
+    value=Video.status,
+    else_=len(USER_VIDEOS_STATUS_ORDER),
+)
 
-    for video in not_processed_videos:
-        videos.append(
-            {
-                "video_id": video.id,
-                "title": video.title,
-                "status": video.status,
-                "uploaded_at": video.uploaded_at,
-            }
+
+def user_videos_page(db: Session, user_id: str, status, limit: int, after=None):
+    """
+    Página de videos del usuario en una sola consulta, proyectando solo las columnas
+    del listado. Orden (rango del estado, uploaded_at desc, id desc) con keyset sobre
+    esa misma clave; ix_videos_user_status_uploaded acota la consulta a los videos
+    del usuario (y del estado filtrado).
+    """
+    query = db.query(
+        Video.id,
+        Video.title,
+        Video.status,
+        Video.uploaded_at,
+        Video.processed_at,
+        Video.file_processed_url,
+        status_rank.label("status_rank"),
+    ).filter(Video.id_user == user_id)
+
+    if status is not None:
+        query = query.filter(Video.status == status.value)
+
+    if after is not None:
+        after_rank, uploaded_at, video_id = after
+        query = query.filter(
+            or_(
+                status_rank > after_rank,
+                and_(
+                    status_rank == after_rank,
+                    tuple_(Video.uploaded_at, Video.id) < tuple_(uploaded_at, video_id),
+                ),
+            )
         )
 
-    return JSONResponse(
-        status_code=200, content=jsonable_encoder(videos, exclude_none=True)
+    rows = (
+        query
+        .order_by(status_rank, Video.uploaded_at.desc(), Video.id.desc())
+        .limit(limit + 1)
+        .all()
     )
 
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([last.status_rank, last.uploaded_at, last.id])
 
-@router_videos.get("/{id_video}", response_class=JSONResponse)
+    videos = []
+    for row in rows:
+        video = {
+            "video_id": row.id,
+            "title": row.title,
+            "status": row.status,
+            "uploaded_at": row.uploaded_at,
+        }
+        if row.status == VideoStatus.PROCESSED.value:
+            video["processed_at"] = row.processed_at
+            video["processed_url"] = row.file_processed_url
+        videos.append(video)
+    return videos, next_cursor
+
+
+@router_videos.get("/{id_video}", response_class=FastJSONResponse)
 def get_video(
     id_video: str,
+    request: Request,
     db: Session = Depends(get_db),
     auth: HTTPAuthorizationCredentials = Depends(bearer),
 ):
     """
-    Obtener un video específico del usuario autenticado
+    Obtener un video específico del usuario autenticado.
+    El ETag se deriva de la misma fila que se devuelve (una búsqueda por clave primaria
+    proyectando solo las columnas de la respuesta): el 304 ahorra serializar y enviar
+    el cuerpo, no la consulta.
     """
 
     # Autenticación
-    user_email = verify_token(auth.credentials)
-    user = db.query(User).filter(User.email == user_email).first()
+    user = get_current_principal(db, auth.credentials)
 
     video = (
-        db.query(Video).filter(Video.id == id_video, Video.id_user == user.id).first()
+        db.query(
+            Video.id,
+            Video.title,
+            Video.status,
+            Video.uploaded_at,
+            Video.processed_at,
+            Video.file_original_url,
+            Video.file_processed_url,
+            Video.votes,
+        )
+        .filter(Video.id == id_video, Video.id_user == user.id)
+        .first()
     )
 
     if video is None:
@@ -228,39 +386,40 @@ def get_video(
             },
         )
 
-    return JSONResponse(
-        status_code=200,
-        content=jsonable_encoder(
-            {
-                "video_id": video.id,
-                "title": video.title,
-                "status": video.status,
-                "uploaded_at": video.uploaded_at,
-                "processed_at": (
-                    video.processed_at
-                    if video.status == VideoStatus.PROCESSED.value
-                    else None
-                ),
-                "original_url": (
-                    video.file_original_url
-                    if video.status == VideoStatus.UPLOADED.value
-                    else None
-                ),
-                "processed_url": (
-                    video.file_processed_url
-                    if video.status == VideoStatus.PROCESSED.value
-                    else None
-                ),
-                "votes": (
-                    video.votes if video.status == VideoStatus.PROCESSED.value else None
-                ),
-            },
-            exclude_none=True,
+    content = {
+        "video_id": video.id,
+        "title": video.title,
+        "status": video.status,
+        "uploaded_at": video.uploaded_at,
+        "processed_at": (
+            video.processed_at
+            if video.status == VideoStatus.PROCESSED.value
+            else None
         ),
-    )
+        "original_url": (
+            video.file_original_url
+            if video.status == VideoStatus.UPLOADED.value
+            else None
+        ),
+        "processed_url": (
+            video.file_processed_url
+            if video.status == VideoStatus.PROCESSED.value
+            else None
+        ),
+        "votes": (
+            video.votes if video.status == VideoStatus.PROCESSED.value else None
+        ),
+    }
+
+    # Versión del video: los campos que se devuelven (estado, fechas, votos)
+    validators = conditional_headers(make_etag(content, weak=True), PRIVATE_CACHE_CONTROL)
+    if is_not_modified(request, validators["ETag"]):
+        return not_modified_response(validators)
+
+    return FastJSONResponse(status_code=200, content=content, headers=validators)
 
 
-@router_videos.delete("/{id_video}", response_class=JSONResponse)
+@router_videos.delete("/{id_video}", response_class=FastJSONResponse)
 def delete_video(
     id_video: str,
     db: Session = Depends(get_db),
@@ -268,8 +427,7 @@ def delete_video(
 ):
 
     # Autenticación
-    user_email = verify_token(auth.credentials)
-    user = db.query(User).filter(User.email == user_email).first()
+    user = get_current_principal(db, auth.credentials)
 
     video = (
         db.query(Video).filter(Video.id == id_video, Video.id_user == user.id).first()
@@ -314,7 +472,7 @@ def delete_video(
             detail={"message": "Error al eliminar el video"},
         )
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=200,
         content={
             "message": "El vìdeo fue eliminado exitosamente",
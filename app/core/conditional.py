@@ -0,0 +1,85 @@
+import datetime
+import hashlib
+import json
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Request
+from starlette.responses import Response
+
+# Cache-Control de las lecturas privadas: el cliente guarda la respuesta pero revalida siempre
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+
+def public_cache_control(max_age: float) -> str:
+    """Permite a navegadores y proxies (nginx) reutilizar la respuesta durante `max_age`"""
+    return f"public, max-age={int(max_age)}"
+
+
+def make_etag(value: Any, weak: bool = False) -> str:
+    """
+    ETag a partir del cuerpo (bytes) o de un token de versión serializable.
+    Los derivados de un token de versión son débiles (W/): no garantizan bytes idénticos.
+    """
+    raw = value if isinstance(value, bytes) else json.dumps(value, default=str).encode()
+    tag = f'"{hashlib.sha1(raw).hexdigest()}"'
+    return f"W/{tag}" if weak else tag
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil (la que aplica a If-None-Match en GET)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return _opaque(etag) in {_opaque(tag) for tag in if_none_match.split(",")}
+
+
+def http_date(value: datetime.datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return format_datetime(value.astimezone(datetime.timezone.utc), usegmt=True)
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: Optional[datetime.datetime] = None
+) -> bool:
+    """If-None-Match tiene prioridad; If-Modified-Since solo se evalúa si no viene"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if last_modified is None or not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=datetime.timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=datetime.timezone.utc)
+    # Las fechas HTTP tienen resolución de segundos
+    return last_modified.replace(microsecond=0) <= since
+
+
+def conditional_headers(
+    etag: str,
+    cache_control: str,
+    last_modified: Optional[datetime.datetime] = None,
+) -> dict:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_modified_response(headers: dict) -> Response:
+    """304 sin cuerpo, con los mismos validadores que la respuesta completa"""
+    return Response(status_code=304, headers=headers)
@@ -0,0 +1,214 @@
+"""
+Actualizaciones en vivo (SSE, GET /api/public/live) del ranking y de los votos.
+
+Un solo productor por proceso: cada LIVE_UPDATES_INTERVAL_MS revisa las generaciones de la
+caché de respuestas, que se incrementan con cada voto, vaciado de votos diferidos y video
+procesado (locales con RESPONSE_CACHE_BACKEND=memory, compartidas entre procesos con redis).
+Solo si cambiaron consulta la BD, una vez, y reparte el delta a todos los suscriptores; sin
+eventos refresca igualmente cada LIVE_UPDATES_MAX_IDLE_SECONDS. Cada suscriptor acumula los
+deltas que aún no envió: un cliente lento recibe un único mensaje combinado.
+"""
+import asyncio
+import datetime
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import anyio.to_thread
+import orjson
+from sqlalchemy import func, select
+
+from shared.cache import response_cache, PUBLIC_VIDEOS_CACHE, RANKINGS_CACHE
+from shared.config.settings import settings
+from shared.db.config import SessionLocal
+from shared.db.models.user_ranking import UserRanking
+from shared.db.models.vote import Vote
+from shared.metrics.api_metrics import live_updates_subscribers, live_updates_refreshes
+
+logger = logging.getLogger(__name__)
+
+# Videos cuyo último conteo enviado se recuerda (para no repetir deltas)
+MAX_TRACKED_VIDEOS = 10000
+
+
+def format_event(event: str, data: dict) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+def merge_delta(pending: dict, delta: dict) -> dict:
+    return {
+        "rankings": {**pending["rankings"], **delta["rankings"]},
+        "videos": {**pending["videos"], **delta["videos"]},
+    }
+
+
+class Subscriber:
+    """Conexión SSE: guarda el delta pendiente de enviar"""
+
+    def __init__(self):
+        self.event = asyncio.Event()
+        self.delta = None
+        # Mensaje ya serializado, compartido por todos los suscriptores al día
+        self.message = None
+
+    def push(self, delta: dict, message: bytes) -> None:
+        if self.delta is None:
+            self.delta, self.message = delta, message
+        else:
+            self.delta = merge_delta(self.delta, delta)
+            self.message = None
+        self.event.set()
+
+    def take(self) -> bytes:
+        message = self.message or format_event("update", self.delta)
+        self.delta = self.message = None
+        self.event.clear()
+        return message
+
+
+class LiveUpdates:
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        interval_ms: int = settings.live_updates_interval_ms,
+        rankings_size: int = settings.live_updates_rankings_size,
+        max_idle_seconds: float = settings.live_updates_max_idle_seconds,
+        lag_seconds: float = settings.live_updates_lag_seconds,
+    ):
+        self.session_factory = session_factory
+        self.interval = interval_ms / 1000
+        self.rankings_size = rankings_size
+        self.max_idle_seconds = max_idle_seconds
+        self.lag_seconds = lag_seconds
+        self.subscribers = set()
+        # Último estado enviado: posición -> entrada del ranking, video -> votos
+        self.rankings = {}
+        self.video_votes = OrderedDict()
+        self._generations = None
+        self._last_refresh = None
+        self._since = None
+        self._task = None
+        # Al apagar, las conexiones SSE abiertas terminan en lugar de esperar al cliente
+        self.closing = False
+
+    def subscribe(self) -> Subscriber:
+        subscriber = Subscriber()
+        self.subscribers.add(subscriber)
+        live_updates_subscribers.inc()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        if subscriber in self.subscribers:
+            self.subscribers.discard(subscriber)
+            live_updates_subscribers.dec()
+
+    def snapshot_message(self) -> bytes:
+        return format_event(
+            "snapshot", {"rankings": sorted(self.rankings.values(), key=lambda e: e["position"])}
+        )
+
+    async def _run(self) -> None:
+        while self.subscribers:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Error actualizando el ranking en vivo: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    async def refresh(self, force: bool = False) -> None:
+        # Generaciones (Redis) y consultas son bloqueantes: fuera del event loop
+        delta = await anyio.to_thread.run_sync(self.compute_delta, force)
+        if delta is not None:
+            self.publish(delta)
+
+    def publish(self, delta: dict) -> None:
+        message = format_event("update", delta)
+        for subscriber in list(self.subscribers):
+            subscriber.push(delta, message)
+
+    def compute_delta(self, force: bool = False) -> Optional[dict]:
+        """Consulta ranking y votos recientes si hubo cambios; retorna el delta o None"""
+        generations = tuple(
+            response_cache.backend.get_generation(namespace)
+            for namespace in (PUBLIC_VIDEOS_CACHE, RANKINGS_CACHE)
+        )
+        now = time.monotonic()
+        idle = self._last_refresh is None or now - self._last_refresh >= self.max_idle_seconds
+        if not force and not idle and generations == self._generations:
+            return None
+        self._generations = generations
+        self._last_refresh = now
+
+        started = datetime.datetime.utcnow()
+        db = self.session_factory()
+        try:
+            rows = db.execute(
+                select(
+                    UserRanking.first_name,
+                    UserRanking.last_name,
+                    UserRanking.city,
+                    UserRanking.total_votes,
+                )
+                .order_by(UserRanking.total_votes.desc(), UserRanking.id_user.desc())
+                .limit(self.rankings_size)
+            ).all()
+
+            votes = {}
+            if self._since is not None:
+                # Conteo real (tabla votes) de los videos con votos desde el refresco anterior
+                recent = select(Vote.id_video).where(Vote.voted_at > self._since).distinct()
+                votes = dict(
+                    db.execute(
+                        select(Vote.id_video, func.count())
+                        .where(Vote.id_video.in_(recent))
+                        .group_by(Vote.id_video)
+                    ).all()
+                )
+        finally:
+            db.close()
+        # Margen para votos con voted_at anterior cuyo commit llegó después
+        self._since = started - datetime.timedelta(seconds=self.lag_seconds)
+        live_updates_refreshes.inc()
+
+        rankings = {
+            str(idx + 1): {
+                "position": idx + 1,
+                "username": f"{row.first_name} {row.last_name}",
+                "city": row.city,
+                "votes": row.total_votes,
+            }
+            for idx, row in enumerate(rows)
+        }
+        changed_rankings = {
+            position: entry for position, entry in rankings.items()
+            if self.rankings.get(position) != entry
+        }
+        self.rankings = rankings
+
+        changed_videos = {
+            video_id: count for video_id, count in votes.items()
+            if self.video_votes.get(video_id) != count
+        }
+        for video_id, count in changed_videos.items():
+            self.video_votes[video_id] = count
+            self.video_votes.move_to_end(video_id)
+        while len(self.video_votes) > MAX_TRACKED_VIDEOS:
+            self.video_votes.popitem(last=False)
+
+        if not changed_rankings and not changed_videos:
+            return None
+        return {"rankings": changed_rankings, "videos": changed_videos}
+
+    def shutdown(self) -> None:
+        self.closing = True
+        for subscriber in list(self.subscribers):
+            subscriber.event.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+live_updates = LiveUpdates()
@@ -0,0 +1,34 @@
+from starlette.datastructures import Headers
+from .responses import FastJSONResponse
+
+# Margen para los bordes multipart y los demás campos del formulario (title)
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Rechaza las subidas cuyo Content-Length ya excede el límite,
+    antes de que Starlette lea y almacene el cuerpo de la petición.
+    """
+
+    def __init__(self, app, max_body_bytes: int, paths: tuple):
+        self.app = app
+        self.max_body_bytes = max_body_bytes + MULTIPART_OVERHEAD_BYTES
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] == "http"
+            and scope["method"] in ("POST", "PUT")
+            and scope["path"] in self.paths
+        ):
+            content_length = Headers(scope=scope).get("content-length", "")
+            if content_length.isdigit() and int(content_length) > self.max_body_bytes:
+                response = FastJSONResponse(
+                    status_code=400,
+                    content={"message": "El archivo excede el límite de 100MB"},
+                )
+                await response(scope, receive, send)
+                return
+
+        await self.app(scope, receive, send)
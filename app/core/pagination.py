@@ -0,0 +1,54 @@
+import base64
+import datetime
+import json
+from typing import Any, List, Optional, Sequence
+
+from fastapi import HTTPException
+
+# Tamaño de página de los listados públicos
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Cabecera con el cursor de la siguiente página (ausente en la última)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Cursor opaco con la clave de orden del último elemento de la página"""
+    encoded = [
+        {"dt": value.isoformat()} if isinstance(value, datetime.datetime) else value
+        for value in values
+    ]
+    raw = json.dumps(encoded, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], types: Sequence[type]) -> Optional[List[Any]]:
+    """
+    Decodifica un cursor con un valor por cada tipo de `types` (en orden).
+    400 si no es válido: el cursor lo arma el cliente y sus valores van a la consulta.
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("Tamaño de cursor inválido")
+        decoded = [
+            datetime.datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value
+            for value in values
+        ]
+        for value, expected in zip(decoded, types):
+            # bool es subclase de int; las fechas se guardan en UTC sin zona horaria
+            if not isinstance(value, expected) or isinstance(value, bool):
+                raise ValueError("Tipo de valor inválido en el cursor")
+            if isinstance(value, datetime.datetime) and value.tzinfo is not None:
+                raise ValueError("Fecha con zona horaria en el cursor")
+        return decoded
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail={"message": "Cursor inválido"})
+
+
+def next_cursor_headers(next_cursor: Optional[str]) -> dict:
+    return {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
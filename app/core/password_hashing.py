@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException
+
+from shared.config.settings import settings
+from shared.metrics.api_metrics import (
+    password_hash_seconds,
+    password_hash_in_flight,
+    password_hash_rejected,
+)
+
+from .security import get_password_hash, verify_password
+
+
+class PasswordHasher:
+    """
+    Ejecuta el hashing de contraseñas en un pool de procesos de tamaño fijo.
+    El trabajo CPU intensivo no ocupa hilos del threadpool ni compite por el GIL,
+    y si hay más de `max_pending` operaciones pendientes se responde 503 con Retry-After.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._in_flight >= self.max_pending:
+                password_hash_rejected.inc()
+                raise HTTPException(
+                    status_code=503,
+                    detail={"message": "Servicio saturado, intente nuevamente."},
+                    headers={"Retry-After": str(settings.password_hash_retry_after)},
+                )
+            self._in_flight += 1
+        password_hash_in_flight.inc()
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        password_hash_in_flight.dec()
+
+    async def _run(self, operation: str, fn, *args):
+        self._acquire()
+        start = time.perf_counter()
+        try:
+            future = self._get_executor().submit(fn, *args)
+            return await asyncio.wrap_future(future)
+        finally:
+            self._release()
+            password_hash_seconds.labels(operation=operation).observe(
+                time.perf_counter() - start
+            )
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", verify_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(
+    settings.password_hash_workers, settings.password_hash_max_pending
+)
@@ -0,0 +1,45 @@
+from typing import Any
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from starlette.background import BackgroundTask
+from starlette.responses import JSONResponse
+
+
+def drop_none(content: Any) -> Any:
+    """Quita las claves con valor None de los diccionarios (recursivo)"""
+    if isinstance(content, dict):
+        return {key: drop_none(value) for key, value in content.items() if value is not None}
+    if isinstance(content, (list, tuple)):
+        return [drop_none(item) for item in content]
+    return content
+
+
+def _default(value: Any) -> Any:
+    # Tipos que orjson no serializa de forma nativa (modelos pydantic, Decimal, ...)
+    return jsonable_encoder(value)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Respuesta JSON serializada con orjson: datetime, date, UUID y Enum se codifican
+    de forma nativa (sin jsonable_encoder). Por defecto omite las claves con valor None;
+    `exclude_none=False` las conserva como null.
+    """
+
+    def __init__(
+        self,
+        content: Any,
+        status_code: int = 200,
+        headers: dict = None,
+        media_type: str = None,
+        background: BackgroundTask = None,
+        exclude_none: bool = True,
+    ) -> None:
+        self.exclude_none = exclude_none
+        super().__init__(content, status_code, headers, media_type, background)
+
+    def render(self, content: Any) -> bytes:
+        if self.exclude_none:
+            content = drop_none(content)
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
@@ -1,13 +1,23 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import NamedTuple, Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from sqlalchemy.orm import Session
+import threading
+import time
 
 from shared.config.settings import settings
+from shared.db.models.user import User
+from shared.metrics.api_metrics import token_cache_hits, token_cache_misses
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"],
+    deprecated="auto",
+    pbkdf2_sha256__default_rounds=settings.password_hash_rounds,
+)
 
 
 def verify_password(plain_password, hashed_password):
@@ -34,16 +44,125 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='login')
 
 
-def verify_token(token: str = Depends(oauth2_scheme)):
+def decode_access_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        user_email: str = payload.get('sub')
-        if user_email is None:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
-                                detail={'message': 'Credenciales de autenticación inválidas.'},
-                                headers={'WWW-Authenticate': 'Bearer'})
-        return user_email
-    except JWTError as ex:
+    except JWTError:
+        payload = {}
+    if payload.get('sub') is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                             detail={'message': 'Credenciales de autenticación inválidas.'},
                             headers={'WWW-Authenticate': 'Bearer'})
+    return payload
+
+
+def verify_token(token: str = Depends(oauth2_scheme)):
+    return decode_access_token(token)['sub']
+
+
+class Principal(NamedTuple):
+    """Identidad del usuario autenticado"""
+    id: str
+    email: str
+    city: Optional[str]
+
+
+class TokenCache:
+    """
+    Caché LRU acotada de tokens verificados -> Principal.
+    Cada entrada vence con el TTL o con la expiración del token, lo que ocurra primero.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: int):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            principal, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return principal
+
+    def set(self, token: str, principal: Principal, token_exp: Optional[float] = None) -> None:
+        expires_at = time.time() + self.ttl_seconds
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        with self._lock:
+            self._entries[token] = (principal, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+token_cache = TokenCache(settings.token_cache_size, settings.token_cache_ttl_seconds)
+
+
+def get_current_principal(db: Session, token: str) -> Principal:
+    """
+    Resuelve el usuario del token. En estado estable no consulta la BD:
+    los tokens verificados se guardan en `token_cache`.
+    """
+    principal = token_cache.get(token)
+    if principal is not None:
+        token_cache_hits.inc()
+        return principal
+
+    token_cache_misses.inc()
+    payload = decode_access_token(token)
+    query = db.query(User.id, User.email, User.city)
+    # Tokens emitidos antes de incluir `uid` solo traen el email
+    if payload.get('uid'):
+        row = query.filter(User.id == payload['uid']).first()
+    else:
+        row = query.filter(User.email == payload['sub']).first()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail={'message': 'Usuario no autorizado'})
+
+    principal = Principal(row.id, row.email, row.city)
+    token_cache.set(token, principal, payload.get('exp'))
+    return principal
+
+
+def get_current_admin(db: Session, token: str) -> Principal:
+    """Como get_current_principal, pero exige que el correo esté en ADMIN_EMAILS"""
+    principal = get_current_principal(db, token)
+    admins = {email.strip().lower() for email in settings.admin_emails.split(",") if email.strip()}
+    if principal.email.lower() not in admins:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail={'message': 'Acceso restringido a administradores'})
+    return principal
+
+
+def create_upload_token(video_id: str, user_id: str, title: str, expires_delta: timedelta):
+    """Token firmado que acompaña una subida directa hasta su confirmación"""
+    return create_access_token(
+        data={"scope": "direct_upload", "video_id": video_id, "uid": user_id, "title": title},
+        expires_delta=expires_delta,
+    )
+
+
+def verify_upload_token(token: str) -> dict:
+    try:
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    except JWTError:
+        payload = {}
+    if payload.get('scope') != 'direct_upload':
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail={'message': 'Token de subida inválido o expirado.'})
+    return payload
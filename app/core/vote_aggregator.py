@@ -0,0 +1,258 @@
+"""
+Conteo diferido de votos (VOTE_WRITE_BEHIND=true).
+
+El voto (fila en `votes`) se registra siempre en la BD; solo el incremento de
+`videos.votes` (y de `user_rankings.total_votes`) se acumula en contadores en memoria por hilo (shards) y se aplica
+por lotes con `UPDATE videos SET votes = votes + n`, cada VOTE_FLUSH_INTERVAL_MS
+o al acumular VOTE_FLUSH_MAX_VOTES votos, y al apagar el proceso.
+
+Reconciliación (compara videos.votes con las filas de votes):
+    python -m app.core.vote_aggregator
+    python -m app.core.vote_aggregator --fix
+"""
+import argparse
+import atexit
+import itertools
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import Session
+
+from shared.cache import invalidate_public_reads
+from shared.config.settings import settings
+from shared.db.config import SessionLocal
+from shared.db.models.video import Video
+from shared.db.models.vote import Vote
+from shared.db.rankings import add_video_votes_statement
+from shared.metrics.api_metrics import (
+    vote_write_behind_pending,
+    vote_write_behind_lag_seconds,
+    vote_write_behind_flush_errors,
+    vote_counter_drift,
+)
+
+logger = logging.getLogger(__name__)
+
+videos_table = Video.__table__
+
+
+class _Shard:
+    """Contadores de un shard; `counts`, `pending` y `oldest` solo cambian bajo `lock`"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = defaultdict(int)
+        self.pending = 0
+        self.oldest = None
+
+    def add(self, video_id: str, n: int, oldest: float) -> None:
+        with self.lock:
+            self.counts[video_id] += n
+            self.pending += n
+            if self.oldest is None or oldest < self.oldest:
+                self.oldest = oldest
+
+    def swap(self):
+        """Entrega los contadores acumulados y deja el shard vacío"""
+        with self.lock:
+            drained, oldest = self.counts, self.oldest
+            self.counts, self.pending, self.oldest = defaultdict(int), 0, None
+        return drained, oldest
+
+
+class VoteAggregator:
+    """Acumula incrementos de votos por video y los aplica por lotes"""
+
+    def __init__(self, session_factory=SessionLocal, shards: int = settings.vote_counter_shards,
+                 flush_interval_ms: int = settings.vote_flush_interval_ms,
+                 flush_max_votes: int = settings.vote_flush_max_votes):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_max_votes = flush_max_votes
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+        # Shard de cada hilo, asignado en orden al primer voto. threading.get_ident()
+        # no sirve: en Linux es la dirección del pthread, alineada a potencias de dos
+        self._next_shard = itertools.count()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def pending(self) -> int:
+        return sum(shard.pending for shard in self._shards)
+
+    def _oldest_pending(self) -> Optional[float]:
+        oldest = [shard.oldest for shard in self._shards if shard.oldest is not None]
+        return min(oldest) if oldest else None
+
+    def lag_seconds(self) -> float:
+        oldest = self._oldest_pending()
+        return time.monotonic() - oldest if oldest is not None else 0.0
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            # next() de itertools.count es atómico bajo el GIL
+            shard = self._shards[next(self._next_shard) % len(self._shards)]
+            self._local.shard = shard
+        return shard
+
+    def add(self, video_id: str, n: int = 1) -> None:
+        """Suma `n` votos al video; no toca la BD"""
+        # Cada hilo escribe en su shard: los votos a un mismo video no compiten por un lock
+        self._shard().add(video_id, n, time.monotonic())
+
+        pending = self.pending
+        vote_write_behind_pending.set(pending)
+
+        self._ensure_started()
+        if pending >= self.flush_max_votes:
+            self._wake.set()
+
+    def _drain(self) -> Tuple[Dict[str, int], Optional[float]]:
+        """
+        Vacía los shards. Cada shard entrega sus contadores, su total pendiente y su
+        voto más antiguo en un solo intercambio bajo su lock: los votos que llegan
+        durante el vaciado quedan en el shard nuevo con su propia marca de tiempo.
+        """
+        counts = defaultdict(int)
+        oldest = None
+        for shard in self._shards:
+            drained, shard_oldest = shard.swap()
+            for video_id, n in drained.items():
+                counts[video_id] += n
+            if shard_oldest is not None and (oldest is None or shard_oldest < oldest):
+                oldest = shard_oldest
+        return counts, oldest
+
+    def flush(self) -> int:
+        """Aplica los incrementos acumulados en una transacción. Retorna los votos aplicados"""
+        with self._flush_lock:
+            counts, oldest = self._drain()
+            if not counts:
+                return 0
+
+            db = None
+            try:
+                db = self.session_factory()
+                # Orden fijo por id: evita deadlocks entre procesos que vacían a la vez
+                params = [
+                    {"b_video_id": video_id, "b_votes": n}
+                    for video_id, n in sorted(counts.items())
+                ]
+                db.execute(
+                    update(videos_table)
+                    .where(videos_table.c.id == bindparam("b_video_id"))
+                    .values(votes=videos_table.c.votes + bindparam("b_votes")),
+                    params,
+                )
+                db.execute(add_video_votes_statement(), params)
+                db.commit()
+                invalidate_public_reads()
+            except Exception as e:
+                if db is not None:
+                    db.rollback()
+                vote_write_behind_flush_errors.inc()
+                logger.error(f"Error aplicando votos diferidos: {str(e)}")
+                # Devolver los incrementos para el siguiente intento
+                for video_id, n in counts.items():
+                    self._shards[0].add(video_id, n, oldest)
+                raise
+            finally:
+                if db is not None:
+                    db.close()
+                vote_write_behind_pending.set(self.pending)
+
+            return sum(counts.values())
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None and not self._stop.is_set():
+                self._thread = threading.Thread(
+                    target=self._run, name="vote-aggregator", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # Ya registrado; se reintenta en el siguiente ciclo
+                pass
+
+    def shutdown(self) -> None:
+        """Detiene el hilo y aplica los votos pendientes"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._stop.clear()
+        try:
+            self.flush()
+        except Exception:
+            # La reconciliación corrige los contadores que no se alcanzaron a aplicar
+            logger.error(f"Votos diferidos sin aplicar al apagar: {self.pending}")
+
+
+def reconcile_vote_counts(db: Session, fix: bool = False) -> Dict[str, Tuple[int, int]]:
+    """
+    Compara videos.votes con el número de filas en votes.
+    Retorna {video_id: (contador, votos reales)} de los videos con diferencia y,
+    con `fix`, corrige el contador. Solo corregir sin votos diferidos pendientes.
+    """
+    actual = (
+        select(Vote.id_video, func.count().label("total"))
+        .group_by(Vote.id_video)
+        .subquery()
+    )
+    total = func.coalesce(actual.c.total, 0)
+    rows = db.execute(
+        select(Video.id, Video.votes, total)
+        .outerjoin(actual, actual.c.id_video == Video.id)
+        .where(Video.votes != total)
+    ).all()
+
+    mismatches = {video_id: (votes, real) for video_id, votes, real in rows}
+    vote_counter_drift.set(sum(abs(votes - real) for votes, real in mismatches.values()))
+
+    if fix and mismatches:
+        for video_id, (_, real) in mismatches.items():
+            db.execute(update(Video).where(Video.id == video_id).values(votes=real))
+        db.commit()
+    return mismatches
+
+
+vote_aggregator = VoteAggregator()
+vote_write_behind_lag_seconds.set_function(vote_aggregator.lag_seconds)
+# Además del hook de apagado de la API: uvicorn lo omite en un cierre forzado
+# (segundo Ctrl+C) y solo lo ejecuta cuando las conexiones abiertas terminaron
+atexit.register(vote_aggregator.shutdown)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconciliación de videos.votes")
+    parser.add_argument("--fix", action="store_true", help="Corregir los contadores")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        mismatches = reconcile_vote_counts(db, fix=args.fix)
+    finally:
+        db.close()
+
+    for video_id, (votes, real) in sorted(mismatches.items()):
+        print(f"{video_id}: videos.votes={votes} votos={real}")
+    print(f"Videos con diferencia: {len(mismatches)}" + (" (corregidos)" if args.fix else ""))
@@ -1,7 +1,12 @@
-from shared.db.config import engine, Base
+from shared.db.config import engine, Base, SessionLocal
 from shared.db.models.user import User
 from shared.db.models.video import Video
 from shared.db.models.vote import Vote
+from shared.db.models.outbox import OutboxMessage
+from shared.db.models.upload_session import UploadSession, UploadPart
+from shared.db.models.user_ranking import UserRanking
+from shared.db.rankings import backfill_user_rankings
+from shared.db.schema import upgrade_schema
 
 
 def init_db():
@@ -10,9 +15,26 @@ def init_db():
     print(f"User: {User}")
     print(f"Video: {Video}")
     print(f"Vote: {Vote}")
+    print(f"OutboxMessage: {OutboxMessage}")
+    print(f"UploadSession: {UploadSession}")
+    print(f"UploadPart: {UploadPart}")
+    print(f"UserRanking: {UserRanking}")
     Base.metadata.create_all(bind=engine)
     print("Tablas creadas.")
 
+    # create_all no agrega columnas ni índices nuevos a tablas existentes
+    applied = upgrade_schema(engine)
+    if applied:
+        print(f"Esquema actualizado: {', '.join(applied)}")
+
+    db = SessionLocal()
+    try:
+        ranked = backfill_user_rankings(db)
+    finally:
+        db.close()
+    if ranked is not None:
+        print(f"Ranking de usuarios calculado: {ranked} usuarios.")
+
 
 if __name__ == "__main__":
     init_db()
@@ -1,14 +1,57 @@
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from prometheus_client import make_asgi_app
+import anyio.to_thread
 from .api.auth import router as auth_router
 from .api.videos_api import router_videos
+from .api.uploads_api import router_uploads
+from .api.direct_uploads_api import router_direct_uploads
 from .api.public import router_public
+from .api.exports_api import router_exports
+from .core.middleware import UploadSizeLimitMiddleware
+from .core.responses import FastJSONResponse
+from .core.password_hashing import password_hasher
+from .core.vote_aggregator import vote_aggregator
+from .core.live_updates import live_updates
 
-app = FastAPI()
+from shared.config.settings import settings
+from shared.metrics.api_metrics import threadpool_size, threadpool_in_use
+
+app = FastAPI(default_response_class=FastJSONResponse)
+
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_body_bytes=settings.max_upload_bytes,
+    paths=("/api/videos/upload",),
+)
 
 app.include_router(auth_router, prefix="/api/auth", tags=["auth"])
 app.include_router(router_videos, prefix="/api/videos", tags=["videos"])
+app.include_router(router_uploads, prefix="/api/videos/uploads", tags=["videos"])
+app.include_router(
+    router_direct_uploads, prefix="/api/videos/direct-uploads", tags=["videos"]
+)
 app.include_router(router_public, prefix="/api/public", tags=["public"])
+app.include_router(router_exports, prefix="/api/admin/exports", tags=["admin"])
+
+# Métricas Prometheus de la API
+app.mount("/metrics", make_asgi_app())
+
+
+@app.on_event("startup")
+async def configure_threadpool():
+    # Las rutas `def` comparten este limitador; se reporta para detectar saturación
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = settings.threadpool_size
+    threadpool_size.set(settings.threadpool_size)
+    threadpool_in_use.set_function(lambda: limiter.borrowed_tokens)
+
+
+@app.on_event("shutdown")
+def shutdown_pools():
+    password_hasher.shutdown()
+    # Aplicar los votos diferidos antes de terminar
+    vote_aggregator.shutdown()
+    live_updates.shutdown()
 
 
 @app.get("/")
@@ -19,6 +62,6 @@ def health_check():
 # Custom Exception Handler
 @app.exception_handler(HTTPException)
 async def custom_exception_handler(request, exc: HTTPException):
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=exc.status_code, content=exc.detail, headers=exc.headers
     )
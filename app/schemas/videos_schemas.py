@@ -1,6 +1,20 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class CreateVideoRequest(BaseModel):
     title: str
-    
\ No newline at end of file
+    
+
+class CreateUploadSessionRequest(BaseModel):
+    title: str = Field(..., min_length=1, max_length=255)
+    filename: str
+    total_size: int = Field(..., gt=0)
+
+
+class CreateDirectUploadRequest(BaseModel):
+    title: str = Field(..., min_length=1, max_length=255)
+    filename: str
+
+
+class CompleteDirectUploadRequest(BaseModel):
+    upload_token: str
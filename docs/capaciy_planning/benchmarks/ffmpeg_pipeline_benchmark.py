@@ -0,0 +1,137 @@
+"""
+Benchmark del procesamiento de video: tres pasadas (recorte, escalado, concat), una sola
+invocación de ffmpeg con filter graph y clip + cortinillas precodificadas unidas por copia.
+
+Genera originales de 1, 5, 20, 50 y 100 MB (tamaños del plan de capacidad; 1080p con
+ruido para que no se compriman) y mide, por video, el tiempo total y los bytes escritos
+en disco (intermedios + salida). Con --compliant los originales ya cumplen el perfil de
+salida (720p H.264 High, AAC 48 kHz, otro codificador que las cortinillas) y clip+copia
+no recodifica el video (passthrough).
+Requiere ffmpeg/ffprobe en el PATH.
+
+Uso (desde la raíz del repositorio):
+    python docs/capaciy_planning/benchmarks/ffmpeg_pipeline_benchmark.py
+    python docs/capaciy_planning/benchmarks/ffmpeg_pipeline_benchmark.py --sizes 1 5 --duration 45
+    python docs/capaciy_planning/benchmarks/ffmpeg_pipeline_benchmark.py --compliant
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "app-worker"))
+
+
+def generate_source(path, size_mb, duration, compliant=False):
+    """Original con audio, a tasa constante para llegar a ~size_mb"""
+    audio_kbps = 128
+    video_kbps = max(200, int(size_mb * 8 * 1024 / duration) - audio_kbps)
+    size, sample_rate = ("1280x720", 48000) if compliant else ("1920x1080", 44100)
+    # Mismo perfil H.264 que la salida, keyframe cada 2 s. ultrafast desactiva CABAC y
+    # 8x8dct: x264 baja el perfil a Constrained Baseline aunque se pida high
+    h264 = ["-preset", "ultrafast"]
+    if compliant:
+        h264 = ["-preset", "veryfast", "-profile:v", "high", "-level:v", "4.1",
+                "-pix_fmt", "yuv420p", "-g", "60"]
+    cmd = [
+        "ffmpeg", "-hide_banner", "-nostdin", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=size={size}:rate=30:duration={duration}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate={sample_rate}:duration={duration}",
+        "-vf", "noise=alls=30:allf=t",
+        "-c:v", "libx264", *h264,
+        "-b:v", f"{video_kbps}k", "-minrate", f"{video_kbps}k",
+        "-maxrate", f"{video_kbps}k", "-bufsize", f"{video_kbps * 2}k",
+        "-c:a", "aac", "-b:a", f"{audio_kbps}k", "-ac", "2",
+        path,
+    ]
+    subprocess.run(cmd, check=True, capture_output=True)
+    return os.path.getsize(path)
+
+
+def run_multi_pass(source, work_dir, video_processing):
+    trimmed = os.path.join(work_dir, "temp_.mp4")
+    resized = os.path.join(work_dir, "temp_resized_.mp4")
+    output = os.path.join(work_dir, "temp_processed_.mp4")
+    start = time.perf_counter()
+    assert video_processing.trim_video_to_30s(source, trimmed)
+    assert video_processing.resize_to_720p_16_9(trimmed, resized)
+    assert video_processing.add_anb_intro_outro(resized, output)
+    elapsed = time.perf_counter() - start
+    written = sum(os.path.getsize(path) for path in (trimmed, resized, output))
+    for path in (trimmed, resized, output):
+        os.remove(path)
+    return elapsed, written
+
+
+def run_single_pass(source, work_dir, assets, ffmpeg_pipeline):
+    output = os.path.join(work_dir, "temp_processed_.mp4")
+    intro_path, outro_path = assets.asset_cache.get()
+    start = time.perf_counter()
+    assert ffmpeg_pipeline.process_single_pass(source, output, intro_path, outro_path)
+    elapsed = time.perf_counter() - start
+    written = os.path.getsize(output)
+    os.remove(output)
+    return elapsed, written
+
+
+def run_asset_concat(source, work_dir, assets, ffmpeg_pipeline):
+    output = os.path.join(work_dir, "temp_processed_.mp4")
+    clip = os.path.join(work_dir, "temp_clip_.mp4")
+    intro_path, outro_path = assets.asset_cache.get()
+    probe_cache = ffmpeg_pipeline.ProbeCache(os.path.join(work_dir, "probes"))
+    start = time.perf_counter()
+    # Como la tarea: ffprobe + keyframes (sin ellos un original de más de 30 s no se copia)
+    probe = probe_cache.get("benchmark", source)
+    assert ffmpeg_pipeline.process_with_assets(
+        source, output, clip, intro_path, outro_path, probe=probe
+    )
+    elapsed = time.perf_counter() - start
+    probe_cache.discard("benchmark")
+    # El clip intermedio se borra dentro de process_with_assets: se cuenta ~ su tamaño
+    # como el de la salida menos las cortinillas
+    written = os.path.getsize(output) * 2 - os.path.getsize(intro_path) - os.path.getsize(outro_path)
+    os.remove(output)
+    return elapsed, written
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 5, 20, 50, 100])
+    parser.add_argument("--duration", type=int, default=60, help="Duración del original (s)")
+    parser.add_argument("--compliant", action="store_true", help="Originales que ya cumplen el perfil")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.environ["ASSETS_DIR"] = os.path.join(work_dir, "assets")
+        os.environ["UPLOADS_DIR"] = work_dir
+        from worker import assets, ffmpeg_pipeline
+        from worker.tasks import video_processing
+
+        video_processing.ensure_intro_outro()
+        assets.asset_cache.warm()
+
+        print(
+            f"{'Tamaño':>8} | {'3 pasadas':>10} | {'escrito':>10} | {'1 pasada':>10} | "
+            f"{'escrito':>10} | {'clip+copia':>10} | {'escrito':>10}"
+        )
+        for size_mb in args.sizes:
+            source = os.path.join(work_dir, f"source_{size_mb}mb.mp4")
+            actual = generate_source(source, size_mb, args.duration, args.compliant)
+            multi_time, multi_bytes = run_multi_pass(source, work_dir, video_processing)
+            single_time, single_bytes = run_single_pass(source, work_dir, assets, ffmpeg_pipeline)
+            concat_time, concat_bytes = run_asset_concat(source, work_dir, assets, ffmpeg_pipeline)
+            print(
+                f"{actual / 1024 / 1024:>6.1f}MB | {multi_time:>9.2f}s | "
+                f"{multi_bytes / 1024 / 1024:>8.1f}MB | {single_time:>9.2f}s | "
+                f"{single_bytes / 1024 / 1024:>8.1f}MB | {concat_time:>9.2f}s | "
+                f"{concat_bytes / 1024 / 1024:>8.1f}MB"
+            )
+            os.remove(source)
+
+
+if __name__ == "__main__":
+    main()
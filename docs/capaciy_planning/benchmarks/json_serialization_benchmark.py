@@ -0,0 +1,73 @@
+"""
+Benchmark de serialización del cuerpo de /api/public/videos.
+
+Compara, para N videos (por defecto 10.000):
+- Antes: jsonable_encoder + JSONResponse de Starlette (json de la librería estándar).
+- Después: FastJSONResponse (orjson, datetime nativo, omite None).
+
+Uso (desde la raíz del repositorio):
+    python docs/capaciy_planning/benchmarks/json_serialization_benchmark.py --videos 10000
+"""
+import argparse
+import datetime
+import os
+import statistics
+import sys
+import time
+import uuid
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+from app.core.responses import FastJSONResponse
+
+
+def build_payload(videos):
+    now = datetime.datetime(2025, 1, 1)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "title": f"Video {i}",
+            "file_processed_url": f"s3://bucket/processed/{i}.mp4",
+            "uploaded_at": now + datetime.timedelta(seconds=i),
+            # Algunos videos sin processed_at (None)
+            "processed_at": now + datetime.timedelta(seconds=i + 60) if i % 10 else None,
+            "votes": i % 1000,
+        }
+        for i in range(videos)
+    ]
+
+
+def timed(fn, repeat):
+    timings = []
+    body = b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--videos", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    payload = build_payload(args.videos)
+
+    before, before_size = timed(
+        lambda: JSONResponse(content=jsonable_encoder(payload)).body, args.repeat
+    )
+    after, after_size = timed(lambda: FastJSONResponse(content=payload).body, args.repeat)
+
+    print(f"Videos:                              {args.videos}")
+    print(f"jsonable_encoder + JSONResponse:     {before:.2f} ms ({before_size} bytes)")
+    print(f"FastJSONResponse (orjson):           {after:.2f} ms ({after_size} bytes)")
+    print(f"Aceleración:                         {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark del hashing de contraseñas (pbkdf2_sha256).
+
+1. Costo de una verificación para distintos factores de trabajo (rounds), para elegir
+   PASSWORD_HASH_ROUNDS según el presupuesto de latencia del login.
+2. Ráfaga de N logins concurrentes contra el PasswordHasher (pool de procesos acotado):
+   p50/p95 de latencia, rechazos 503 y latencia de una operación barata durante la ráfaga.
+   Con --inline se compara con el camino anterior (hashing dentro del threadpool).
+
+Uso (desde la raíz del repositorio):
+    python docs/capaciy_planning/benchmarks/password_hash_benchmark.py
+    python docs/capaciy_planning/benchmarks/password_hash_benchmark.py --logins 200 --workers 4
+    python docs/capaciy_planning/benchmarks/password_hash_benchmark.py --inline
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from anyio import to_thread
+from fastapi import HTTPException
+from passlib.hash import pbkdf2_sha256
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+from app.core.password_hashing import PasswordHasher
+from app.core.security import get_password_hash, verify_password
+
+PASSWORD = "StrongPass123"
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def bench_rounds(rounds_list, repeat):
+    print("Costo por verificación según rounds")
+    for rounds in rounds_list:
+        hashed = pbkdf2_sha256.using(rounds=rounds).hash(PASSWORD)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            pbkdf2_sha256.verify(PASSWORD, hashed)
+            timings.append(time.perf_counter() - start)
+        print(f"  rounds={rounds:>7}: {statistics.median(timings) * 1000:8.1f} ms")
+
+
+async def bench_burst(logins, workers, max_pending, inline):
+    hashed = get_password_hash(PASSWORD)
+    hasher = PasswordHasher(workers, max_pending)
+    latencies = []
+    rejected = 0
+    cheap_latencies = []
+
+    async def login():
+        nonlocal rejected
+        start = time.perf_counter()
+        try:
+            if inline:
+                await to_thread.run_sync(verify_password, PASSWORD, hashed)
+            else:
+                await hasher.verify(PASSWORD, hashed)
+        except HTTPException:
+            rejected += 1
+            return
+        latencies.append(time.perf_counter() - start)
+
+    async def cheap_requests(stop):
+        # Simula un endpoint de lectura que también usa el threadpool
+        while not stop.is_set():
+            start = time.perf_counter()
+            await to_thread.run_sync(lambda: None)
+            cheap_latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(0.01)
+
+    if not inline:
+        # Arrancar los procesos antes de medir
+        await hasher.verify(PASSWORD, hashed)
+
+    stop = asyncio.Event()
+    cheap = asyncio.create_task(cheap_requests(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await cheap
+    hasher.shutdown()
+
+    mode = "inline (threadpool)" if inline else f"pool de procesos ({workers} workers)"
+    print(f"Ráfaga de {logins} logins, {mode}")
+    print(f"  tiempo total:        {elapsed:.2f} s")
+    print(f"  rechazados (503):    {rejected}")
+    if latencies:
+        print(f"  login p50 / p95:     {percentile(latencies, 50) * 1000:.1f} / "
+              f"{percentile(latencies, 95) * 1000:.1f} ms")
+    if cheap_latencies:
+        print(f"  lectura barata p95:  {percentile(cheap_latencies, 95) * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10000, 29000, 100000, 200000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--max-pending", type=int, default=64)
+    parser.add_argument("--inline", action="store_true")
+    args = parser.parse_args()
+
+    bench_rounds(args.rounds, args.repeat)
+    asyncio.run(bench_burst(args.logins, args.workers, args.max_pending, args.inline))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Benchmark de la lectura del original: descarga completa frente a ffmpeg leyendo la URL
+por rangos HTTP (VIDEO_SOURCE_MODE=stream).
+
+Sirve los originales (1, 5, 20, 50 y 100 MB, 60 s, 1080p con ruido) con un servidor HTTP
+local que acepta Range y mide, para ffprobe + la preparación del clip de 30 s:
+- enviado: bytes que salieron del servidor. Cada GET pide `bytes=N-` (hasta el final) y el
+  servidor sigue enviando hasta que ffmpeg cierra la conexión, así que incluye lo que quedó
+  en los buffers de TCP sin leer; es lo que se factura como transferencia.
+- leído: bytes que consumieron los demuxers (estadísticas de AVIOContext de ffmpeg).
+Cada original se mide con el moov al final (como lo escriben ffmpeg sin faststart y muchas
+cámaras) y al inicio (faststart). Requiere ffmpeg/ffprobe en el PATH.
+
+Uso (desde la raíz del repositorio):
+    python docs/capaciy_planning/benchmarks/source_streaming_benchmark.py
+    python docs/capaciy_planning/benchmarks/source_streaming_benchmark.py --sizes 20 100
+"""
+import argparse
+import http.server
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "app-worker"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from ffmpeg_pipeline_benchmark import generate_source  # noqa: E402
+
+
+class RangeHandler(http.server.SimpleHTTPRequestHandler):
+    """Archivos estáticos con soporte de Range (como S3) y conteo de bytes enviados"""
+
+    bytes_sent = 0
+    requests = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        path = self.translate_path(self.path.split("?")[0])
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2)), end) if match.group(2) else end
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Content-Type", "video/mp4")
+        self.end_headers()
+        type(self).requests += 1
+
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            try:
+                while remaining:
+                    data = f.read(min(remaining, 64 * 1024))
+                    self.wfile.write(data)
+                    type(self).bytes_sent += len(data)
+                    remaining -= len(data)
+            except (BrokenPipeError, ConnectionResetError):
+                # ffmpeg cierra la conexión cuando ya no necesita más bytes
+                pass
+
+
+def faststart(source, path):
+    """Misma codificación con el moov al inicio (remux sin recodificar)"""
+    subprocess.run(
+        ["ffmpeg", "-hide_banner", "-nostdin", "-y", "-i", source, "-c", "copy",
+         "-movflags", "+faststart", path],
+        check=True, capture_output=True,
+    )
+
+
+def bytes_read(stderr):
+    """Suma de "Statistics: N bytes read" de los AVIOContext de entrada (-v verbose)"""
+    return sum(int(n) for n in re.findall(r"Statistics: (\d+) bytes read", stderr))
+
+
+def measure(base_url, work_dir, name, ffmpeg_pipeline):
+    """Bytes enviados y leídos, GETs y tiempo de ffprobe + clip leyendo el original por HTTP"""
+    clip = os.path.join(work_dir, "temp_clip_.mp4")
+    RangeHandler.bytes_sent = RangeHandler.requests = 0
+    start = time.perf_counter()
+    url = f"{base_url}/{name}?X-Amz-Signature=benchmark"
+    # Los mismos comandos que el worker, con -v verbose para las estadísticas de lectura
+    probe_run = subprocess.run(
+        ["ffprobe", "-v", "verbose", "-print_format", "json",
+         *ffmpeg_pipeline.input_options(url), "-show_format", "-show_streams", url],
+        capture_output=True, text=True, check=True,
+    )
+    probe = ffmpeg_pipeline.MediaProbe.from_ffprobe(json.loads(probe_run.stdout))
+    cmd = ffmpeg_pipeline.build_clip_command(url, clip, probe)
+    clip_run = subprocess.run(
+        [cmd[0], "-v", "verbose", *cmd[1:]], capture_output=True, text=True, check=True
+    )
+    elapsed = time.perf_counter() - start
+    os.remove(clip)
+    read = bytes_read(probe_run.stderr) + bytes_read(clip_run.stderr)
+    return RangeHandler.bytes_sent, read, RangeHandler.requests, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 5, 20, 50, 100])
+    parser.add_argument("--duration", type=int, default=60, help="Duración del original (s)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.environ["ASSETS_DIR"] = os.path.join(work_dir, "assets")
+        os.environ["UPLOADS_DIR"] = work_dir
+        from worker import ffmpeg_pipeline
+
+        handler = lambda *a, **kw: RangeHandler(*a, directory=work_dir, **kw)  # noqa: E731
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        print(
+            f"{'Tamaño':>8} | {'moov':>6} | {'enviado':>10} | {'%':>6} | {'leído':>10} | "
+            f"{'%':>6} | {'GETs':>5} | {'tiempo':>8}"
+        )
+        for size_mb in args.sizes:
+            names = {"final": f"source_{size_mb}mb.mp4", "inicio": f"source_{size_mb}mb_faststart.mp4"}
+            actual = generate_source(os.path.join(work_dir, names["final"]), size_mb, args.duration)
+            faststart(os.path.join(work_dir, names["final"]), os.path.join(work_dir, names["inicio"]))
+
+            for layout, name in names.items():
+                sent, read, requests, elapsed = measure(base_url, work_dir, name, ffmpeg_pipeline)
+                print(
+                    f"{actual / 1024 / 1024:>6.1f}MB | {layout:>6} | {sent / 1024 / 1024:>8.1f}MB | "
+                    f"{sent * 100 / actual:>5.1f}% | {read / 1024 / 1024:>8.1f}MB | "
+                    f"{read * 100 / actual:>5.1f}% | {requests:>5} | {elapsed:>7.2f}s"
+                )
+            for name in names.values():
+                os.remove(os.path.join(work_dir, name))
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark de memoria de la subida de videos.
+
+Simula N subidas concurrentes de M MB hacia LocalStorage y reporta el pico de RSS
+del proceso. Compara el camino por bloques (LimitedReader + copyfileobj) con el
+camino anterior que leía el archivo completo en memoria (--legacy).
+
+Uso (desde la raíz del repositorio):
+    python docs/capaciy_planning/benchmarks/upload_memory_benchmark.py
+    python docs/capaciy_planning/benchmarks/upload_memory_benchmark.py --legacy
+    python docs/capaciy_planning/benchmarks/upload_memory_benchmark.py --uploads 50 --size-mb 100
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psutil
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+from shared.config.settings import settings
+from shared.storage import LimitedReader, LocalStorage
+
+
+class SyntheticVideo(io.RawIOBase):
+    """Archivo de `size` bytes generado al vuelo, sin ocupar memoria"""
+
+    def __init__(self, size: int):
+        self.remaining = size
+
+    def readable(self):
+        return True
+
+    def read(self, n=-1):
+        if n is None or n < 0:
+            n = self.remaining
+        n = min(n, self.remaining)
+        self.remaining -= n
+        return b"\0" * n
+
+
+def upload_streaming(storage: LocalStorage, size: int, key: str) -> int:
+    reader = LimitedReader(SyntheticVideo(size), settings.max_upload_bytes)
+    path = storage.upload_fileobj(reader, key)
+    os.remove(path)
+    return reader.bytes_read
+
+
+def upload_legacy(storage: LocalStorage, size: int, key: str) -> int:
+    # Camino anterior: read() completo para medir + read() completo para guardar
+    content = SyntheticVideo(size).read()
+    file_obj = io.BytesIO(content)
+    path = storage.upload_fileobj(io.BytesIO(file_obj.read()), key)
+    os.remove(path)
+    return len(content)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=50)
+    parser.add_argument("--size-mb", type=int, default=100)
+    parser.add_argument("--legacy", action="store_true")
+    args = parser.parse_args()
+
+    size = args.size_mb * 1024 * 1024
+    upload = upload_legacy if args.legacy else upload_streaming
+    process = psutil.Process()
+    base_rss = process.memory_info().rss
+    peak_rss = base_rss
+    done = threading.Event()
+
+    def sample_rss():
+        nonlocal peak_rss
+        while not done.is_set():
+            peak_rss = max(peak_rss, process.memory_info().rss)
+            time.sleep(0.01)
+
+    sampler = threading.Thread(target=sample_rss, daemon=True)
+    sampler.start()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage = LocalStorage(base_dir=tmp_dir)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.uploads) as pool:
+            futures = [
+                pool.submit(upload, storage, size, f"videos/{i}/{i}.mp4")
+                for i in range(args.uploads)
+            ]
+            total_bytes = sum(f.result() for f in futures)
+        elapsed = time.perf_counter() - start
+
+    done.set()
+    sampler.join()
+
+    mode = "legacy (read completo)" if args.legacy else "streaming por bloques"
+    extra_mb = (peak_rss - base_rss) / (1024 * 1024)
+    print(f"Modo:                 {mode}")
+    print(f"Subidas concurrentes: {args.uploads} x {args.size_mb} MB")
+    print(f"Bytes escritos:       {total_bytes}")
+    print(f"Tiempo total:         {elapsed:.2f} s")
+    print(f"RSS base:             {base_rss / (1024 * 1024):.1f} MB")
+    print(f"RSS pico:             {peak_rss / (1024 * 1024):.1f} MB")
+    print(f"RSS extra por subida: {extra_mb / args.uploads:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
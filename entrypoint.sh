@@ -4,4 +4,7 @@
 python -m app.init_db
 
 # Start the application
-exec uvicorn app.main:app --host 0.0.0.0 --port 8000
\ No newline at end of file
+# Uvicorn waits for open connections (SSE /api/public/live) before running the shutdown
+# hooks; after 5 s it cancels them so the deferred votes are flushed before docker stop
+# (10 s) sends SIGKILL
+exec uvicorn app.main:app --host 0.0.0.0 --port 8000 --timeout-graceful-shutdown 5
\ No newline at end of file
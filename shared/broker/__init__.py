@@ -1,6 +1,22 @@
 from celery import Celery
 from kombu import Queue
 import os
+import threading
+
+from shared.config.settings import settings
+
+PROCESS_VIDEO_TASK = "worker.tasks.video_processing.process_video_task"
+
+# Reintentos de publicación: reconecta al broker si la conexión del pool se cayó
+PUBLISH_RETRY_POLICY = {
+    "max_retries": 3,
+    "interval_start": 0,
+    "interval_step": 0.2,
+    "interval_max": 1,
+}
+
+_producer = None
+_producer_lock = threading.Lock()
 
 
 def create_celery_app(app_name: str, include_modules: list) -> Celery:
@@ -94,3 +110,34 @@ def create_celery_app(app_name: str, include_modules: list) -> Celery:
     )
 
     return celery_app
+
+
+def get_producer() -> Celery:
+    """
+    Devuelve el productor de Celery del proceso, creándolo en el primer uso.
+    Reutiliza el pool de conexiones al broker entre peticiones.
+    """
+    global _producer
+    if _producer is None:
+        with _producer_lock:
+            if _producer is None:
+                producer = create_celery_app(
+                    "video_processor", ["worker.tasks.video_processing"]
+                )
+                producer.conf.broker_pool_limit = int(
+                    os.getenv("BROKER_POOL_LIMIT", 10)
+                )
+                if producer.conf.broker_url.startswith("amqp"):
+                    # Publisher confirms: send_task espera el ack de RabbitMQ
+                    producer.conf.broker_transport_options = {"confirm_publish": True}
+                _producer = producer
+    return _producer
+
+
+def close_producer() -> None:
+    """Cierra el pool de conexiones del productor (al terminar el relay del outbox)"""
+    global _producer
+    with _producer_lock:
+        if _producer is not None:
+            _producer.close()
+            _producer = None
@@ -0,0 +1,117 @@
+"""
+Relay del outbox: publica en el broker (RabbitMQ o SQS) los mensajes pendientes
+de `outbox_messages` por lotes y los marca como enviados.
+
+Ejecución:
+    python -m shared.broker.outbox_relay
+
+La entrega es al menos una vez: si el commit falla después de publicar, el lote
+se vuelve a publicar con el mismo task_id.
+"""
+import datetime
+import logging
+import time
+
+from sqlalchemy.orm import Session
+
+from shared.broker import close_producer, get_producer, PUBLISH_RETRY_POLICY
+from shared.config.settings import settings
+from shared.db.config import SessionLocal
+from shared.db.models.outbox import OutboxMessage, OutboxStatus
+from shared.db.models.video import Video, VideoStatus
+
+logger = logging.getLogger(__name__)
+
+
+def relay_batch(db: Session, batch_size: int = settings.outbox_batch_size) -> int:
+    """
+    Publica hasta `batch_size` mensajes pendientes usando una sola conexión al broker.
+    Retorna cuántos mensajes se publicaron.
+    """
+    messages = (
+        db.query(OutboxMessage)
+        .filter(OutboxMessage.status == OutboxStatus.PENDING.value)
+        .order_by(OutboxMessage.created_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    if not messages:
+        db.rollback()
+        return 0
+
+    # Fechas en UTC sin zona horaria, como el resto de columnas DateTime
+    now = datetime.datetime.utcnow()
+    sent = 0
+    sent_video_ids = []
+    producer_app = get_producer()
+
+    try:
+        with producer_app.producer_or_acquire() as producer:
+            for message in messages:
+                producer_app.send_task(
+                    message.task_name,
+                    args=message.payload.get("args", []),
+                    queue=message.queue,
+                    task_id=message.id,
+                    producer=producer,
+                    retry=True,
+                    retry_policy=PUBLISH_RETRY_POLICY,
+                )
+                message.status = OutboxStatus.SENT.value
+                message.sent_at = now
+                sent += 1
+                if message.id_video:
+                    sent_video_ids.append(message.id_video)
+    except Exception as e:
+        # Broker caído: lo no publicado queda pendiente para el siguiente ciclo
+        logger.error(f"Error publicando mensajes del outbox: {str(e)}")
+        for message in messages:
+            if message.status == OutboxStatus.PENDING.value:
+                message.attempts += 1
+                message.last_error = str(e)
+
+    if sent_video_ids:
+        db.query(Video).filter(
+            Video.id.in_(sent_video_ids),
+            Video.status == VideoStatus.UPLOADED.value,
+        ).update(
+            {
+                Video.status: VideoStatus.PROCESSING.value,
+                Video.processing_started_at: now,
+            },
+            synchronize_session=False,
+        )
+
+    db.commit()
+    return sent
+
+
+def run_relay(
+    batch_size: int = settings.outbox_batch_size,
+    poll_interval: float = settings.outbox_poll_interval,
+) -> None:
+    """Ciclo principal del relay"""
+    logger.info(f"Outbox relay iniciado (lote={batch_size}, intervalo={poll_interval}s)")
+    try:
+        while True:
+            db = SessionLocal()
+            try:
+                published = relay_batch(db, batch_size)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Error en el ciclo del outbox relay: {str(e)}")
+                published = 0
+            finally:
+                db.close()
+
+            # Si el lote salió lleno hay más pendientes: seguir sin esperar
+            if published < batch_size:
+                time.sleep(poll_interval)
+    finally:
+        close_producer()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    run_relay()
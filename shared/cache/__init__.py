@@ -0,0 +1,234 @@
+"""
+Caché de respuestas para las lecturas públicas (/api/public/videos, /api/public/rankings).
+
+Backends: LRU en memoria por proceso (`memory`), Redis compartido (`redis`) o ninguno.
+Las claves incluyen una generación por espacio de nombres; invalidar es incrementar
+la generación. Con Redis (por defecto) la invalidación llega a todos los procesos
+(API y worker). `memory` es solo para un único proceso de API (pruebas, desarrollo):
+la invalidación no sale del proceso que la hace, así que el worker no la intenta.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+import redis
+
+from shared.config.settings import settings
+from shared.metrics.cache_metrics import response_cache_requests, response_cache_age_seconds
+
+logger = logging.getLogger(__name__)
+
+# Espacios de nombres invalidables
+PUBLIC_VIDEOS_CACHE = "public_videos"
+RANKINGS_CACHE = "rankings"
+
+# Tiempo máximo que una petición espera a otra que ya está calculando la misma clave
+COALESCE_TIMEOUT_SECONDS = 10
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    headers: Dict[str, str]
+    stored_at: float
+
+    def dumps(self) -> bytes:
+        return json.dumps(
+            {"body": self.body.decode(), "headers": self.headers, "stored_at": self.stored_at}
+        ).encode()
+
+    @classmethod
+    def loads(cls, data: bytes) -> "CachedResponse":
+        value = json.loads(data)
+        return cls(value["body"].encode(), value["headers"], value["stored_at"])
+
+
+class CacheBackend:
+    """Interfaz base"""
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    def get_generation(self, namespace: str) -> int:
+        raise NotImplementedError
+
+    def bump_generation(self, namespace: str) -> None:
+        raise NotImplementedError
+
+
+class NullCacheBackend(CacheBackend):
+    """Sin caché (solo agrupa peticiones concurrentes)"""
+
+    def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        pass
+
+    def get_generation(self, namespace: str) -> int:
+        return 0
+
+    def bump_generation(self, namespace: str) -> None:
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    """LRU acotado en memoria del proceso, con expiración por entrada"""
+
+    def __init__(self, max_entries: int = settings.response_cache_max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_generation(self, namespace: str) -> int:
+        return self._generations.get(namespace, 0)
+
+    def bump_generation(self, namespace: str) -> None:
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+
+class RedisCacheBackend(CacheBackend):
+    """Caché compartida en Redis. Si Redis falla, se comporta como un fallo de caché."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            return self.client.get(key)
+        except redis.RedisError as e:
+            logger.warning(f"Redis no disponible para la caché: {str(e)}")
+            return None
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        try:
+            self.client.set(key, value, px=max(1, int(ttl * 1000)))
+        except redis.RedisError as e:
+            logger.warning(f"Redis no disponible para la caché: {str(e)}")
+
+    def get_generation(self, namespace: str) -> int:
+        try:
+            return int(self.client.get(f"respcache:gen:{namespace}") or 0)
+        except redis.RedisError:
+            return 0
+
+    def bump_generation(self, namespace: str) -> None:
+        try:
+            self.client.incr(f"respcache:gen:{namespace}")
+        except redis.RedisError as e:
+            logger.warning(f"No se pudo invalidar la caché {namespace}: {str(e)}")
+
+
+class ResponseCache:
+    """
+    Caché de respuestas con TTL por clave y agrupación de peticiones: ante un fallo,
+    solo una petición por clave consulta la BD y las demás esperan su resultado.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, namespace: str, full_key: str) -> Optional[CachedResponse]:
+        data = self.backend.get(full_key)
+        if data is None:
+            return None
+        cached = CachedResponse.loads(data)
+        response_cache_age_seconds.labels(namespace=namespace).observe(
+            max(0.0, time.time() - cached.stored_at)
+        )
+        return cached
+
+    def get_or_set(
+        self,
+        namespace: str,
+        key: str,
+        ttl: float,
+        build: Callable[[], Tuple[bytes, Dict[str, str]]],
+    ) -> Tuple[CachedResponse, bool]:
+        """Retorna (respuesta, vino de la caché). `build` retorna (cuerpo, cabeceras)."""
+        full_key = f"respcache:{namespace}:{self.backend.get_generation(namespace)}:{key}"
+
+        cached = self._lookup(namespace, full_key)
+        if cached is not None:
+            response_cache_requests.labels(namespace=namespace, result="hit").inc()
+            return cached, True
+
+        with self._lock:
+            event = self._inflight.get(full_key)
+            leader = event is None
+            if leader:
+                event = self._inflight[full_key] = threading.Event()
+
+        if not leader:
+            event.wait(COALESCE_TIMEOUT_SECONDS)
+            cached = self._lookup(namespace, full_key)
+            if cached is not None:
+                response_cache_requests.labels(namespace=namespace, result="coalesced").inc()
+                return cached, True
+
+        response_cache_requests.labels(namespace=namespace, result="miss").inc()
+        try:
+            body, headers = build()
+            response = CachedResponse(body, headers, time.time())
+            self.backend.set(full_key, response.dumps(), ttl)
+            return response, False
+        finally:
+            if leader:
+                with self._lock:
+                    self._inflight.pop(full_key, None)
+                event.set()
+
+    def invalidate(self, *namespaces: str) -> None:
+        for namespace in namespaces:
+            self.backend.bump_generation(namespace)
+
+
+def create_response_cache() -> ResponseCache:
+    if settings.response_cache_backend == "redis":
+        client = redis.Redis(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            db=settings.redis_db,
+            password=settings.redis_password or None,
+            socket_timeout=0.5,
+        )
+        return ResponseCache(RedisCacheBackend(client))
+    if settings.response_cache_backend == "none":
+        return ResponseCache(NullCacheBackend())
+    return ResponseCache(MemoryCacheBackend())
+
+
+response_cache = create_response_cache()
+
+
+def invalidate_public_reads() -> None:
+    """Invalida /videos y /rankings tras un cambio en votos o en los videos procesados"""
+    response_cache.invalidate(PUBLIC_VIDEOS_CACHE, RANKINGS_CACHE)
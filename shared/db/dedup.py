@@ -0,0 +1,27 @@
+"""
+Deduplicación por contenido: un video idéntico (mismo SHA-256) ya procesado no se
+vuelve a procesar; el nuevo registro reutiliza su versión procesada.
+"""
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from shared.db.models.video import Video, VideoStatus
+
+
+def find_processed_duplicate(
+    db: Session, content_sha256: str, exclude_id: Optional[str] = None
+):
+    """Columnas procesadas de un video con el mismo contenido, o None"""
+    query = db.query(
+        Video.file_processed_url,
+        Video.processed_duration_seconds,
+        Video.processed_resolution,
+    ).filter(
+        Video.content_sha256 == content_sha256,
+        Video.status == VideoStatus.PROCESSED.value,
+        Video.file_processed_url.isnot(None),
+    )
+    if exclude_id is not None:
+        query = query.filter(Video.id != exclude_id)
+    return query.first()
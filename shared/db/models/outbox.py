@@ -0,0 +1,44 @@
+from sqlalchemy import Column, ForeignKey, Index
+from sqlalchemy import String, Integer, DateTime, JSON
+from sqlalchemy.orm import relationship
+from enum import Enum
+from shared.db.config import Base
+
+import datetime
+
+
+class OutboxStatus(Enum):
+    PENDING = "pending"
+    SENT = "sent"
+
+
+class OutboxMessage(Base):
+    """
+    Mensaje pendiente de publicar en el broker.
+    Se escribe en la misma transacción que el Video; el relay lo publica después.
+    """
+
+    __tablename__ = "outbox_messages"
+
+    # Se usa también como id de la tarea de Celery
+    id = Column(String, primary_key=True)
+    task_name = Column(String, nullable=False)
+    queue = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(String, nullable=False, default=OutboxStatus.PENDING.value)
+    id_video = Column(
+        String, ForeignKey("videos.id", ondelete="CASCADE"), index=True
+    )
+
+    # Control de entrega
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(String)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    sent_at = Column(DateTime)
+
+    # Relaciones
+    video = relationship("Video")
+
+    __table_args__ = (
+        Index("ix_outbox_messages_status_created_at", "status", "created_at"),
+    )
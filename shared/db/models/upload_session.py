@@ -0,0 +1,48 @@
+from sqlalchemy import Column, ForeignKey
+from sqlalchemy import String, Integer, DateTime
+from sqlalchemy.orm import relationship
+from shared.db.config import Base
+
+import datetime
+
+
+class UploadSession(Base):
+    """Subida reanudable por partes; al finalizar se convierte en un Video con el mismo id"""
+
+    __tablename__ = "upload_sessions"
+
+    id = Column(String, primary_key=True)
+    id_user = Column(
+        String, ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False
+    )
+    title = Column(String, nullable=False)
+    filename = Column(String, nullable=False)
+    total_size = Column(Integer, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+
+    # Id de la subida multipart en el backend de almacenamiento
+    storage_upload_id = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    # Relaciones
+    parts = relationship(
+        "UploadPart", back_populates="session", cascade="all, delete-orphan"
+    )
+
+
+class UploadPart(Base):
+    __tablename__ = "upload_parts"
+
+    id_session = Column(
+        String,
+        ForeignKey("upload_sessions.id", ondelete="CASCADE"),
+        primary_key=True,
+        nullable=False,
+    )
+    part_number = Column(Integer, primary_key=True, nullable=False)
+    size = Column(Integer, nullable=False)
+    etag = Column(String, nullable=False)
+    uploaded_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    # Relaciones
+    session = relationship("UploadSession", back_populates="parts")
@@ -0,0 +1,40 @@
+from sqlalchemy import Column, ForeignKey, Index
+from sqlalchemy import String, Integer, DateTime
+from shared.db.config import Base
+
+import datetime
+
+
+class UserRanking(Base):
+    """
+    Ranking precalculado: votos totales de los videos procesados de cada usuario.
+    Se actualiza con cada voto y cada video procesado; /rankings lee el top-K por índice.
+    """
+
+    __tablename__ = "user_rankings"
+
+    id_user = Column(
+        String, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    # Copia de los datos del usuario para leer el ranking sin join
+    first_name = Column(String, nullable=False)
+    last_name = Column(String, nullable=False)
+    city = Column(String)
+    # Ciudad en minúsculas y sin espacios extremos (filtro ?city=)
+    city_normalized = Column(String)
+    total_votes = Column(Integer, nullable=False, default=0)
+    processed_videos = Column(Integer, nullable=False, default=0)
+    updated_at = Column(
+        DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow
+    )
+
+    __table_args__ = (
+        # Orden y paginación por (total_votes, id_user) descendente
+        Index("ix_user_rankings_votes", total_votes.desc(), id_user.desc()),
+        Index(
+            "ix_user_rankings_city_votes",
+            city_normalized,
+            total_votes.desc(),
+            id_user.desc(),
+        ),
+    )
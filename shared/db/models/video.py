@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey
+from sqlalchemy import Column, ForeignKey, Index, and_
 from sqlalchemy import String, Integer, DateTime, Float
 from sqlalchemy.orm import relationship
 from enum import Enum
@@ -30,6 +30,7 @@ class Video(Base):
     file_size_bytes = Column(Integer)  # Máximo 100MB = 104,857,600 bytes
     original_duration_seconds = Column(Float)
     original_resolution = Column(String)
+    content_sha256 = Column(String(64), index=True)
 
     # Metadatos del video procesado
     processed_duration_seconds = Column(
@@ -55,3 +56,27 @@ class Video(Base):
     votes_relation = relationship(
         "Vote", back_populates="video", cascade="all, delete-orphan"
     )
+
+    __table_args__ = (
+        # Listado público paginado por (processed_at, id), solo videos procesados.
+        # processed_at no nulo en el predicado: el keyset es un único rango del índice
+        Index(
+            "ix_videos_public_processed_at",
+            processed_at.desc(),
+            id.desc(),
+            postgresql_where=and_(
+                status == VideoStatus.PROCESSED.value, processed_at.isnot(None)
+            ),
+            sqlite_where=and_(
+                status == VideoStatus.PROCESSED.value, processed_at.isnot(None)
+            ),
+        ),
+        # Listado del usuario (GET /api/videos/): sus videos, por estado y uploaded_at
+        Index(
+            "ix_videos_user_status_uploaded",
+            id_user,
+            status,
+            uploaded_at.desc(),
+            id.desc(),
+        ),
+    )
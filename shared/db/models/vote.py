@@ -21,8 +21,12 @@ class Vote(Base):
         primary_key=True,
         nullable=False,
     )
+    # Indexado para las exportaciones incrementales por fecha de voto
     voted_at = Column(
-        DateTime, default=datetime.datetime.now(datetime.timezone.utc), nullable=False
+        DateTime,
+        default=datetime.datetime.now(datetime.timezone.utc),
+        nullable=False,
+        index=True,
     )
 
     # Relaciones
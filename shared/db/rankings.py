@@ -0,0 +1,143 @@
+"""
+Mantenimiento incremental de `user_rankings`.
+
+Recalcular desde cero (reconciliación):
+    python -m shared.db.rankings
+
+La carga inicial la hace `python -m app.init_db` (entrypoint de la API) cuando la
+tabla está vacía y ya hay videos procesados.
+"""
+from typing import Optional
+
+from sqlalchemy import bindparam, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from shared.db.config import SessionLocal
+from shared.db.models.user import User
+from shared.db.models.user_ranking import UserRanking
+from shared.db.models.video import Video, VideoStatus
+
+rankings_table = UserRanking.__table__
+videos_table = Video.__table__
+
+
+def normalize_city(city: Optional[str]) -> Optional[str]:
+    return city.strip().lower() if city else None
+
+
+def _insert_ignore(db: Session, table):
+    dialect = db.get_bind().dialect.name
+    insert = pg_insert if dialect == "postgresql" else sqlite_insert
+    return insert(table)
+
+
+def add_processed_video(db: Session, id_user: str, votes: int = 0) -> None:
+    """Suma un video procesado (y sus votos) al ranking del usuario. No hace commit."""
+    user = db.execute(
+        select(User.first_name, User.last_name, User.city).where(User.id == id_user)
+    ).one()
+    # Crear la fila si no existe (dos workers pueden procesar videos del mismo usuario)
+    db.execute(
+        _insert_ignore(db, rankings_table)
+        .values(
+            id_user=id_user,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            city=user.city,
+            city_normalized=normalize_city(user.city),
+            total_votes=0,
+            processed_videos=0,
+        )
+        .on_conflict_do_nothing()
+    )
+    db.execute(
+        update(UserRanking)
+        .where(UserRanking.id_user == id_user)
+        .values(
+            total_votes=UserRanking.total_votes + votes,
+            processed_videos=UserRanking.processed_videos + 1,
+        )
+    )
+
+
+def add_video_votes_statement():
+    """
+    UPDATE que suma `b_votes` al ranking del dueño del video `b_video_id`.
+    Admite ejecución por lotes (executemany).
+    """
+    owner = (
+        select(videos_table.c.id_user)
+        .where(videos_table.c.id == bindparam("b_video_id"))
+        .scalar_subquery()
+    )
+    return (
+        update(rankings_table)
+        .where(rankings_table.c.id_user == owner)
+        .values(total_votes=rankings_table.c.total_votes + bindparam("b_votes"))
+    )
+
+
+def rebuild_user_rankings(db: Session) -> int:
+    """Recalcula todo el ranking desde los videos procesados. Retorna los usuarios rankeados."""
+    totals = (
+        select(
+            Video.id_user,
+            func.coalesce(func.sum(Video.votes), 0).label("total_votes"),
+            func.count().label("processed_videos"),
+        )
+        .where(Video.status == VideoStatus.PROCESSED.value)
+        .group_by(Video.id_user)
+        .subquery()
+    )
+    rows = db.execute(
+        select(
+            User.id, User.first_name, User.last_name, User.city,
+            totals.c.total_votes, totals.c.processed_videos,
+        ).join(totals, totals.c.id_user == User.id)
+    ).all()
+
+    db.execute(delete(UserRanking))
+    if rows:
+        db.execute(
+            rankings_table.insert(),
+            [
+                {
+                    "id_user": row.id,
+                    "first_name": row.first_name,
+                    "last_name": row.last_name,
+                    "city": row.city,
+                    "city_normalized": normalize_city(row.city),
+                    "total_votes": row.total_votes,
+                    "processed_videos": row.processed_videos,
+                }
+                for row in rows
+            ],
+        )
+    db.commit()
+    return len(rows)
+
+
+def backfill_user_rankings(db: Session) -> Optional[int]:
+    """
+    Llena `user_rankings` si está vacía y existen videos procesados (despliegue sobre
+    una base con datos previos a la tabla). Retorna los usuarios rankeados, o None si
+    no hizo falta.
+    """
+    if db.execute(select(UserRanking.id_user).limit(1)).first() is not None:
+        return None
+    processed = db.execute(
+        select(Video.id).where(Video.status == VideoStatus.PROCESSED.value).limit(1)
+    ).first()
+    if processed is None:
+        return None
+    return rebuild_user_rankings(db)
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        print(f"Usuarios en el ranking: {rebuild_user_rankings(db)}")
+    finally:
+        db.close()
@@ -0,0 +1,55 @@
+"""
+Actualización idempotente del esquema de una base existente.
+
+`Base.metadata.create_all` solo crea tablas nuevas: no agrega columnas ni índices a las
+que ya existen. `upgrade_schema` lo completa después de `create_all` (lo llama
+`python -m app.init_db`, entrypoint de la API) y puede ejecutarse cualquier número de
+veces: solo agrega lo que falta.
+"""
+from typing import List
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateIndex
+
+from shared.db.config import Base
+
+
+def upgrade_schema(engine: Engine) -> List[str]:
+    """
+    Agrega las columnas e índices de los modelos que faltan en tablas existentes.
+    Retorna los cambios aplicados ("tabla.columna" o el nombre del índice).
+    Solo columnas anulables: una columna NOT NULL necesitaría un valor para las filas existentes.
+    """
+    applied = []
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        existing_tables = set(inspector.get_table_names())
+        dialect = conn.dialect
+        # Varias réplicas de la API pueden ejecutar init_db a la vez
+        if_not_exists = "IF NOT EXISTS " if dialect.name == "postgresql" else ""
+
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in columns:
+                    continue
+                if not column.nullable:
+                    raise RuntimeError(
+                        f"Columna NOT NULL sin migración: {table.name}.{column.name}"
+                    )
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {table.name} ADD COLUMN {if_not_exists}{column.name} "
+                    f"{column.type.compile(dialect=dialect)}"
+                )
+                applied.append(f"{table.name}.{column.name}")
+
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                if index.name not in indexes:
+                    conn.execute(CreateIndex(index, if_not_exists=True))
+                    applied.append(index.name)
+    return applied
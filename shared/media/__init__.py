@@ -0,0 +1,150 @@
+import struct
+from typing import BinaryIO, NamedTuple, Optional
+
+# Tamaño máximo aceptado para el átomo moov (solo metadatos, normalmente unos KB)
+MAX_MOOV_BYTES = 16 * 1024 * 1024
+
+
+class MP4ProbeError(Exception):
+    """El archivo no es un MP4 decodificable"""
+
+
+class MP4Info(NamedTuple):
+    duration_seconds: Optional[float]
+    width: int
+    height: int
+
+    @property
+    def resolution(self) -> str:
+        return f"{self.width}x{self.height}"
+
+
+def read_box_header(file_obj: BinaryIO):
+    """Lee la cabecera de un átomo. Retorna (tipo, tamaño total, tamaño cabecera) o None al final"""
+    header = file_obj.read(8)
+    if not header:
+        return None
+    if len(header) < 8:
+        raise MP4ProbeError("Cabecera de átomo truncada")
+
+    size, box_type = struct.unpack(">I4s", header)
+    header_size = 8
+    if size == 1:
+        large = file_obj.read(8)
+        if len(large) < 8:
+            raise MP4ProbeError("Cabecera de átomo truncada")
+        size = struct.unpack(">Q", large)[0]
+        header_size = 16
+    elif size == 0:
+        # El átomo llega hasta el final del archivo
+        size = None
+
+    if size is not None and size < header_size:
+        raise MP4ProbeError(f"Tamaño inválido para el átomo {box_type!r}")
+    return box_type, size, header_size
+
+
+def iter_boxes(data: bytes):
+    """Itera (tipo, contenido) de los átomos contenidos en un bloque en memoria"""
+    offset = 0
+    while offset + 8 <= len(data):
+        size, box_type = struct.unpack_from(">I4s", data, offset)
+        header_size = 8
+        if size == 1:
+            if offset + 16 > len(data):
+                raise MP4ProbeError("Cabecera de átomo truncada")
+            size = struct.unpack_from(">Q", data, offset + 8)[0]
+            header_size = 16
+        elif size == 0:
+            size = len(data) - offset
+        if size < header_size or offset + size > len(data):
+            raise MP4ProbeError(f"Átomo {box_type!r} truncado")
+        yield box_type, data[offset + header_size:offset + size]
+        offset += size
+
+
+def parse_mvhd(payload: bytes) -> Optional[float]:
+    """Duración en segundos según mvhd"""
+    try:
+        if payload[0] == 1:
+            timescale, duration = struct.unpack_from(">IQ", payload, 20)
+        else:
+            timescale, duration = struct.unpack_from(">II", payload, 12)
+    except (IndexError, struct.error):
+        raise MP4ProbeError("Átomo mvhd truncado")
+    if timescale == 0:
+        raise MP4ProbeError("Átomo mvhd con timescale inválido")
+    # MP4 fragmentado: la duración real está en los fragmentos
+    if duration == 0 or duration in (0xFFFFFFFF, 0xFFFFFFFFFFFFFFFF):
+        return None
+    return duration / timescale
+
+
+def parse_trak(payload: bytes):
+    """Retorna (handler, ancho, alto) de una pista"""
+    handler = None
+    width = height = 0
+    for box_type, box in iter_boxes(payload):
+        if box_type == b"tkhd":
+            # Ancho y alto (16.16 punto fijo) son los últimos 8 bytes de tkhd
+            if len(box) < 84:
+                raise MP4ProbeError("Átomo tkhd truncado")
+            width, height = struct.unpack(">II", box[-8:])
+            width >>= 16
+            height >>= 16
+        elif box_type == b"mdia":
+            for mdia_type, mdia_box in iter_boxes(box):
+                if mdia_type == b"hdlr" and len(mdia_box) >= 12:
+                    handler = mdia_box[8:12]
+    return handler, width, height
+
+
+def probe_mp4(file_obj: BinaryIO) -> MP4Info:
+    """
+    Lee solo las cabeceras de un MP4 (ftyp/moov/mvhd/tkhd) sin decodificar el video.
+    Los átomos de datos (mdat) se saltan con seek, así que el costo no depende del tamaño.
+    El objeto de archivo queda posicionado al inicio.
+    """
+    start = file_obj.tell()
+    try:
+        first = read_box_header(file_obj)
+        if first is None or first[0] != b"ftyp":
+            raise MP4ProbeError("El archivo no inicia con un átomo ftyp")
+
+        moov = None
+        offset = start
+        box = first
+        while box is not None:
+            box_type, size, header_size = box
+            if box_type == b"moov":
+                if size is None or size > MAX_MOOV_BYTES:
+                    raise MP4ProbeError("Átomo moov demasiado grande")
+                moov = file_obj.read(size - header_size)
+                if len(moov) < size - header_size:
+                    raise MP4ProbeError("Átomo moov truncado")
+                break
+            if size is None:
+                break
+            offset += size
+            file_obj.seek(offset)
+            box = read_box_header(file_obj)
+
+        if moov is None:
+            raise MP4ProbeError("El archivo no contiene un átomo moov")
+
+        duration = None
+        video_track = None
+        for box_type, payload in iter_boxes(moov):
+            if box_type == b"mvhd":
+                duration = parse_mvhd(payload)
+            elif box_type == b"trak":
+                handler, width, height = parse_trak(payload)
+                if handler == b"vide" and width and height and video_track is None:
+                    video_track = (width, height)
+
+        if video_track is None:
+            raise MP4ProbeError("El archivo no contiene una pista de video")
+
+        return MP4Info(duration, video_track[0], video_track[1])
+    finally:
+        file_obj.seek(start)
@@ -0,0 +1,89 @@
+# api_metrics.py
+from prometheus_client import Counter, Gauge, Histogram
+
+# -------------------------
+# Métricas de la API
+# -------------------------
+
+# Tasa de aciertos: rate(api_upload_dedup_hits_total) / rate(api_upload_dedup_lookups_total)
+upload_dedup_lookups = Counter(
+    "api_upload_dedup_lookups_total",
+    "Subidas verificadas contra videos ya procesados (por SHA-256)"
+)
+
+upload_dedup_hits = Counter(
+    "api_upload_dedup_hits_total",
+    "Subidas que reutilizaron un video ya procesado sin encolar procesamiento"
+)
+
+# Saturación del threadpool: api_threadpool_in_use / api_threadpool_size
+threadpool_size = Gauge(
+    "api_threadpool_size",
+    "Hilos disponibles en el threadpool de AnyIO"
+)
+
+threadpool_in_use = Gauge(
+    "api_threadpool_in_use",
+    "Hilos del threadpool de AnyIO ocupados"
+)
+
+# Caché token -> usuario: rate(api_token_cache_hits_total) / (hits + misses)
+token_cache_hits = Counter(
+    "api_token_cache_hits_total",
+    "Peticiones autenticadas resueltas desde la caché de tokens"
+)
+
+token_cache_misses = Counter(
+    "api_token_cache_misses_total",
+    "Peticiones autenticadas que consultaron al usuario en la BD"
+)
+
+# Hashing de contraseñas (incluye la espera en cola del pool de procesos)
+password_hash_seconds = Histogram(
+    "api_password_hash_seconds",
+    "Latencia de hashing/verificación de contraseñas",
+    ["operation"],
+    buckets=[0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+)
+
+password_hash_in_flight = Gauge(
+    "api_password_hash_in_flight",
+    "Operaciones de hashing en cola o en ejecución"
+)
+
+password_hash_rejected = Counter(
+    "api_password_hash_rejected_total",
+    "Peticiones rechazadas (503) por saturación del pool de hashing"
+)
+
+# Votos diferidos (VOTE_WRITE_BEHIND): votos registrados aún no sumados a videos.votes
+vote_write_behind_pending = Gauge(
+    "api_vote_write_behind_pending",
+    "Votos pendientes de sumar a videos.votes en este proceso"
+)
+
+vote_write_behind_lag_seconds = Gauge(
+    "api_vote_write_behind_lag_seconds",
+    "Antigüedad del voto pendiente más antiguo"
+)
+
+vote_write_behind_flush_errors = Counter(
+    "api_vote_write_behind_flush_errors_total",
+    "Lotes de votos que fallaron al aplicarse (se reintentan)"
+)
+
+vote_counter_drift = Gauge(
+    "api_vote_counter_drift",
+    "Diferencia absoluta entre videos.votes y las filas de votes (última reconciliación)"
+)
+
+# Ranking en vivo (SSE): conexiones abiertas y consultas del productor (una por intervalo)
+live_updates_subscribers = Gauge(
+    "api_live_updates_subscribers",
+    "Conexiones SSE abiertas a /api/public/live"
+)
+
+live_updates_refreshes = Counter(
+    "api_live_updates_refreshes_total",
+    "Consultas del productor de actualizaciones en vivo"
+)
@@ -0,0 +1,21 @@
+# cache_metrics.py
+from prometheus_client import Counter, Histogram
+
+# -------------------------
+# Métricas de shared.cache (la importan la API y el worker)
+# -------------------------
+
+# Caché de respuestas públicas: tasa de aciertos = (hit + coalesced) / total
+response_cache_requests = Counter(
+    "api_response_cache_requests_total",
+    "Consultas a la caché de respuestas por resultado (hit, coalesced, miss)",
+    ["namespace", "result"]
+)
+
+# Antigüedad de las respuestas servidas desde la caché
+response_cache_age_seconds = Histogram(
+    "api_response_cache_age_seconds",
+    "Antigüedad de la respuesta servida desde la caché",
+    ["namespace"],
+    buckets=[0.1, 0.5, 1, 2, 5, 10, 30, 60]
+)
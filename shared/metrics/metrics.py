@@ -22,6 +22,36 @@ video_processing_time = Histogram(
     "Duración del procesamiento de cada video (en segundos)"
 )
 
+# Passthrough: rate(...{mode="passthrough"}) / sum(rate(worker_video_clip_modes_total))
+video_clip_modes = Counter(
+    "worker_video_clip_modes_total",
+    "Clips procesados por modo (passthrough, remux, transcode)",
+    ["mode"]
+)
+
+ffmpeg_cpu_seconds = Counter(
+    "worker_ffmpeg_cpu_seconds_total",
+    "CPU (usuario + sistema) consumida por ffmpeg al preparar el clip",
+    ["mode"]
+)
+
+transcode_cpu_seconds_saved = Counter(
+    "worker_transcode_cpu_seconds_saved_total",
+    "CPU estimada que se habría gastado recodificando los clips copiados"
+)
+
+# Deduplicación de subidas reanudables y directas (el hash se calcula en el worker):
+# rate(worker_video_dedup_hits_total) / rate(worker_video_dedup_lookups_total)
+video_dedup_lookups = Counter(
+    "worker_video_dedup_lookups_total",
+    "Videos verificados contra videos ya procesados (por SHA-256)"
+)
+
+video_dedup_hits = Counter(
+    "worker_video_dedup_hits_total",
+    "Videos que reutilizaron una versión ya procesada sin ejecutar ffmpeg"
+)
+
 # -------------------------
 # Métricas del sistema
 # -------------------------
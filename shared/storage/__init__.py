@@ -1,9 +1,164 @@
+import hashlib
+import hmac
+import io
 import os
+import shutil
+import time
+import uuid
+from functools import partial
+import anyio
+import anyio.to_thread
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
-from typing import BinaryIO, Optional
+from typing import BinaryIO, List, Optional, Tuple
 from shared.config.settings import settings
 
+# S3 no acepta partes multipart menores a 5MB (salvo la última)
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """El archivo supera el tamaño máximo permitido"""
+
+
+class LimitedReader:
+    """
+    Envuelve un objeto de archivo, cuenta los bytes leídos y calcula su SHA-256.
+    Lanza UploadTooLargeError apenas se supera `max_bytes`, sin esperar al final.
+    """
+
+    def __init__(self, file_obj: BinaryIO, max_bytes: int):
+        self.file_obj = file_obj
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self._hash = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            # Nunca leer más de lo necesario para detectar el exceso
+            size = self.max_bytes - self.bytes_read + 1
+        return self._consume(self.file_obj.read(size))
+
+    def _consume(self, data: bytes) -> bytes:
+        self.bytes_read += len(data)
+        if self.bytes_read > self.max_bytes:
+            raise UploadTooLargeError(
+                f"El archivo excede el límite de {self.max_bytes} bytes"
+            )
+        self._hash.update(data)
+        return data
+
+    @property
+    def sha256(self) -> str:
+        """SHA-256 (hex) de los bytes leídos hasta el momento"""
+        return self._hash.hexdigest()
+
+
+class AsyncLimitedReader(LimitedReader):
+    """
+    Variante de LimitedReader para objetos con `async read()` (p. ej. UploadFile).
+    """
+
+    async def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.max_bytes - self.bytes_read + 1
+        return self._consume(await self.file_obj.read(size))
+
+
+class StorageWriter:
+    """
+    Escritura secuencial de un archivo por bloques, a medida que se produce.
+    `close` lo publica y retorna la URL; `abort` descarta lo escrito.
+    """
+
+    def __init__(self):
+        self.bytes_written = 0
+
+    def write(self, data: bytes) -> None:
+        raise NotImplementedError
+
+    def close(self) -> str:
+        raise NotImplementedError
+
+    def abort(self) -> None:
+        raise NotImplementedError
+
+
+class LocalFileWriter(StorageWriter):
+    """Agrega los bloques a un archivo temporal junto al destino; se renombra al cerrar"""
+
+    def __init__(self, dest_path: str):
+        super().__init__()
+        self.dest_path = dest_path
+        self.tmp_path = f"{dest_path}.{os.getpid()}.part"
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        self._file = open(self.tmp_path, "wb")
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+        self.bytes_written += len(data)
+
+    def close(self) -> str:
+        self._file.close()
+        os.replace(self.tmp_path, self.dest_path)
+        return self.dest_path
+
+    def abort(self) -> None:
+        self._file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+class S3MultipartWriter(StorageWriter):
+    """
+    Sube cada parte en cuanto se acumulan `part_size` bytes: la memoria queda acotada a
+    una parte. Si todo cabe en una parte se usa un solo PUT.
+    """
+
+    def __init__(self, storage: "S3Storage", key: str, part_size: int = S3_MIN_PART_SIZE):
+        super().__init__()
+        self.storage = storage
+        self.key = key
+        self.part_size = max(part_size, S3_MIN_PART_SIZE)
+        self.buffer = bytearray()
+        self.parts: List[Tuple[int, str]] = []
+        self.upload_id = None
+
+    def write(self, data: bytes) -> None:
+        self.buffer.extend(data)
+        self.bytes_written += len(data)
+        while len(self.buffer) >= self.part_size:
+            self._upload_part(bytes(self.buffer[:self.part_size]))
+            del self.buffer[:self.part_size]
+
+    def _upload_part(self, body: bytes) -> None:
+        if self.upload_id is None:
+            self.upload_id = self.storage.create_multipart_upload(self.key)
+        part_number = len(self.parts) + 1
+        etag = self.storage.upload_part(self.key, self.upload_id, part_number, io.BytesIO(body))
+        self.parts.append((part_number, etag))
+
+    def close(self) -> str:
+        if self.upload_id is None:
+            try:
+                self.storage.s3_client.put_object(
+                    Bucket=self.storage.bucket_name, Key=self.key, Body=bytes(self.buffer)
+                )
+            except ClientError as e:
+                raise Exception(f"Error uploading to S3: {str(e)}")
+            return self.storage.get_file_url(self.key)
+        if self.buffer:
+            self._upload_part(bytes(self.buffer))
+            self.buffer = bytearray()
+        return self.storage.complete_multipart_upload(self.key, self.upload_id, self.parts)
+
+    def abort(self) -> None:
+        self.buffer = bytearray()
+        if self.upload_id is not None:
+            self.storage.abort_multipart_upload(self.key, self.upload_id)
+            self.upload_id = None
+
 
 class StorageBackend:
     """Interfaz base"""
@@ -16,6 +171,17 @@ class StorageBackend:
         """Sube un objeto de archivo y retorna la URL"""
         raise NotImplementedError
 
+    async def upload_fileobj_async(self, file_obj, key: str) -> str:
+        """
+        Sube un objeto con `async read()` y retorna la URL.
+        No ocupa un hilo del threadpool mientras se espera al cliente.
+        """
+        raise NotImplementedError
+
+    def open_writer(self, key: str) -> StorageWriter:
+        """Abre el archivo para escribirlo por bloques mientras se produce"""
+        raise NotImplementedError
+
     def download_file(self, key: str, local_path: str) -> None:
         """Descarga un archivo a ruta local"""
         raise NotImplementedError
@@ -32,6 +198,52 @@ class StorageBackend:
         """Retorna la URL pública del archivo"""
         raise NotImplementedError
 
+    def open_file(self, key: str) -> BinaryIO:
+        """Abre el archivo para lectura con acceso aleatorio (seek)"""
+        raise NotImplementedError
+
+    def get_file_size(self, key: str) -> Optional[int]:
+        """Retorna el tamaño del archivo, o None si no existe"""
+        raise NotImplementedError
+
+    def generate_upload_request(self, key: str, expires_in: int, max_bytes: int) -> dict:
+        """
+        Petición firmada para que el cliente suba el archivo: método, URL, campos
+        del formulario y cabeceras. El almacenamiento rechaza cuerpos de más de `max_bytes`.
+        """
+        raise NotImplementedError
+
+    def move_file(self, src_key: str, dst_key: str) -> str:
+        """Mueve un archivo a otra clave y retorna la URL del destino"""
+        raise NotImplementedError
+
+    def generate_download_url(self, key: str, expires_in: int) -> str:
+        """Ruta o URL firmada desde la que se puede leer el archivo por rangos"""
+        raise NotImplementedError
+
+    def create_multipart_upload(self, key: str) -> str:
+        """Inicia una subida por partes y retorna su id"""
+        raise NotImplementedError
+
+    def upload_part(
+        self, key: str, upload_id: str, part_number: int, file_obj: BinaryIO, offset: int = 0
+    ) -> str:
+        """
+        Sube (o reemplaza) una parte y retorna su ETag.
+        `offset`: posición de la parte en el archivo final
+        """
+        raise NotImplementedError
+
+    def complete_multipart_upload(
+        self, key: str, upload_id: str, parts: List[Tuple[int, str]]
+    ) -> str:
+        """Une las partes (número, ETag) en orden y retorna la URL"""
+        raise NotImplementedError
+
+    def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        """Descarta una subida por partes"""
+        raise NotImplementedError
+
 
 class LocalStorage(StorageBackend):
     """Backend de almacenamiento local"""
@@ -45,26 +257,54 @@ class LocalStorage(StorageBackend):
         dest_path = os.path.join(self.base_dir, key)
         os.makedirs(os.path.dirname(dest_path), exist_ok=True)
 
-        with open(file_path, "rb") as src, open(dest_path, "wb") as dst:
-            dst.write(src.read())
+        shutil.copyfile(file_path, dest_path)
 
         return dest_path
 
     def upload_fileobj(self, file_obj: BinaryIO, key: str) -> str:
-        """Guarda objeto de archivo localmente"""
+        """Guarda objeto de archivo localmente, por bloques de tamaño fijo"""
         dest_path = os.path.join(self.base_dir, key)
         os.makedirs(os.path.dirname(dest_path), exist_ok=True)
 
-        with open(dest_path, "wb") as f:
-            f.write(file_obj.read())
+        try:
+            with open(dest_path, "wb") as f:
+                shutil.copyfileobj(file_obj, f, settings.upload_chunk_size)
+        except Exception:
+            # No dejar archivos parciales
+            if os.path.exists(dest_path):
+                os.remove(dest_path)
+            raise
 
         return dest_path
 
+    async def upload_fileobj_async(self, file_obj, key: str) -> str:
+        """Guarda el objeto localmente con escrituras asíncronas, bloque a bloque"""
+        dest_path = os.path.join(self.base_dir, key)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+
+        try:
+            async with await anyio.open_file(dest_path, "wb") as f:
+                while True:
+                    data = await file_obj.read(settings.upload_chunk_size)
+                    if not data:
+                        break
+                    await f.write(data)
+        except BaseException:
+            # No dejar archivos parciales (también si el cliente se desconecta)
+            if os.path.exists(dest_path):
+                os.remove(dest_path)
+            raise
+
+        return dest_path
+
+    def open_writer(self, key: str) -> StorageWriter:
+        """Escribe directamente en el destino local"""
+        return LocalFileWriter(os.path.join(self.base_dir, key))
+
     def download_file(self, key: str, local_path: str) -> None:
         """Copia archivo local a local"""
         src_path = os.path.join(self.base_dir, key)
-        with open(src_path, "rb") as src, open(local_path, "wb") as dst:
-            dst.write(src.read())
+        shutil.copyfile(src_path, local_path)
 
     def delete_file(self, key: str) -> bool:
         """Elimina archivo local"""
@@ -82,6 +322,100 @@ class LocalStorage(StorageBackend):
         """Retorna ruta local como URL"""
         return os.path.join(self.base_dir, key)
 
+    def open_file(self, key: str) -> BinaryIO:
+        """Abre archivo local"""
+        return open(os.path.join(self.base_dir, key), "rb")
+
+    def get_file_size(self, key: str) -> Optional[int]:
+        """Tamaño del archivo local"""
+        file_path = os.path.join(self.base_dir, key)
+        if not os.path.exists(file_path):
+            return None
+        return os.path.getsize(file_path)
+
+    def _sign(self, key: str, expires: int) -> str:
+        message = f"{key}:{expires}".encode()
+        return hmac.new(settings.secret_key.encode(), message, hashlib.sha256).hexdigest()
+
+    def generate_upload_request(self, key: str, expires_in: int, max_bytes: int) -> dict:
+        """
+        Equivalente local de una URL prefirmada de S3: apunta a la API,
+        que valida la firma y el tamaño (MAX_UPLOAD_BYTES) antes de escribir el archivo.
+        """
+        expires = int(time.time()) + expires_in
+        signature = self._sign(key, expires)
+        return {
+            "method": "PUT",
+            "url": f"{settings.local_signed_url_base}/{key}?expires={expires}&signature={signature}",
+            "fields": {},
+            "headers": {"Content-Type": "video/mp4"},
+        }
+
+    def move_file(self, src_key: str, dst_key: str) -> str:
+        """Renombra el archivo (atómico dentro del mismo directorio base)"""
+        dest_path = os.path.join(self.base_dir, dst_key)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        os.replace(os.path.join(self.base_dir, src_key), dest_path)
+        return dest_path
+
+    def generate_download_url(self, key: str, expires_in: int) -> str:
+        """El archivo local se lee directamente desde su ruta"""
+        return os.path.join(self.base_dir, key)
+
+    def verify_upload_signature(self, key: str, expires: int, signature: str) -> bool:
+        """Verifica una URL generada por generate_upload_request"""
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(self._sign(key, expires), signature)
+
+    def _parts_dir(self, upload_id: str) -> str:
+        return os.path.join(self.base_dir, "multipart", upload_id)
+
+    def create_multipart_upload(self, key: str) -> str:
+        """Crea el directorio donde se guardan las partes"""
+        upload_id = str(uuid.uuid4())
+        os.makedirs(self._parts_dir(upload_id), exist_ok=True)
+        return upload_id
+
+    def upload_part(
+        self, key: str, upload_id: str, part_number: int, file_obj: BinaryIO, offset: int = 0
+    ) -> str:
+        """
+        Escribe la parte en su posición del archivo de la subida (reenviarla sobrescribe
+        el mismo rango): al completar no hay que copiar las partes
+        """
+        data_path = os.path.join(self._parts_dir(upload_id), "data")
+        md5 = hashlib.md5()
+        fd = os.open(data_path, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            position = offset
+            while True:
+                data = file_obj.read(settings.upload_chunk_size)
+                if not data:
+                    break
+                md5.update(data)
+                os.pwrite(fd, data, position)
+                position += len(data)
+        finally:
+            os.close(fd)
+        return md5.hexdigest()
+
+    def complete_multipart_upload(
+        self, key: str, upload_id: str, parts: List[Tuple[int, str]]
+    ) -> str:
+        """Mueve el archivo de la subida (con las partes ya en su posición) a su destino"""
+        dest_path = os.path.join(self.base_dir, key)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        parts_dir = self._parts_dir(upload_id)
+
+        os.replace(os.path.join(parts_dir, "data"), dest_path)
+        shutil.rmtree(parts_dir, ignore_errors=True)
+        return dest_path
+
+    def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        """Elimina las partes recibidas"""
+        shutil.rmtree(self._parts_dir(upload_id), ignore_errors=True)
+
 
 class S3Storage(StorageBackend):
     """Backend de almacenamiento AWS S3"""
@@ -95,6 +429,13 @@ class S3Storage(StorageBackend):
             aws_session_token=settings.aws_session_token,
             region_name=settings.aws_region,
         )
+        # Partes pequeñas y poca concurrencia por subida: acota la memoria por request
+        self.transfer_config = TransferConfig(
+            multipart_threshold=S3_MIN_PART_SIZE,
+            multipart_chunksize=max(settings.upload_chunk_size, S3_MIN_PART_SIZE),
+            max_concurrency=2,
+            max_io_queue=2,
+        )
 
     def upload_file(self, file_path: str, key: str) -> str:
         """Sube archivo a S3"""
@@ -107,11 +448,74 @@ class S3Storage(StorageBackend):
     def upload_fileobj(self, file_obj: BinaryIO, key: str) -> str:
         """Sube objeto de archivo a S3"""
         try:
-            self.s3_client.upload_fileobj(file_obj, self.bucket_name, key)
+            self.s3_client.upload_fileobj(
+                file_obj, self.bucket_name, key, Config=self.transfer_config
+            )
             return f"https://{self.bucket_name}.s3.{settings.aws_region}.amazonaws.com/{key}"
         except ClientError as e:
             raise Exception(f"Error uploading to S3: {str(e)}")
 
+    async def upload_fileobj_async(self, file_obj, key: str) -> str:
+        """
+        Sube a S3 por partes mientras se recibe el archivo.
+        Solo la llamada a S3 de cada parte usa un hilo; la espera al cliente no.
+        """
+        part_size = max(settings.upload_chunk_size, S3_MIN_PART_SIZE)
+        buffer = bytearray()
+        parts: List[Tuple[int, str]] = []
+        upload_id = None
+
+        try:
+            while True:
+                data = await file_obj.read(settings.upload_chunk_size)
+                buffer.extend(data)
+                if len(buffer) >= part_size or (not data and upload_id and buffer):
+                    if upload_id is None:
+                        upload_id = await anyio.to_thread.run_sync(
+                            self.create_multipart_upload, key
+                        )
+                    part_number = len(parts) + 1
+                    etag = await anyio.to_thread.run_sync(
+                        self.upload_part, key, upload_id, part_number, io.BytesIO(buffer)
+                    )
+                    parts.append((part_number, etag))
+                    buffer = bytearray()
+                if not data:
+                    break
+
+            if upload_id is None:
+                # Archivo menor a una parte: un solo PUT
+                await anyio.to_thread.run_sync(
+                    partial(
+                        self.s3_client.put_object,
+                        Bucket=self.bucket_name,
+                        Key=key,
+                        Body=bytes(buffer),
+                    )
+                )
+                return self.get_file_url(key)
+
+            return await anyio.to_thread.run_sync(
+                self.complete_multipart_upload, key, upload_id, parts
+            )
+        except ClientError as e:
+            await self._abort_async(key, upload_id)
+            raise Exception(f"Error uploading to S3: {str(e)}")
+        except BaseException:
+            await self._abort_async(key, upload_id)
+            raise
+
+    async def _abort_async(self, key: str, upload_id: Optional[str]) -> None:
+        if upload_id is not None:
+            with anyio.CancelScope(shield=True):
+                await anyio.to_thread.run_sync(
+                    self.abort_multipart_upload, key, upload_id
+                )
+
+    def open_writer(self, key: str) -> StorageWriter:
+        """Subida multipart parte por parte"""
+        return S3MultipartWriter(self, key, settings.upload_session_chunk_size)
+
     def download_file(self, key: str, local_path: str) -> None:
         """Descarga archivo desde S3"""
         try:
@@ -141,6 +545,162 @@ class S3Storage(StorageBackend):
             f"https://{self.bucket_name}.s3.{settings.aws_region}.amazonaws.com/{key}"
         )
 
+    def open_file(self, key: str) -> BinaryIO:
+        """Lectura por rangos (GET con Range) sin descargar el objeto completo"""
+        return S3RangeReader(self.s3_client, self.bucket_name, key)
+
+    def get_file_size(self, key: str) -> Optional[int]:
+        """Tamaño del objeto según head_object"""
+        try:
+            head = self.s3_client.head_object(Bucket=self.bucket_name, Key=key)
+            return head["ContentLength"]
+        except ClientError:
+            return None
+
+    def generate_upload_request(self, key: str, expires_in: int, max_bytes: int) -> dict:
+        """
+        POST prefirmado de S3: a diferencia de un PUT prefirmado, la política incluye
+        `content-length-range`, así que S3 rechaza los cuerpos que exceden el límite.
+        """
+        try:
+            post = self.s3_client.generate_presigned_post(
+                self.bucket_name,
+                key,
+                Fields={"Content-Type": "video/mp4"},
+                Conditions=[
+                    {"Content-Type": "video/mp4"},
+                    ["content-length-range", 1, max_bytes],
+                ],
+                ExpiresIn=expires_in,
+            )
+        except ClientError as e:
+            raise Exception(f"Error generating S3 presigned POST: {str(e)}")
+        return {"method": "POST", "url": post["url"], "fields": post["fields"], "headers": {}}
+
+    def move_file(self, src_key: str, dst_key: str) -> str:
+        """Copia el objeto a la nueva clave y elimina el original"""
+        try:
+            self.s3_client.copy_object(
+                Bucket=self.bucket_name,
+                Key=dst_key,
+                CopySource={"Bucket": self.bucket_name, "Key": src_key},
+            )
+            self.s3_client.delete_object(Bucket=self.bucket_name, Key=src_key)
+            return self.get_file_url(dst_key)
+        except ClientError as e:
+            raise Exception(f"Error moving S3 object: {str(e)}")
+
+    def generate_download_url(self, key: str, expires_in: int) -> str:
+        """URL prefirmada de S3 para GET (acepta Range)"""
+        try:
+            return self.s3_client.generate_presigned_url(
+                "get_object",
+                Params={"Bucket": self.bucket_name, "Key": key},
+                ExpiresIn=expires_in,
+            )
+        except ClientError as e:
+            raise Exception(f"Error generating S3 presigned URL: {str(e)}")
+
+    def create_multipart_upload(self, key: str) -> str:
+        """Inicia una subida multipart en S3"""
+        try:
+            response = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket_name, Key=key
+            )
+            return response["UploadId"]
+        except ClientError as e:
+            raise Exception(f"Error creating S3 multipart upload: {str(e)}")
+
+    def upload_part(
+        self, key: str, upload_id: str, part_number: int, file_obj: BinaryIO, offset: int = 0
+    ) -> str:
+        """Sube una parte del multipart (S3 ubica la parte por su número)"""
+        try:
+            response = self.s3_client.upload_part(
+                Bucket=self.bucket_name,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=file_obj,
+            )
+            return response["ETag"]
+        except ClientError as e:
+            raise Exception(f"Error uploading part to S3: {str(e)}")
+
+    def complete_multipart_upload(
+        self, key: str, upload_id: str, parts: List[Tuple[int, str]]
+    ) -> str:
+        """Completa el multipart con las partes en orden"""
+        try:
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={
+                    "Parts": [
+                        {"PartNumber": part_number, "ETag": etag}
+                        for part_number, etag in sorted(parts)
+                    ]
+                },
+            )
+            return self.get_file_url(key)
+        except ClientError as e:
+            raise Exception(f"Error completing S3 multipart upload: {str(e)}")
+
+    def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        """Aborta el multipart y libera las partes en S3"""
+        try:
+            self.s3_client.abort_multipart_upload(
+                Bucket=self.bucket_name, Key=key, UploadId=upload_id
+            )
+        except ClientError:
+            pass
+
+
+class S3RangeReader(io.RawIOBase):
+    """Archivo de solo lectura sobre un objeto S3: cada read() es un GET con Range"""
+
+    def __init__(self, s3_client, bucket_name: str, key: str):
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.key = key
+        self.position = 0
+        try:
+            head = s3_client.head_object(Bucket=bucket_name, Key=key)
+        except ClientError as e:
+            raise Exception(f"Error reading from S3: {str(e)}")
+        self.size = head["ContentLength"]
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.position = max(0, offset)
+        return self.position
+
+    def read(self, size=-1):
+        if self.position >= self.size:
+            return b""
+        end = self.size if size is None or size < 0 else min(self.size, self.position + size)
+        response = self.s3_client.get_object(
+            Bucket=self.bucket_name,
+            Key=self.key,
+            Range=f"bytes={self.position}-{end - 1}",
+        )
+        data = response["Body"].read()
+        self.position += len(data)
+        return data
+
 
 class StorageManager:
     """Gestor de almacenamiento que decide qué backend usar"""
@@ -159,11 +719,107 @@ class StorageManager:
         key = f"videos/{video_id}/{filename}"
         return self.backend.upload_fileobj(file_obj, key)
 
+    async def upload_video_async(self, file_obj, video_id: str, filename: str) -> str:
+        """Sube un video desde un objeto con `async read()` y retorna la URL"""
+        key = f"videos/{video_id}/{filename}"
+        return await self.backend.upload_fileobj_async(file_obj, key)
+
+    def start_video_multipart(self, video_id: str, filename: str) -> str:
+        """Inicia la subida por partes de un video original"""
+        key = f"videos/{video_id}/{filename}"
+        return self.backend.create_multipart_upload(key)
+
+    def upload_video_part(
+        self,
+        video_id: str,
+        filename: str,
+        upload_id: str,
+        part_number: int,
+        file_obj: BinaryIO,
+        offset: int = 0,
+    ) -> str:
+        """Sube una parte de un video original y retorna su ETag"""
+        key = f"videos/{video_id}/{filename}"
+        return self.backend.upload_part(key, upload_id, part_number, file_obj, offset)
+
+    def complete_video_multipart(
+        self, video_id: str, filename: str, upload_id: str, parts: List[Tuple[int, str]]
+    ) -> str:
+        """Une las partes del video original y retorna la URL"""
+        key = f"videos/{video_id}/{filename}"
+        return self.backend.complete_multipart_upload(key, upload_id, parts)
+
+    def abort_video_multipart(self, video_id: str, filename: str, upload_id: str) -> None:
+        """Descarta una subida por partes"""
+        key = f"videos/{video_id}/{filename}"
+        self.backend.abort_multipart_upload(key, upload_id)
+
+    def get_video_upload_request(self, video_id: str, expires_in: int) -> dict:
+        """
+        Petición firmada para que el cliente suba el video original directamente.
+        El destino es `incoming/`: al confirmar se mueve a `videos/`, fuera del alcance
+        de la firma, así que el archivo validado ya no se puede sobrescribir.
+        """
+        key = f"incoming/{video_id}.mp4"
+        return self.backend.generate_upload_request(key, expires_in, settings.max_upload_bytes)
+
+    def get_incoming_video_size(self, video_id: str) -> Optional[int]:
+        """Tamaño de una subida directa aún sin confirmar, o None si no existe"""
+        return self.backend.get_file_size(f"incoming/{video_id}.mp4")
+
+    def delete_incoming_video(self, video_id: str) -> bool:
+        """Descarta una subida directa sin confirmar"""
+        return self.backend.delete_file(f"incoming/{video_id}.mp4")
+
+    def promote_incoming_video(self, video_id: str, filename: str) -> str:
+        """Mueve una subida directa a su ubicación definitiva y retorna la URL"""
+        return self.backend.move_file(
+            f"incoming/{video_id}.mp4", f"videos/{video_id}/{filename}"
+        )
+
+    def get_video_size(self, video_id: str, filename: str) -> Optional[int]:
+        """Tamaño del video original almacenado, o None si no existe"""
+        key = f"videos/{video_id}/{filename}"
+        return self.backend.get_file_size(key)
+
+    def open_video(self, video_url: str) -> BinaryIO:
+        """Abre un video almacenado para lectura aleatoria"""
+        if self.storage_type == "s3":
+            key = video_url.split(".amazonaws.com/")[-1]
+            return self.backend.open_file(key)
+        return open(video_url, "rb")
+
+    def get_video_source(self, video_url: str, expires_in: int) -> str:
+        """
+        Origen que ffmpeg puede leer sin descargar el video completo: URL prefirmada
+        (S3, ffmpeg pide solo los rangos que necesita) o la ruta del archivo local
+        """
+        if self.storage_type == "s3":
+            key = video_url.split(".amazonaws.com/")[-1]
+            return self.backend.generate_download_url(key, expires_in)
+        return video_url
+
+    def sha256_video(self, video_url: str) -> str:
+        """SHA-256 (hex) del video almacenado, leído por bloques"""
+        digest = hashlib.sha256()
+        with self.open_video(video_url) as video_file:
+            while True:
+                data = video_file.read(settings.upload_session_chunk_size)
+                if not data:
+                    break
+                digest.update(data)
+        return digest.hexdigest()
+
     def upload_processed_video(self, local_path: str, video_id: str) -> str:
         """Sube un video procesado"""
         key = f"processed/{video_id}/processed_{video_id}.mp4"
         return self.backend.upload_file(local_path, key)
 
+    def open_processed_video_writer(self, video_id: str) -> StorageWriter:
+        """Escritor del video procesado (se sube mientras ffmpeg lo produce)"""
+        key = f"processed/{video_id}/processed_{video_id}.mp4"
+        return self.backend.open_writer(key)
+
     def download_video(self, video_url: str, local_path: str) -> None:
         """Descarga un video para procesamiento"""
         if self.storage_type == "s3":
@@ -172,8 +828,7 @@ class StorageManager:
             self.backend.download_file(key, local_path)
         else:
             # Para local, solo copiar
-            with open(video_url, "rb") as src, open(local_path, "wb") as dst:
-                dst.write(src.read())
+            shutil.copyfile(video_url, local_path)
 
     def delete_video(self, video_url: str) -> bool:
         """Elimina un video"""
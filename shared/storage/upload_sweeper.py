@@ -0,0 +1,77 @@
+"""
+Limpieza de subidas reanudables abandonadas: descarta las partes (o la subida multipart
+de S3) y la sesión de las que no se finalizaron en UPLOAD_SESSION_TTL_HOURS.
+
+Ejecución:
+    python -m shared.storage.upload_sweeper
+
+En S3 conviene además una regla de ciclo de vida del bucket
+(AbortIncompleteMultipartUpload) como respaldo.
+"""
+import datetime
+import logging
+import time
+
+from sqlalchemy.orm import Session
+
+from shared.config.settings import settings
+from shared.db.config import SessionLocal
+from shared.db.models.upload_session import UploadSession
+from shared.db.models.video import Video
+from shared.storage import storage_manager
+
+logger = logging.getLogger(__name__)
+
+
+def sweep_expired_sessions(
+    db: Session, ttl_hours: float = settings.upload_session_ttl_hours
+) -> int:
+    """Elimina las sesiones vencidas y lo que dejaron en el almacenamiento. Retorna cuántas"""
+    # Fechas en UTC sin zona horaria, como created_at
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(hours=ttl_hours)
+    expired = (
+        db.query(UploadSession)
+        .filter(UploadSession.created_at < cutoff)
+        .order_by(UploadSession.created_at)
+        .all()
+    )
+
+    for upload in expired:
+        try:
+            storage_manager.abort_video_multipart(
+                upload.id, upload.filename, upload.storage_upload_id
+            )
+            # Partes ya unidas cuyo registro nunca se completó
+            registered = db.query(Video.id).filter(Video.id == upload.id).first()
+            if registered is None and storage_manager.get_video_size(upload.id, upload.filename):
+                storage_manager.delete_video(
+                    storage_manager.get_video_url(upload.id, upload.filename)
+                )
+        except Exception as e:
+            logger.warning(f"Error descartando la subida {upload.id}: {str(e)}")
+        db.delete(upload)
+
+    db.commit()
+    return len(expired)
+
+
+def run_sweeper(interval: float = settings.upload_session_sweep_interval) -> None:
+    """Ciclo principal de la limpieza"""
+    logger.info(f"Limpieza de subidas iniciada (intervalo={interval}s)")
+    while True:
+        db = SessionLocal()
+        try:
+            removed = sweep_expired_sessions(db)
+            if removed:
+                logger.info(f"Sesiones de subida vencidas eliminadas: {removed}")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error en la limpieza de subidas: {str(e)}")
+        finally:
+            db.close()
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    run_sweeper()
@@ -0,0 +1,19 @@
+import os
+
+# Las pruebas corren un solo proceso de API: caché de respuestas en memoria, sin Redis
+os.environ.setdefault("RESPONSE_CACHE_BACKEND", "memory")
+
+import pytest
+
+from shared.config.settings import settings
+from shared.storage import LocalStorage, storage_manager
+
+
+@pytest.fixture(autouse=True)
+def isolated_uploads(tmp_path, monkeypatch):
+    """Los archivos que escriben las pruebas van a un directorio temporal, no a uploads/"""
+    uploads_dir = str(tmp_path / "uploads")
+    monkeypatch.setattr(settings, "uploads_dir", uploads_dir)
+    monkeypatch.setattr(storage_manager, "backend", LocalStorage(base_dir=uploads_dir))
+    monkeypatch.setattr(storage_manager, "storage_type", "local")
+    yield uploads_dir
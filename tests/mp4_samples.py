@@ -0,0 +1,21 @@
+import struct
+
+
+def mp4_box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def build_mp4(width=1280, height=720, duration_seconds=45, mdat_payload=b"\0" * 1024,
+              moov_first=True) -> bytes:
+    """Construye un MP4 mínimo (ftyp, moov con mvhd/trak y mdat) para las pruebas."""
+    timescale = 1000
+    ftyp = mp4_box(b"ftyp", b"isom" + struct.pack(">I", 512) + b"isomiso2avc1mp41")
+    mvhd = mp4_box(b"mvhd", struct.pack(">B3xIIII", 0, 0, 0, timescale, duration_seconds * timescale)
+                   + b"\0" * 80)
+    tkhd = mp4_box(b"tkhd", struct.pack(">B3xIIIII", 0, 0, 0, 1, 0, duration_seconds * timescale)
+                   + b"\0" * 52 + struct.pack(">II", width << 16, height << 16))
+    hdlr = mp4_box(b"hdlr", struct.pack(">B3xI4s", 0, 0, b"vide") + b"\0" * 12 + b"VideoHandler\0")
+    trak = mp4_box(b"trak", tkhd + mp4_box(b"mdia", hdlr))
+    moov = mp4_box(b"moov", mvhd + trak)
+    mdat = mp4_box(b"mdat", mdat_payload)
+    return ftyp + (moov + mdat if moov_first else mdat + moov)
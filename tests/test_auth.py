@@ -1,11 +1,17 @@
 import pytest
+import time
+from unittest.mock import patch
 from fastapi.testclient import TestClient
+from jose import jwt
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from app.main import app
+from shared.config.settings import settings
 from shared.db.config import Base, get_db
 from shared.db.models.user import User
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash, Principal, TokenCache, token_cache
+from app.core.password_hashing import password_hasher
 
 # Configuración de base de datos de prueba (usando SQLite en memoria para simplicidad)
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -155,3 +161,124 @@ def test_login_invalid_credentials(test_db):
     assert response.status_code == 401
     data = response.json()
     assert "inválidas" in str(data).lower()  # Busca "inválidas" en el mensaje
+
+
+def login_token():
+    db = TestingSessionLocal()
+    db.add(User(id="user-1",
+                first_name="John",
+                last_name="Doe",
+                email="john@example.com",
+                password_hash=get_password_hash("StrongPass123"),
+                city="Bogotá",
+                country="Colombia"))
+    db.commit()
+    db.close()
+    response = client.post(
+        "/api/auth/login",
+        json={"email": "john@example.com", "password": "StrongPass123"},
+    )
+    return response.json()["access_token"]
+
+
+def test_login_token_carries_user_id(test_db):
+    token = login_token()
+    payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    assert payload["sub"] == "john@example.com"
+    assert payload["uid"] == "user-1"
+
+
+def test_authenticated_requests_use_token_cache(test_db):
+    token_cache.clear()
+    token = login_token()
+
+    user_queries = []
+
+    def count_user_queries(conn, cursor, statement, parameters, context, executemany):
+        if "FROM users" in statement:
+            user_queries.append(statement)
+
+    # Todos los motores: otros módulos de pruebas pueden reemplazar get_db
+    event.listen(Engine, "before_cursor_execute", count_user_queries)
+    try:
+        for _ in range(3):
+            response = client.get("/api/videos/", headers={"Authorization": f"Bearer {token}"})
+            assert response.status_code == 200
+    finally:
+        event.remove(Engine, "before_cursor_execute", count_user_queries)
+
+    # Solo la primera petición consulta al usuario
+    assert len(user_queries) == 1
+    assert token_cache.get(token) == Principal("user-1", "john@example.com", "Bogotá")
+
+
+def test_token_of_deleted_user_is_rejected(test_db):
+    token_cache.clear()
+    token = login_token()
+    db = TestingSessionLocal()
+    db.query(User).delete()
+    db.commit()
+    db.close()
+
+    response = client.get("/api/videos/", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+
+
+def test_token_cache_evicts_least_recently_used():
+    cache = TokenCache(maxsize=2, ttl_seconds=60)
+    cache.set("a", Principal("1", "a@mail.com", None))
+    cache.set("b", Principal("2", "b@mail.com", None))
+    cache.get("a")
+    cache.set("c", Principal("3", "c@mail.com", None))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert len(cache) == 2
+
+
+def test_token_cache_entries_expire():
+    cache = TokenCache(maxsize=10, ttl_seconds=60)
+    now = time.time()
+    cache.set("ttl", Principal("1", "a@mail.com", None))
+    # La expiración del token manda si es anterior al TTL
+    cache.set("exp", Principal("2", "b@mail.com", None), token_exp=now + 5)
+
+    with patch("app.core.security.time.time", return_value=now + 10):
+        assert cache.get("exp") is None
+        assert cache.get("ttl") is not None
+
+    with patch("app.core.security.time.time", return_value=now + 61):
+        assert cache.get("ttl") is None
+    assert len(cache) == 0
+
+
+def test_login_rejected_when_hash_pool_saturated(test_db):
+    login_token()
+    with patch.object(password_hasher, "max_pending", 0):
+        response = client.post(
+            "/api/auth/login",
+            json={"email": "john@example.com", "password": "StrongPass123"},
+        )
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(settings.password_hash_retry_after)
+
+
+def test_signup_hashes_with_configured_rounds(test_db):
+    response = client.post(
+        "/api/auth/signup",
+        json={
+            "first_name": "John",
+            "last_name": "Doe",
+            "email": "rounds@example.com",
+            "password1": "StrongPass123",
+            "password2": "StrongPass123",
+            "city": "Bogotá",
+            "country": "Colombia",
+        },
+    )
+    assert response.status_code == 201
+    db = TestingSessionLocal()
+    user = db.query(User).filter(User.email == "rounds@example.com").first()
+    db.close()
+    assert user.password_hash.startswith(f"$pbkdf2-sha256${settings.password_hash_rounds}$")
@@ -0,0 +1,108 @@
+import pytest
+import datetime
+import uuid
+from unittest.mock import patch, MagicMock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import shared.broker as broker
+from shared.broker.outbox_relay import relay_batch
+from shared.db.config import Base
+from shared.db.models.user import User
+from shared.db.models.video import Video, VideoStatus
+from shared.db.models.outbox import OutboxMessage, OutboxStatus
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture(scope="function")
+def outbox_data():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+
+    user = User(id=str(uuid.uuid4()),
+                first_name="John",
+                last_name="Doe",
+                email="john.doe@mail.com",
+                password_hash="hash",
+                city="Bogotá",
+                country="Colombia")
+    db.add(user)
+    db.commit()
+
+    video_ids = []
+    for i in range(3):
+        video_id = str(uuid.uuid4())
+        db.add(Video(id=video_id,
+                     title=f"Video {i}",
+                     status=VideoStatus.UPLOADED.value,
+                     id_user=user.id,
+                     uploaded_at=datetime.datetime.now(datetime.timezone.utc),
+                     file_original_url="file://ruta/video.mp4"))
+        db.add(OutboxMessage(id=str(uuid.uuid4()),
+                             task_name=broker.PROCESS_VIDEO_TASK,
+                             queue="uploaded-videos",
+                             payload={"args": [video_id]},
+                             id_video=video_id))
+        video_ids.append(video_id)
+    db.commit()
+
+    yield {'db': db, 'video_ids': video_ids}
+
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+def test_get_producer_is_reused():
+    """El productor se crea una sola vez por proceso."""
+    broker.close_producer()
+    try:
+        producer1 = broker.get_producer()
+        producer2 = broker.get_producer()
+
+        assert producer1 is producer2
+        assert producer1.conf.broker_transport_options.get("confirm_publish") is True
+    finally:
+        broker.close_producer()
+
+
+def test_relay_batch_publishes_and_marks_sent(outbox_data):
+    """El relay publica los pendientes por lotes y marca videos en procesamiento."""
+    db = outbox_data['db']
+    mock_producer = MagicMock()
+
+    with patch('shared.broker.outbox_relay.get_producer', return_value=mock_producer):
+        assert relay_batch(db, batch_size=2) == 2
+        assert relay_batch(db, batch_size=2) == 1
+        assert relay_batch(db, batch_size=2) == 0
+
+    assert mock_producer.send_task.call_count == 3
+    # Una sola conexión del pool por lote
+    assert mock_producer.producer_or_acquire.call_count == 2
+
+    pending = db.query(OutboxMessage).filter(OutboxMessage.status == OutboxStatus.PENDING.value).count()
+    assert pending == 0
+
+    statuses = {v.status for v in db.query(Video).filter(Video.id.in_(outbox_data['video_ids']))}
+    assert statuses == {VideoStatus.PROCESSING.value}
+
+
+def test_relay_batch_keeps_pending_when_broker_fails(outbox_data):
+    """Si el broker falla, los mensajes siguen pendientes y no se pierde ningún video."""
+    db = outbox_data['db']
+    mock_producer = MagicMock()
+    mock_producer.send_task.side_effect = ConnectionError("broker caído")
+
+    with patch('shared.broker.outbox_relay.get_producer', return_value=mock_producer):
+        assert relay_batch(db) == 0
+
+    messages = db.query(OutboxMessage).all()
+    assert all(m.status == OutboxStatus.PENDING.value for m in messages)
+    assert all(m.attempts == 1 for m in messages)
+
+    statuses = {v.status for v in db.query(Video).filter(Video.id.in_(outbox_data['video_ids']))}
+    assert statuses == {VideoStatus.UPLOADED.value}
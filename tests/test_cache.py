@@ -0,0 +1,167 @@
+import threading
+import time
+
+import redis
+
+from shared.cache import (
+    CachedResponse,
+    MemoryCacheBackend,
+    NullCacheBackend,
+    RedisCacheBackend,
+    ResponseCache,
+)
+
+
+class FakeRedis:
+    """Subconjunto de redis.Redis usado por RedisCacheBackend (get/set px/incr)"""
+
+    def __init__(self):
+        self.data = {}
+        self.fail = False
+
+    def _check(self):
+        if self.fail:
+            raise redis.ConnectionError("sin conexión")
+
+    def get(self, key):
+        self._check()
+        value = self.data.get(key)
+        if value is None:
+            return None
+        data, expires_at = value
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return data
+
+    def set(self, key, value, px=None):
+        self._check()
+        expires_at = time.monotonic() + px / 1000 if px else None
+        self.data[key] = (value if isinstance(value, bytes) else str(value).encode(), expires_at)
+
+    def incr(self, key):
+        self._check()
+        value = int(self.get(key) or 0) + 1
+        self.set(key, value)
+        return value
+
+
+def build_counter(body=b"[]", headers=None):
+    calls = []
+
+    def build():
+        calls.append(1)
+        return body, headers or {}
+
+    return build, calls
+
+
+def test_memory_backend_ttl_and_lru():
+    backend = MemoryCacheBackend(max_entries=2)
+    backend.set("a", b"1", ttl=60)
+    backend.set("b", b"2", ttl=60)
+    backend.get("a")
+    backend.set("c", b"3", ttl=60)
+    assert backend.get("b") is None
+    assert backend.get("a") == b"1"
+
+    backend.set("d", b"4", ttl=0.01)
+    time.sleep(0.02)
+    assert backend.get("d") is None
+
+
+def test_response_cache_hit_and_invalidate():
+    cache = ResponseCache(MemoryCacheBackend())
+    build, calls = build_counter(b'[{"id": 1}]', {"X-Next-Cursor": "abc"})
+
+    first, hit_first = cache.get_or_set("videos", "50:", 60, build)
+    second, hit_second = cache.get_or_set("videos", "50:", 60, build)
+    assert (hit_first, hit_second) == (False, True)
+    assert second.body == first.body
+    assert second.headers == {"X-Next-Cursor": "abc"}
+    assert len(calls) == 1
+
+    cache.invalidate("videos")
+    _, hit = cache.get_or_set("videos", "50:", 60, build)
+    assert hit is False
+    assert len(calls) == 2
+
+
+def test_response_cache_coalesces_concurrent_misses():
+    cache = ResponseCache(MemoryCacheBackend())
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow_build():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return b"[]", {}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_set("rankings", "k", 60, slow_build)))
+        for _ in range(8)
+    ]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(results) == 8
+    assert sum(1 for _, hit in results if hit) == 7
+
+
+def test_response_cache_leader_failure_does_not_block_followers():
+    cache = ResponseCache(NullCacheBackend())
+
+    def failing_build():
+        raise RuntimeError("fallo")
+
+    try:
+        cache.get_or_set("rankings", "k", 60, failing_build)
+    except RuntimeError:
+        pass
+    build, calls = build_counter()
+    _, hit = cache.get_or_set("rankings", "k", 60, build)
+    assert hit is False
+    assert len(calls) == 1
+
+
+def test_redis_backend_shares_generation_between_processes():
+    client = FakeRedis()
+    api = ResponseCache(RedisCacheBackend(client))
+    worker = ResponseCache(RedisCacheBackend(client))
+    build, calls = build_counter()
+
+    api.get_or_set("videos", "50:", 60, build)
+    assert api.get_or_set("videos", "50:", 60, build)[1] is True
+
+    # La invalidación del worker (otro proceso) la ve la API
+    worker.invalidate("videos")
+    assert api.get_or_set("videos", "50:", 60, build)[1] is False
+    assert len(calls) == 2
+
+
+def test_redis_backend_degrades_to_miss_when_unavailable():
+    client = FakeRedis()
+    cache = ResponseCache(RedisCacheBackend(client))
+    build, calls = build_counter()
+    client.fail = True
+
+    response, hit = cache.get_or_set("videos", "50:", 60, build)
+    cache.invalidate("videos")
+    assert hit is False
+    assert response.body == b"[]"
+    assert len(calls) == 1
+
+
+def test_cached_response_round_trip():
+    response = CachedResponse(b'{"a": 1}', {"X-Next-Cursor": "x"}, 123.0)
+    assert CachedResponse.loads(response.dumps()) == response
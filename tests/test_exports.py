@@ -0,0 +1,153 @@
+import csv
+import datetime
+import io
+import json
+import uuid
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.core.security import create_access_token
+from shared.config.settings import settings
+from shared.db.config import Base, get_db
+from shared.db.models.user import User
+from shared.db.models.user_ranking import UserRanking
+from shared.db.models.video import Video, VideoStatus
+from shared.db.models.vote import Vote
+from shared.db.rankings import rebuild_user_rankings
+
+# Configuración de base de datos de prueba
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+)
+
+
+@event.listens_for(engine, 'connect')
+def enable_foreign_keys(conn, branch):
+    conn.execute('PRAGMA foreign_keys = ON')
+
+
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+app.dependency_overrides[get_db] = override_get_db
+
+client = TestClient(app)
+
+BASE_TIME = datetime.datetime.utcnow().replace(microsecond=0) - datetime.timedelta(days=1)
+
+
+@pytest.fixture(scope="function")
+def test_data():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    db.query(Vote).delete()
+    db.query(UserRanking).delete()
+    db.query(Video).delete()
+    db.query(User).delete()
+    db.commit()
+
+    admin = User(id=str(uuid.uuid4()), first_name="Ana", last_name="Admin",
+                 email="ana.admin@mail.com", password_hash="x", city="Cali", country="Colombia")
+    player = User(id=str(uuid.uuid4()), first_name="John", last_name="Doe",
+                  email="john.doe@mail.com", password_hash="x", city="Bogotá", country="Colombia")
+    db.add_all([admin, player])
+    db.commit()
+
+    videos = []
+    for i in range(5):
+        videos.append(Video(
+            id=f"video-{i}", title=f"Video {i}", status=VideoStatus.PROCESSED.value,
+            id_user=player.id, uploaded_at=BASE_TIME,
+            processed_at=BASE_TIME + datetime.timedelta(hours=i),
+            file_original_url="file://ruta/video.mp4",
+            file_processed_url=f"file://ruta/video_{i}.mp4", votes=1 if i < 2 else 0,
+        ))
+    videos.append(Video(
+        id="video-pending", title="Pendiente", status=VideoStatus.UPLOADED.value,
+        id_user=player.id, uploaded_at=BASE_TIME, file_original_url="file://ruta/video.mp4",
+    ))
+    db.add_all(videos)
+    db.commit()
+
+    db.add_all([
+        Vote(id_video="video-0", id_user=admin.id, voted_at=BASE_TIME + datetime.timedelta(hours=1)),
+        Vote(id_video="video-1", id_user=admin.id, voted_at=BASE_TIME + datetime.timedelta(hours=2)),
+    ])
+    db.commit()
+    rebuild_user_rankings(db)
+
+    headers = lambda user: {"Authorization": "Bearer " + create_access_token(
+        data={"sub": user.email, "uid": user.id})}
+
+    with patch.object(settings, "admin_emails", "ana.admin@mail.com"), \
+            patch.object(settings, "export_batch_size", 2):
+        yield {"admin": headers(admin), "player": headers(player)}
+
+    Base.metadata.drop_all(bind=engine)
+    db.close()
+
+
+def test_export_requires_admin(test_data):
+    assert client.get("/api/admin/exports/videos", headers=test_data["player"]).status_code == 403
+    assert client.get("/api/admin/exports/videos").status_code == 403
+
+
+def test_export_videos_ndjson_with_watermark(test_data):
+    response = client.get("/api/admin/exports/videos", headers=test_data["admin"])
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    # Solo procesados, en orden de processed_at, en varios lotes
+    assert [row["id"] for row in rows] == [f"video-{i}" for i in range(5)]
+    watermark = datetime.datetime.fromisoformat(response.headers["X-Export-Watermark"])
+    assert watermark > BASE_TIME + datetime.timedelta(hours=4)
+
+    since = (BASE_TIME + datetime.timedelta(hours=2)).isoformat()
+    delta = client.get("/api/admin/exports/videos", params={"since": since},
+                       headers=test_data["admin"])
+    assert [json.loads(line)["id"] for line in delta.text.splitlines()] == ["video-3", "video-4"]
+
+
+def test_export_votes_csv_incremental(test_data):
+    since = (BASE_TIME + datetime.timedelta(hours=1)).isoformat()
+    response = client.get("/api/admin/exports/votes", params={"format": "csv", "since": since},
+                          headers=test_data["admin"])
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "attachment" in response.headers["content-disposition"]
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["id_video", "id_user", "voted_at"]
+    assert [row[0] for row in rows[1:]] == ["video-1"]
+
+
+def test_export_rankings(test_data):
+    # Filas recién actualizadas: quedan después de la marca de agua salvo sin margen
+    response = client.get("/api/admin/exports/rankings", params={"format": "csv"},
+                          headers=test_data["admin"])
+    assert list(csv.DictReader(io.StringIO(response.text))) == []
+
+    with patch.object(settings, "export_watermark_lag_seconds", 0):
+        response = client.get("/api/admin/exports/rankings", params={"format": "csv"},
+                              headers=test_data["admin"])
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    totals = {row["first_name"]: (int(row["total_votes"]), int(row["processed_videos"])) for row in rows}
+    assert totals["John"] == (2, 5)
+    assert client.get("/api/admin/exports/rankings", params={"format": "xml"},
+                      headers=test_data["admin"]).status_code == 422
@@ -0,0 +1,379 @@
+"""
+Pruebas de integración del procesamiento de video con ffmpeg/ffprobe reales (sin simular
+`subprocess`). Se omiten si ffmpeg no está instalado.
+"""
+import functools
+import http.server
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+
+import pytest
+
+# Agregar el directorio app-worker al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'app-worker'))
+
+from worker.ffmpeg_pipeline import OutputProfile  # noqa: E402
+
+pytestmark = pytest.mark.skipif(
+    shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None,
+    reason="Requiere ffmpeg y ffprobe en el PATH",
+)
+
+# Mismo perfil que producción salvo el preset, para que las pruebas sean rápidas
+FAST_PROFILE = OutputProfile(preset="ultrafast")
+
+
+def _encode_source(path, seconds, size="1280x720", sample_rate=48000, extra=()):
+    """
+    Original de una cámara/editor cualquiera: H.264 High con otros parámetros de x264 que
+    las cortinillas (sin B-frames, 1 referencia, keyframe cada 1 s, timebase de 90 kHz).
+    Sin faststart: el moov queda al final del archivo.
+    """
+    subprocess.run([
+        "ffmpeg", "-hide_banner", "-nostdin", "-y", "-v", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size={size}:rate=30:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate={sample_rate}:duration={seconds}",
+        "-c:v", "libx264", "-preset", "veryfast", "-x264-params", "ref=1:bframes=0",
+        "-profile:v", "high", "-level:v", "4.0", "-pix_fmt", "yuv420p", "-g", "30",
+        "-video_track_timescale", "90000",
+        "-c:a", "aac", "-ar", str(sample_rate), "-ac", "2",
+        *extra, path,
+    ], check=True)
+    return path
+
+
+def _ffprobe(path, *args):
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-print_format", "json", *args, path],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout)
+
+
+def _decode_errors(path):
+    """Errores del decodificador al leer el archivo completo"""
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-nostdin", "-v", "error", "-i", path, "-f", "null", "-"],
+        capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stderr.strip()
+
+
+def _assert_playable(path, seconds):
+    """Se decodifica completo sin errores, en 1280x720 y con la duración esperada"""
+    assert _decode_errors(path) == ""
+    info = _ffprobe(path, "-show_format", "-show_streams")
+    video = next(s for s in info["streams"] if s["codec_type"] == "video")
+    audio = next(s for s in info["streams"] if s["codec_type"] == "audio")
+    assert (video["width"], video["height"]) == (1280, 720)
+    assert audio["sample_rate"] == "48000"
+    assert float(info["format"]["duration"]) == pytest.approx(seconds, abs=0.1)
+    return info
+
+
+def _frame_hashes(path):
+    """MD5 de cada cuadro de video decodificado"""
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-nostdin", "-v", "error", "-i", path,
+         "-map", "0:v:0", "-f", "framemd5", "-"],
+        capture_output=True, text=True, check=True,
+    )
+    return [line.split(",")[-1].strip() for line in result.stdout.splitlines()
+            if line and not line.startswith("#")]
+
+
+@pytest.fixture
+def bumpers(tmp_path):
+    from worker.assets import AssetCache
+
+    return AssetCache(str(tmp_path / "assets")).get(FAST_PROFILE)
+
+
+class TestPassthroughJoin:
+    """La unión por copia con un clip copiado de otro codificador."""
+
+    def test_other_encoder_is_copied_and_join_decodes_frame_exact(self, bumpers, tmp_path):
+        """SPS/PPS distinto al de las cortinillas: se copia y cada cuadro del clip sale igual."""
+        from worker.ffmpeg_pipeline import plan_streams, probe_media, process_with_assets
+
+        intro_path, outro_path = bumpers
+        source = _encode_source(str(tmp_path / "source.mp4"), 4)
+        hashes = [
+            _ffprobe(path, "-show_streams", "-select_streams", "v:0",
+                     "-show_data_hash", "sha256")["streams"][0]["extradata_hash"]
+            for path in (source, intro_path)
+        ]
+        assert hashes[0] != hashes[1]
+
+        probe = probe_media(source)
+        assert plan_streams(probe, FAST_PROFILE).mode == "passthrough"
+
+        output = str(tmp_path / "output.mp4")
+        assert process_with_assets(
+            source, output, str(tmp_path / "clip.mp4"), intro_path, outro_path,
+            profile=FAST_PROFILE, probe=probe,
+        ) is True
+
+        assert _decode_errors(output) == ""
+        intro, clip, outro = (_frame_hashes(path) for path in (intro_path, source, outro_path))
+        assert _frame_hashes(output) == intro + clip + outro
+
+
+class TestPipelines:
+    """Cada VIDEO_PIPELINE produce un video decodificable de cortinilla + clip + cortinilla."""
+
+    def test_multi_pass(self, tmp_path, monkeypatch):
+        """Recorte, escalado y concat en tres pasadas (original de 4 s en 1080p)."""
+        from shared.config.settings import settings
+        from worker.tasks import video_processing
+
+        monkeypatch.setattr(settings, "assets_dir", str(tmp_path / "assets"))
+        source = _encode_source(str(tmp_path / "source.mp4"), 4, size="1920x1080")
+        trimmed, resized = str(tmp_path / "trimmed.mp4"), str(tmp_path / "resized.mp4")
+        output = str(tmp_path / "output.mp4")
+
+        assert video_processing.trim_video_to_30s(source, trimmed)
+        assert video_processing.resize_to_720p_16_9(trimmed, resized)
+        assert video_processing.add_anb_intro_outro(resized, output)
+        _assert_playable(output, 14)
+
+    def test_single_pass(self, bumpers, tmp_path):
+        """Un ffmpeg con filter graph (original de 4 s en 1080p, audio 44.1 kHz)."""
+        from worker.ffmpeg_pipeline import process_single_pass
+
+        intro_path, outro_path = bumpers
+        source = _encode_source(str(tmp_path / "source.mp4"), 4, size="1920x1080",
+                                sample_rate=44100)
+        output = str(tmp_path / "output.mp4")
+
+        assert process_single_pass(source, output, intro_path, outro_path) is True
+        _assert_playable(output, 14)
+
+    def test_asset_concat_transcodes_other_profiles(self, bumpers, tmp_path):
+        """1080p + 44.1 kHz no cumple el perfil: el clip se codifica y se une por copia."""
+        from worker.ffmpeg_pipeline import plan_streams, probe_media, process_with_assets
+
+        intro_path, outro_path = bumpers
+        source = _encode_source(str(tmp_path / "source.mp4"), 4, size="1920x1080",
+                                sample_rate=44100)
+        probe = probe_media(source)
+        assert plan_streams(probe, FAST_PROFILE).mode == "transcode"
+
+        output = str(tmp_path / "output.mp4")
+        assert process_with_assets(
+            source, output, str(tmp_path / "clip.mp4"), intro_path, outro_path,
+            profile=FAST_PROFILE, probe=probe,
+        ) is True
+        _assert_playable(output, 14)
+
+
+@pytest.fixture
+def range_server(tmp_path):
+    """Sirve tmp_path por HTTP con Range (como S3); registra el inicio de cada GET"""
+    starts = []
+
+    class Handler(http.server.SimpleHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            path = self.translate_path(self.path.split("?")[0])
+            size = os.path.getsize(path)
+            start, end = 0, size - 1
+            match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+            if match:
+                start = int(match.group(1))
+                end = min(int(match.group(2)), end) if match.group(2) else end
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            else:
+                self.send_response(200)
+            starts.append(start)
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("Content-Length", str(end - start + 1))
+            self.end_headers()
+            with open(path, "rb") as f:
+                f.seek(start)
+                try:
+                    self.wfile.write(f.read(end - start + 1))
+                except (BrokenPipeError, ConnectionResetError):
+                    # ffmpeg cierra la conexión cuando ya no necesita más bytes
+                    pass
+
+    handler = functools.partial(Handler, directory=str(tmp_path))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", starts
+    server.shutdown()
+    server.server_close()
+
+
+class TestRemoteSource:
+    """ffmpeg lee el original por HTTP (VIDEO_SOURCE_MODE=stream)."""
+
+    def test_moov_at_end_is_read_with_range_requests(self, range_server, bumpers, tmp_path):
+        """Sin faststart: ffprobe y el clip saltan al moov del final con Range y vuelven al mdat."""
+        from worker.ffmpeg_pipeline import probe_media, process_with_assets
+
+        base_url, starts = range_server
+        intro_path, outro_path = bumpers
+        source = _encode_source(str(tmp_path / "source.mp4"), 4, size="1920x1080",
+                                sample_rate=44100)
+        with open(source, "rb") as f:
+            data = f.read()
+        moov = data.index(b"moov") - 4
+        assert moov > data.index(b"mdat")
+
+        url = f"{base_url}/source.mp4?X-Amz-Signature=test"
+        probe = probe_media(url)
+        assert probe.duration == pytest.approx(4, abs=0.1)
+
+        output = str(tmp_path / "output.mp4")
+        assert process_with_assets(
+            url, output, str(tmp_path / "clip.mp4"), intro_path, outro_path,
+            profile=FAST_PROFILE, probe=probe,
+        ) is True
+        _assert_playable(output, 14)
+        # ffprobe y el clip: inicio, salto al moov del final y vuelta al inicio del mdat
+        mdat = data.index(b"mdat") + 4
+        assert starts == [0, moov, mdat] * 2
+
+
+class TestStreamedOutput:
+    """VIDEO_OUTPUT_MODE=stream: la unión se entrega como MP4 fragmentado mientras se produce."""
+
+    def test_fragmented_output_plays_and_seeks(self, bumpers, tmp_path):
+        """El MP4 fragmentado se decodifica completo, con la duración correcta y con búsqueda."""
+        from shared.storage import LocalFileWriter
+        from worker.ffmpeg_pipeline import process_with_assets
+
+        intro_path, outro_path = bumpers
+        source = _encode_source(str(tmp_path / "source.mp4"), 4, size="1920x1080",
+                                sample_rate=44100)
+        output = str(tmp_path / "output.mp4")
+        writer = LocalFileWriter(output)
+
+        assert process_with_assets(
+            source, str(tmp_path / "unused.mp4"), str(tmp_path / "clip.mp4"),
+            intro_path, outro_path, profile=FAST_PROFILE, sink=writer,
+        ) is True
+        writer.close()
+
+        with open(output, "rb") as f:
+            data = f.read()
+        assert b"mvex" in data and b"moof" in data
+        _assert_playable(output, 14)
+        result = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-nostdin", "-v", "error", "-ss", "10", "-i", output,
+             "-frames:v", "1", "-f", "framemd5", "-"],
+            capture_output=True, text=True,
+        )
+        assert result.returncode == 0 and result.stderr == ""
+        assert len(_frame_hashes(output)) == 14 * 30
+
+    def test_task_aborts_multipart_upload_when_ffmpeg_dies(self, bumpers, tmp_path, monkeypatch):
+        """ffmpeg termina a mitad de la unión (p. ej. OOM): la subida multipart se aborta,
+        no se completa ningún objeto y el video queda en FAILED."""
+        from unittest.mock import MagicMock
+        import uuid
+
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+
+        import shared.storage
+        import worker.ffmpeg_pipeline as ffmpeg_pipeline
+        from shared.config.settings import settings
+        from shared.db.config import Base
+        from shared.db.models.user import User
+        from shared.db.models.video import Video, VideoStatus
+        from shared.storage import S3Storage, storage_manager
+        from worker.tasks import video_processing
+
+        source = _encode_source(str(tmp_path / "source.mp4"), 4)
+
+        engine = create_engine("sqlite:///./test.db", connect_args={"check_same_thread": False})
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        Base.metadata.create_all(bind=engine)
+        db = SessionLocal()
+        user = User(id=str(uuid.uuid4()), first_name="John", last_name="Doe",
+                    email="john.doe@mail.com", password_hash="hash",
+                    city="Bogotá", country="Colombia")
+        video_id = str(uuid.uuid4())
+        db.add(user)
+        db.add(Video(id=video_id, title="Video", status=VideoStatus.UPLOADED.value,
+                     id_user=user.id, content_sha256="0" * 64,
+                     file_original_url="https://test-bucket.s3.amazonaws.com/videos/v/v.mp4"))
+        db.commit()
+
+        def test_db():
+            session = SessionLocal()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        # ffmpeg real; se registra cada proceso para terminar la unión en curso
+        processes = []
+        popen = subprocess.Popen
+
+        def recording_popen(*args, **kwargs):
+            process = popen(*args, **kwargs)
+            processes.append(process)
+            return process
+
+        storage = S3Storage(bucket_name="test-bucket")
+        storage.s3_client = MagicMock()
+        storage.s3_client.download_file.side_effect = (
+            lambda bucket, key, path: shutil.copyfile(source, path)
+        )
+        storage.s3_client.create_multipart_upload.return_value = {"UploadId": "up-1"}
+
+        def upload_part(**kwargs):
+            if kwargs["PartNumber"] == 1:
+                processes[-1].kill()
+            return {"ETag": f"etag-{kwargs['PartNumber']}"}
+
+        storage.s3_client.upload_part.side_effect = upload_part
+
+        # Partes y bloques pequeños: con un video de 14 s ffmpeg sigue en ejecución
+        # cuando se sube la primera parte
+        monkeypatch.setattr(shared.storage, "S3_MIN_PART_SIZE", 64 * 1024)
+        monkeypatch.setattr(settings, "upload_session_chunk_size", 64 * 1024)
+        monkeypatch.setattr(ffmpeg_pipeline, "STREAM_QUEUE_CHUNKS", 1)
+        monkeypatch.setattr(ffmpeg_pipeline, "stream_ffmpeg", functools.partial(
+            ffmpeg_pipeline.stream_ffmpeg, chunk_size=64 * 1024))
+        monkeypatch.setattr(subprocess, "Popen", recording_popen)
+        monkeypatch.setattr(settings, "uploads_dir", str(tmp_path / "uploads"))
+        monkeypatch.setattr(settings, "video_pipeline", "asset_concat")
+        monkeypatch.setattr(settings, "video_source_mode", "download")
+        monkeypatch.setattr(settings, "video_output_mode", "stream")
+        monkeypatch.setattr(storage_manager, "backend", storage)
+        monkeypatch.setattr(storage_manager, "storage_type", "s3")
+        monkeypatch.setattr(video_processing, "asset_cache", MagicMock(get=lambda: bumpers))
+        monkeypatch.setattr(video_processing, "probe_cache", ffmpeg_pipeline.ProbeCache(str(tmp_path / "probes")))
+        monkeypatch.setattr(video_processing, "get_db", test_db)
+
+        try:
+            with pytest.raises(Exception, match="Error en procesamiento de video"):
+                video_processing.process_video_task(video_id)
+
+            assert processes[-1].returncode == -9
+            assert storage.s3_client.upload_part.call_count >= 1
+            storage.s3_client.abort_multipart_upload.assert_called_once_with(
+                Bucket="test-bucket", Key=f"processed/{video_id}/processed_{video_id}.mp4",
+                UploadId="up-1",
+            )
+            storage.s3_client.complete_multipart_upload.assert_not_called()
+            storage.s3_client.put_object.assert_not_called()
+            db.expire_all()
+            assert db.query(Video).filter(Video.id == video_id).first().status == \
+                VideoStatus.FAILED.value
+        finally:
+            db.close()
+            Base.metadata.drop_all(bind=engine)
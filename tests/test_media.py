@@ -0,0 +1,34 @@
+import io
+import pytest
+
+from tests.mp4_samples import build_mp4
+from shared.media import probe_mp4, MP4ProbeError
+
+
+def test_probe_mp4_reads_duration_and_resolution():
+    """Extrae duración y resolución de las cabeceras mvhd/tkhd."""
+    info = probe_mp4(io.BytesIO(build_mp4(width=640, height=360, duration_seconds=90)))
+
+    assert info.duration_seconds == 90
+    assert info.resolution == "640x360"
+
+
+def test_probe_mp4_moov_at_end():
+    """Encuentra el moov al final saltando el mdat con seek."""
+    file_obj = io.BytesIO(build_mp4(moov_first=False, mdat_payload=b"\0" * (1024 * 1024)))
+
+    info = probe_mp4(file_obj)
+
+    assert info.resolution == "1280x720"
+    assert file_obj.tell() == 0
+
+
+@pytest.mark.parametrize("content", [
+    b"fake video content" * 100,
+    build_mp4()[:60],
+    b"",
+])
+def test_probe_mp4_rejects_invalid_files(content):
+    """Archivos que no son MP4 o están truncados se rechazan."""
+    with pytest.raises(MP4ProbeError):
+        probe_mp4(io.BytesIO(content))
@@ -2,8 +2,13 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 import datetime
 import uuid
+import threading
+import asyncio
+import json
+import base64
 from unittest.mock import patch
 
 from app.main import app
@@ -11,7 +16,14 @@ from shared.db.config import Base, get_db
 from shared.db.models.user import User
 from shared.db.models.video import Video, VideoStatus
 from shared.db.models.vote import Vote
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash, create_access_token
+from app.core.vote_aggregator import VoteAggregator, reconcile_vote_counts
+from app.core.live_updates import LiveUpdates, Subscriber
+from app.api.public import live_rankings
+from shared.db.rankings import rebuild_user_rankings, backfill_user_rankings
+from shared.db.models.user_ranking import UserRanking
+from shared.config.settings import settings
+from shared.cache import invalidate_public_reads
 
 # Configuración de base de datos de prueba
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -45,9 +57,11 @@ def test_data():
     db = TestingSessionLocal()
 
     db.query(Vote).delete()
+    db.query(UserRanking).delete()
     db.query(Video).delete()
     db.query(User).delete()
     db.commit()
+    invalidate_public_reads()
 
     password_plain = "StrongPass123"
     password_hashed = get_password_hash(password_plain)
@@ -118,6 +132,7 @@ def test_data():
         status=VideoStatus.PROCESSED.value,
         id_user=user1.id,
         uploaded_at=now,
+        processed_at=now - datetime.timedelta(hours=1),
         file_original_url="file://ruta/video3.mp4",
         file_processed_url=None,
         file_size_bytes=123456,
@@ -144,6 +159,8 @@ def test_data():
     db.add(vote)
     db.commit()
 
+    rebuild_user_rankings(db)
+
     yield {
         'users': [
             {'email': user1.email, 'password': password_plain, 'id': user1.id},
@@ -176,45 +193,173 @@ def test_vote_for_video_success(test_data):
         db.delete(existing_vote)
         db.commit()
 
-    with patch("app.api.public.verify_token", return_value=user['email']):
-        response = client.post(f"/api/public/videos/{video.id}/vote", headers={"Authorization": "Bearer faketoken"})
-        assert response.status_code == 200
-        json_resp = response.json()
-        assert json_resp["message"] == "Voto registrado exitosamente."
+    token = create_access_token(data={"sub": user["email"], "uid": user["id"]})
+    response = client.post(f"/api/public/videos/{video.id}/vote", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    json_resp = response.json()
+    assert json_resp["message"] == "Voto registrado exitosamente."
 
-        vote_in_db = db.query(Vote).filter(Vote.id_user == user['id'], Vote.id_video == video.id).first()
-        assert vote_in_db is not None
+    vote_in_db = db.query(Vote).filter(Vote.id_user == user['id'], Vote.id_video == video.id).first()
+    assert vote_in_db is not None
 
-        video_in_db = db.query(Video).filter(Video.id == video.id).first()
-        db.refresh(video_in_db)
-        assert video_in_db.votes == 1
+    video_in_db = db.query(Video).filter(Video.id == video.id).first()
+    db.refresh(video_in_db)
+    assert video_in_db.votes == 1
 
 
 def test_vote_for_video_already_voted(test_data):
     user = test_data["users"][0]
     video = test_data["videos"][2]
 
-    with patch("app.api.public.verify_token", return_value=user['email']):
-        response = client.post(f"/api/public/videos/{video.id}/vote", headers={"Authorization": "Bearer faketoken"})
-        assert response.status_code == 400
-        assert response.json()["message"] == "Ya has votado por este video"
+    token = create_access_token(data={"sub": user["email"], "uid": user["id"]})
+    response = client.post(f"/api/public/videos/{video.id}/vote", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 400
+    assert response.json()["message"] == "Ya has votado por este video"
 
 
 def test_vote_for_video_not_found(test_data):
     user = test_data["users"][0]
     fake_video_id = str(uuid.uuid4())
 
-    with patch("app.api.public.verify_token", return_value=user['email']):
-        response = client.post(f"/api/public/videos/{fake_video_id}/vote", headers={"Authorization": "Bearer faketoken"})
-        assert response.status_code == 404
-        assert response.json()["message"] == "Video no encontrado o aún no está disponible públicamente"
+    token = create_access_token(data={"sub": user["email"], "uid": user["id"]})
+    response = client.post(f"/api/public/videos/{fake_video_id}/vote", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 404
+    assert response.json()["message"] == "Video no encontrado o aún no está disponible públicamente"
+
+
+def test_vote_for_video_twice_counts_once(test_data):
+    user = test_data["users"][1]
+    video = test_data["videos"][1]
+    db = test_data["db"]
+
+    token = create_access_token(data={"sub": user["email"], "uid": user["id"]})
+    first = client.post(f"/api/public/videos/{video.id}/vote", headers={"Authorization": f"Bearer {token}"})
+    second = client.post(f"/api/public/videos/{video.id}/vote", headers={"Authorization": f"Bearer {token}"})
+
+    assert first.status_code == 200
+    assert second.status_code == 400
+    assert second.json()["message"] == "Ya has votado por este video"
+    db.refresh(video)
+    assert video.votes == 1
+    assert db.query(Vote).filter(Vote.id_video == video.id).count() == 1
+
+
+def test_vote_for_unprocessed_video_is_not_recorded(test_data):
+    user = test_data["users"][1]
+    video = test_data["videos"][0]
+    db = test_data["db"]
+
+    token = create_access_token(data={"sub": user["email"], "uid": user["id"]})
+    response = client.post(f"/api/public/videos/{video.id}/vote", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 404
+    assert db.query(Vote).filter(Vote.id_video == video.id).count() == 0
+    db.refresh(video)
+    assert video.votes == 1
+
+
+def test_vote_write_behind_defers_counter(test_data):
+    user = test_data["users"][1]
+    video = test_data["videos"][1]
+    db = test_data["db"]
+    aggregator = VoteAggregator(session_factory=TestingSessionLocal, flush_interval_ms=60000)
+
+    token = create_access_token(data={"sub": user["email"], "uid": user["id"]})
+    with patch.object(settings, "vote_write_behind", True), \
+            patch("app.api.public.vote_aggregator", aggregator):
+        response = client.post(f"/api/public/videos/{video.id}/vote", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200
+    # El voto es durable de inmediato; el contador espera al flush
+    assert db.query(Vote).filter(Vote.id_video == video.id).count() == 1
+    db.refresh(video)
+    assert video.votes == 0
+    assert aggregator.pending == 1
+
+    aggregator.shutdown()
+    db.refresh(video)
+    assert video.votes == 1
+    assert aggregator.pending == 0
+
+
+def test_vote_aggregator_batches_concurrent_increments(test_data):
+    video = test_data["videos"][1]
+    db = test_data["db"]
+    aggregator = VoteAggregator(session_factory=TestingSessionLocal, shards=4,
+                                flush_interval_ms=60000, flush_max_votes=10**6)
+
+    def add_votes():
+        for _ in range(250):
+            aggregator.add(video.id)
+
+    threads = [threading.Thread(target=add_votes) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Los hilos se reparten en orden entre los shards (no por threading.get_ident())
+    assert [shard.pending for shard in aggregator._shards] == [500, 500, 500, 500]
+    assert aggregator.flush() == 2000
+    db.refresh(video)
+    assert video.votes == 2000
+    aggregator.shutdown()
+
+
+def test_vote_aggregator_keeps_votes_when_flush_fails(test_data):
+    video = test_data["videos"][1]
+    aggregator = VoteAggregator(session_factory=TestingSessionLocal, flush_interval_ms=60000)
+    aggregator.add(video.id, 3)
+
+    with patch.object(aggregator, "session_factory", side_effect=RuntimeError("BD caída")):
+        with pytest.raises(RuntimeError):
+            aggregator.flush()
+
+    assert aggregator.pending == 3
+    assert aggregator.flush() == 3
+    aggregator.shutdown()
+
+
+def test_vote_aggregator_keeps_votes_added_during_flush(test_data):
+    """Un voto que llega mientras se aplica el lote queda pendiente con su propia antigüedad."""
+    video = test_data["videos"][1]
+    aggregator = VoteAggregator(session_factory=TestingSessionLocal, flush_interval_ms=60000)
+    aggregator.add(video.id, 2)
+
+    def session_during_flush():
+        aggregator.add(video.id)
+        return TestingSessionLocal()
+
+    with patch.object(aggregator, "session_factory", side_effect=session_during_flush):
+        assert aggregator.flush() == 2
+
+    assert aggregator.pending == 1
+    assert 0 < aggregator.lag_seconds() < 60
+    assert aggregator.flush() == 1
+    assert aggregator.pending == 0
+    assert aggregator.lag_seconds() == 0.0
+    aggregator.shutdown()
+
+
+def test_reconcile_vote_counts(test_data):
+    db = test_data["db"]
+    video1, video2, video3 = test_data["videos"]
+
+    # video1 tiene votes=1 sin filas en votes; video3 coincide (1 voto)
+    mismatches = reconcile_vote_counts(db)
+    assert mismatches == {video1.id: (1, 0)}
+
+    reconcile_vote_counts(db, fix=True)
+    db.refresh(video1)
+    assert video1.votes == 0
+    assert reconcile_vote_counts(db) == {}
 
 
 def test_vote_for_video_unauthorized(test_data):
-    with patch("app.api.public.verify_token", return_value="noexiste@example.com"):
-        response = client.post(f"/api/public/videos/{test_data['videos'][0].id}/vote", headers={"Authorization": "Bearer faketoken"})
-        assert response.status_code == 401
-        assert response.json()["message"] == "Usuario no autorizado"
+    token = create_access_token(data={"sub": "noexiste@example.com"})
+    response = client.post(f"/api/public/videos/{test_data['videos'][0].id}/vote", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+    assert response.json()["message"] == "Usuario no autorizado"
 
 
 def test_get_rankings_no_filter(test_data):
@@ -240,3 +385,297 @@ def test_get_rankings_with_city_filter_no_results(test_data):
     assert response.status_code == 200
     data = response.json()
     assert data == []
+
+
+def test_get_rankings_error_is_logged(test_data, caplog):
+    with patch("app.api.public.rankings_page", side_effect=RuntimeError("BD caída")):
+        response = client.get("/api/public/rankings", params={"city": "error"})
+    assert response.status_code == 400
+    assert response.json()["message"] == "Error al obtener el ranking"
+    assert "Error obteniendo el ranking" in caplog.text
+
+
+def test_rankings_follow_votes_incrementally(test_data):
+    user = test_data["users"][0]
+    video = test_data["videos"][1]
+
+    before = {item["username"]: item["votes"] for item in client.get("/api/public/rankings").json()}
+    token = create_access_token(data={"sub": user["email"], "uid": user["id"]})
+    response = client.post(f"/api/public/videos/{video.id}/vote", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+
+    after = client.get("/api/public/rankings").json()
+    assert {item["username"]: item["votes"] for item in after}["Bob Marley"] == before["Bob Marley"] + 1
+    assert [item["position"] for item in after] == [1, 2]
+
+
+def test_rankings_city_filter_is_normalized_and_limited(test_data):
+    response = client.get("/api/public/rankings", params={"city": "  BOGOTÁ ", "limit": 1})
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 1
+    assert data[0]["city"] == "Bogotá"
+
+
+def test_rankings_write_behind_flush_updates_ranking(test_data):
+    user = test_data["users"][0]
+    video = test_data["videos"][1]
+    aggregator = VoteAggregator(session_factory=TestingSessionLocal, flush_interval_ms=60000)
+
+    token = create_access_token(data={"sub": user["email"], "uid": user["id"]})
+    with patch.object(settings, "vote_write_behind", True), \
+            patch("app.api.public.vote_aggregator", aggregator):
+        client.post(f"/api/public/videos/{video.id}/vote", headers={"Authorization": f"Bearer {token}"})
+
+    votes = lambda: {item["username"]: item["votes"] for item in client.get("/api/public/rankings").json()}
+    assert votes()["Bob Marley"] == 0
+    aggregator.shutdown()
+    assert votes()["Bob Marley"] == 1
+
+
+def test_rebuild_user_rankings_matches_videos(test_data):
+    db = test_data["db"]
+    db.query(UserRanking).delete()
+    db.commit()
+
+    assert rebuild_user_rankings(db) == 2
+    rows = {r.id_user: (r.total_votes, r.processed_videos, r.city_normalized)
+            for r in db.query(UserRanking).all()}
+    # user1: solo video3 (procesado, 1 voto); video1 no está procesado
+    assert rows[test_data["users"][0]["id"]] == (1, 1, "bogotá")
+    assert rows[test_data["users"][1]["id"]] == (0, 1, "bogotá")
+
+
+def test_backfill_user_rankings_only_when_empty(test_data):
+    """init_db llena el ranking de una base existente sin pisar uno ya mantenido."""
+    db = test_data["db"]
+    assert backfill_user_rankings(db) is None
+
+    db.query(UserRanking).delete()
+    db.commit()
+    assert backfill_user_rankings(db) == 2
+    assert db.query(UserRanking).count() == 2
+
+
+def test_public_videos_keyset_pagination(test_data):
+    video2, video3 = test_data["videos"][1], test_data["videos"][2]
+
+    first = client.get("/api/public/videos", params={"limit": 1})
+    assert first.status_code == 200
+    assert [v["id"] for v in first.json()] == [video2.id]
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = client.get("/api/public/videos", params={"limit": 1, "cursor": cursor})
+    assert [v["id"] for v in second.json()] == [video3.id]
+    assert "X-Next-Cursor" not in second.headers
+
+
+def test_public_videos_skip_processed_without_processed_at(test_data):
+    """El listado recorre solo el índice parcial (processed_at no nulo)."""
+    db = test_data["db"]
+    video3 = test_data["videos"][2]
+    db.query(Video).filter(Video.id == video3.id).update({"processed_at": None})
+    db.commit()
+    invalidate_public_reads()
+
+    response = client.get("/api/public/videos")
+    assert [v["id"] for v in response.json()] == [test_data["videos"][1].id]
+
+
+def test_public_videos_invalid_cursor_and_limit(test_data):
+    assert client.get("/api/public/videos", params={"cursor": "no-es-un-cursor"}).status_code == 400
+    # Cursores bien formados con tipos inesperados
+    for values in ([1, 2], [None, "id"], [{"dt": "2024-01-01T00:00:00+00:00"}, "id"], ["x", True]):
+        crafted = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+        response = client.get("/api/public/videos", params={"cursor": crafted})
+        assert response.status_code == 400
+        assert response.json()["message"] == "Cursor inválido"
+    crafted = base64.urlsafe_b64encode(json.dumps(["5", "id", 0]).encode()).decode()
+    assert client.get("/api/public/rankings", params={"cursor": crafted}).status_code == 400
+    assert client.get("/api/public/videos", params={"limit": 0}).status_code == 422
+    assert client.get("/api/public/videos", params={"limit": 10000}).status_code == 422
+
+
+def test_rankings_keyset_pagination_keeps_positions(test_data):
+    full = client.get("/api/public/rankings").json()
+
+    first = client.get("/api/public/rankings", params={"limit": 1})
+    second = client.get("/api/public/rankings",
+                        params={"limit": 1, "cursor": first.headers["X-Next-Cursor"]})
+
+    assert first.json() + second.json() == full
+    assert second.json()[0]["position"] == 2
+    assert "X-Next-Cursor" not in second.headers
+
+
+def test_public_reads_are_cached_until_a_vote(test_data):
+    user = test_data["users"][1]
+    video = test_data["videos"][1]
+    db = test_data["db"]
+
+    first = client.get("/api/public/videos")
+    cached = client.get("/api/public/videos")
+    assert first.headers["X-Cache"] == "MISS"
+    assert cached.headers["X-Cache"] == "HIT"
+    assert cached.json() == first.json()
+
+    # Cambio directo en la BD (sin invalidar): se sigue sirviendo la copia en caché
+    db.query(Video).filter(Video.id == video.id).update({"title": "Cambiado"})
+    db.commit()
+    assert client.get("/api/public/videos").headers["X-Cache"] == "HIT"
+
+    token = create_access_token(data={"sub": user["email"], "uid": user["id"]})
+    client.post(f"/api/public/videos/{video.id}/vote", headers={"Authorization": f"Bearer {token}"})
+
+    after_vote = client.get("/api/public/videos")
+    assert after_vote.headers["X-Cache"] == "MISS"
+    voted = next(v for v in after_vote.json() if v["id"] == video.id)
+    assert voted["votes"] == 1
+    assert voted["title"] == "Cambiado"
+    ranking = client.get("/api/public/rankings")
+    assert ranking.headers["X-Cache"] == "MISS"
+
+
+def test_cached_pages_keep_cursor_header(test_data):
+    first = client.get("/api/public/videos", params={"limit": 1})
+    cached = client.get("/api/public/videos", params={"limit": 1})
+    assert cached.headers["X-Cache"] == "HIT"
+    assert cached.headers["X-Next-Cursor"] == first.headers["X-Next-Cursor"]
+
+    # Cada ciudad (normalizada) y página es una entrada distinta
+    assert client.get("/api/public/rankings", params={"city": "Bogotá"}).headers["X-Cache"] == "MISS"
+    assert client.get("/api/public/rankings", params={"city": " bogotá "}).headers["X-Cache"] == "HIT"
+    assert client.get("/api/public/rankings", params={"city": "Cali"}).headers["X-Cache"] == "MISS"
+
+
+def test_public_reads_conditional_get(test_data):
+    user = test_data["users"][1]
+    video = test_data["videos"][1]
+
+    response = client.get("/api/public/videos")
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == f"public, max-age={int(settings.cache_ttl_public_videos)}"
+    assert "Last-Modified" in response.headers
+
+    not_modified = client.get("/api/public/videos", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == etag
+    since = client.get("/api/public/videos",
+                       headers={"If-Modified-Since": response.headers["Last-Modified"]})
+    assert since.status_code == 304
+
+    # 304 servido desde la caché, sin consultar la BD
+    queries = []
+    listener = lambda *args: queries.append(args[2])
+    event.listen(Engine, "before_cursor_execute", listener)
+    try:
+        assert client.get("/api/public/videos", headers={"If-None-Match": etag}).status_code == 304
+    finally:
+        event.remove(Engine, "before_cursor_execute", listener)
+    assert queries == []
+
+    token = create_access_token(data={"sub": user["email"], "uid": user["id"]})
+    client.post(f"/api/public/videos/{video.id}/vote", headers={"Authorization": f"Bearer {token}"})
+
+    changed = client.get("/api/public/videos", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    ranking = client.get("/api/public/rankings")
+    assert client.get("/api/public/rankings",
+                      headers={"If-None-Match": ranking.headers["ETag"]}).status_code == 304
+
+
+def test_live_updates_sends_only_changes(test_data):
+    user = test_data["users"][0]
+    video = test_data["videos"][1]
+    live = LiveUpdates(session_factory=TestingSessionLocal, max_idle_seconds=3600, lag_seconds=0)
+
+    first = live.compute_delta()
+    assert [entry["username"] for entry in first["rankings"].values()] == ["John Doe", "Bob Marley"]
+    # Sin votos ni videos procesados: no consulta ni envía nada
+    assert live.compute_delta() is None
+
+    token = create_access_token(data={"sub": user["email"], "uid": user["id"]})
+    client.post(f"/api/public/videos/{video.id}/vote", headers={"Authorization": f"Bearer {token}"})
+
+    delta = live.compute_delta()
+    assert delta["videos"] == {video.id: 1}
+    # Empate 1-1: solo cambian las posiciones que se reordenan
+    assert all(entry["votes"] == 1 for entry in delta["rankings"].values())
+    assert live.compute_delta(force=True) is None
+
+
+def test_live_updates_fan_out_and_coalescing(test_data):
+    live = LiveUpdates(session_factory=TestingSessionLocal, max_idle_seconds=0, lag_seconds=0)
+
+    async def scenario():
+        subscribers = [Subscriber() for _ in range(1000)]
+        live.subscribers.update(subscribers)
+
+        queries = []
+        listener = lambda *args: queries.append(args[2])
+        event.listen(Engine, "before_cursor_execute", listener)
+        try:
+            await live.refresh(force=True)
+        finally:
+            event.remove(Engine, "before_cursor_execute", listener)
+        # Una consulta por intervalo, sin importar la cantidad de conexiones
+        assert len(queries) == 1
+        messages = {id(subscriber.take()) for subscriber in subscribers}
+        assert len(messages) == 1
+
+        # Cliente lento: dos deltas sin leer llegan combinados en un mensaje
+        slow = subscribers[0]
+        live.publish({"rankings": {"1": {"position": 1, "votes": 5}}, "videos": {"a": 1}})
+        live.publish({"rankings": {}, "videos": {"a": 2, "b": 1}})
+        message = slow.take()
+        assert message.startswith(b"event: update\n")
+        data = json.loads(message.split(b"data: ")[1])
+        assert data == {"rankings": {"1": {"position": 1, "votes": 5}}, "videos": {"a": 2, "b": 1}}
+        assert not slow.event.is_set()
+
+    asyncio.run(scenario())
+
+
+def test_live_endpoint_streams_snapshot_and_updates(test_data):
+    live = LiveUpdates(session_factory=TestingSessionLocal, interval_ms=60000)
+
+    async def scenario():
+        with patch("app.api.public.live_updates", live):
+            response = await live_rankings()
+            assert response.media_type == "text/event-stream"
+            stream = response.body_iterator
+            assert (await stream.__anext__()).startswith(b"event: snapshot\n")
+            assert len(live.subscribers) == 1
+
+            update = await asyncio.wait_for(stream.__anext__(), 5)
+            assert update.startswith(b"event: update\n")
+            assert b"John Doe" in update
+
+            await stream.aclose()
+            assert live.subscribers == set()
+            live.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_live_endpoint_ends_on_shutdown(test_data):
+    """Al apagar la API el stream termina sin esperar a que el cliente se desconecte."""
+    live = LiveUpdates(session_factory=TestingSessionLocal, interval_ms=60000)
+
+    async def scenario():
+        with patch("app.api.public.live_updates", live):
+            response = await live_rankings()
+            stream = response.body_iterator
+            assert (await stream.__anext__()).startswith(b"event: snapshot\n")
+            # Consume el primer update para que el stream quede esperando
+            await asyncio.wait_for(stream.__anext__(), 5)
+
+            pending = asyncio.ensure_future(stream.__anext__())
+            await asyncio.sleep(0)
+            live.shutdown()
+            with pytest.raises(StopAsyncIteration):
+                await asyncio.wait_for(pending, 5)
+            assert live.subscribers == set()
+
+    asyncio.run(scenario())
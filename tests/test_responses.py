@@ -0,0 +1,34 @@
+import datetime
+import json
+import uuid
+from enum import Enum
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from app.core.responses import FastJSONResponse
+
+
+class Status(Enum):
+    PROCESSED = "processed"
+
+
+def test_fast_json_response_matches_jsonable_encoder():
+    content = [
+        {
+            "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            "title": "Triple ñ",
+            "status": Status.PROCESSED,
+            "uploaded_at": datetime.datetime(2025, 1, 2, 3, 4, 5, 678000),
+            "processed_at": datetime.datetime(2025, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc),
+            "votes": 3,
+        }
+    ]
+    expected = JSONResponse(content=jsonable_encoder(content)).body
+    assert json.loads(FastJSONResponse(content=content).body) == json.loads(expected)
+
+
+def test_fast_json_response_omits_none():
+    content = {"a": None, "b": [{"c": None, "d": 1}], "e": 0}
+    assert json.loads(FastJSONResponse(content=content).body) == {"b": [{"d": 1}], "e": 0}
+    assert json.loads(FastJSONResponse(content=content, exclude_none=False).body)["a"] is None
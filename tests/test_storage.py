@@ -0,0 +1,208 @@
+import io
+import os
+import anyio
+import pytest
+from unittest.mock import MagicMock
+
+from shared.storage import (
+    AsyncLimitedReader,
+    LocalStorage,
+    S3Storage,
+    S3_MIN_PART_SIZE,
+    S3MultipartWriter,
+    StorageManager,
+    UploadTooLargeError,
+)
+
+
+class AsyncBytes:
+    """Objeto con `async read()` equivalente a UploadFile"""
+
+    def __init__(self, data: bytes):
+        self._file = io.BytesIO(data)
+
+    async def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+
+def test_local_async_upload_writes_file(tmp_path):
+    storage = LocalStorage(base_dir=str(tmp_path))
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    reader = AsyncLimitedReader(AsyncBytes(data), len(data))
+
+    path = anyio.run(storage.upload_fileobj_async, reader, "videos/a/a.mp4")
+
+    with open(path, "rb") as f:
+        assert f.read() == data
+    assert reader.bytes_read == len(data)
+
+
+def test_local_async_upload_too_large_removes_partial_file(tmp_path):
+    storage = LocalStorage(base_dir=str(tmp_path))
+    reader = AsyncLimitedReader(AsyncBytes(b"x" * 4096), 1024)
+
+    with pytest.raises(UploadTooLargeError):
+        anyio.run(storage.upload_fileobj_async, reader, "videos/a/a.mp4")
+
+    assert not os.path.exists(tmp_path / "videos" / "a" / "a.mp4")
+
+
+def make_s3_storage():
+    storage = S3Storage(bucket_name="test-bucket")
+    storage.s3_client = MagicMock()
+    storage.s3_client.create_multipart_upload.return_value = {"UploadId": "up-1"}
+    storage.s3_client.upload_part.side_effect = lambda **kwargs: {
+        "ETag": f"etag-{kwargs['PartNumber']}"
+    }
+    return storage
+
+
+def test_s3_async_upload_streams_parts():
+    storage = make_s3_storage()
+    data = b"v" * (2 * S3_MIN_PART_SIZE + 1024)
+
+    url = anyio.run(storage.upload_fileobj_async, AsyncBytes(data), "videos/a/a.mp4")
+
+    assert url.endswith("/videos/a/a.mp4")
+    calls = storage.s3_client.upload_part.call_args_list
+    assert [c.kwargs["PartNumber"] for c in calls] == [1, 2, 3]
+    assert sum(len(c.kwargs["Body"].getvalue()) for c in calls) == len(data)
+    parts = storage.s3_client.complete_multipart_upload.call_args.kwargs[
+        "MultipartUpload"
+    ]["Parts"]
+    assert parts == [{"PartNumber": n, "ETag": f"etag-{n}"} for n in (1, 2, 3)]
+    storage.s3_client.put_object.assert_not_called()
+
+
+def test_s3_async_upload_small_file_single_put():
+    storage = make_s3_storage()
+
+    anyio.run(storage.upload_fileobj_async, AsyncBytes(b"small"), "videos/a/a.mp4")
+
+    assert storage.s3_client.put_object.call_args.kwargs["Body"] == b"small"
+    storage.s3_client.create_multipart_upload.assert_not_called()
+
+
+def test_s3_async_upload_aborts_on_error():
+    storage = make_s3_storage()
+    data = b"v" * (S3_MIN_PART_SIZE + 1024)
+    reader = AsyncLimitedReader(AsyncBytes(data), S3_MIN_PART_SIZE + 10)
+
+    with pytest.raises(UploadTooLargeError):
+        anyio.run(storage.upload_fileobj_async, reader, "videos/a/a.mp4")
+
+    storage.s3_client.abort_multipart_upload.assert_called_once_with(
+        Bucket="test-bucket", Key="videos/a/a.mp4", UploadId="up-1"
+    )
+    storage.s3_client.complete_multipart_upload.assert_not_called()
+
+
+def test_video_source_is_presigned_get_for_s3():
+    manager = StorageManager.__new__(StorageManager)
+    manager.backend = make_s3_storage()
+    manager.storage_type = "s3"
+    manager.backend.s3_client.generate_presigned_url.return_value = "https://signed"
+
+    source = manager.get_video_source(
+        "https://test-bucket.s3.us-east-1.amazonaws.com/videos/a/a.mp4", 600
+    )
+
+    assert source == "https://signed"
+    manager.backend.s3_client.generate_presigned_url.assert_called_once_with(
+        "get_object", Params={"Bucket": "test-bucket", "Key": "videos/a/a.mp4"}, ExpiresIn=600
+    )
+    manager.backend.s3_client.download_file.assert_not_called()
+
+
+def test_direct_upload_is_presigned_post_with_size_limit():
+    """El POST prefirmado limita el tamaño en S3 y apunta a incoming/."""
+    manager = StorageManager.__new__(StorageManager)
+    manager.backend = make_s3_storage()
+    manager.storage_type = "s3"
+    manager.backend.s3_client.generate_presigned_post.return_value = {
+        "url": "https://test-bucket.s3.amazonaws.com/", "fields": {"key": "incoming/a.mp4"}
+    }
+
+    upload_request = manager.get_video_upload_request("a", 900)
+
+    assert upload_request["method"] == "POST"
+    assert upload_request["fields"] == {"key": "incoming/a.mp4"}
+    args, kwargs = manager.backend.s3_client.generate_presigned_post.call_args
+    assert args == ("test-bucket", "incoming/a.mp4")
+    assert ["content-length-range", 1, 100 * 1024 * 1024] in kwargs["Conditions"]
+
+
+def test_s3_promote_incoming_video_copies_and_deletes():
+    manager = StorageManager.__new__(StorageManager)
+    manager.backend = make_s3_storage()
+    manager.storage_type = "s3"
+
+    url = manager.promote_incoming_video("a", "a.mp4")
+
+    assert url.endswith("/videos/a/a.mp4")
+    manager.backend.s3_client.copy_object.assert_called_once_with(
+        Bucket="test-bucket", Key="videos/a/a.mp4",
+        CopySource={"Bucket": "test-bucket", "Key": "incoming/a.mp4"},
+    )
+    manager.backend.s3_client.delete_object.assert_called_once_with(
+        Bucket="test-bucket", Key="incoming/a.mp4"
+    )
+
+
+def test_video_source_is_local_path(tmp_path):
+    manager = StorageManager.__new__(StorageManager)
+    manager.backend = LocalStorage(base_dir=str(tmp_path))
+    manager.storage_type = "local"
+    path = str(tmp_path / "videos" / "a" / "a.mp4")
+
+    assert manager.get_video_source(path, 600) == path
+
+
+def test_s3_writer_uploads_parts_as_data_arrives():
+    storage = make_s3_storage()
+    writer = S3MultipartWriter(storage, "processed/a/processed_a.mp4", S3_MIN_PART_SIZE)
+
+    writer.write(b"v" * (S3_MIN_PART_SIZE - 1))
+    storage.s3_client.upload_part.assert_not_called()
+    writer.write(b"v" * (S3_MIN_PART_SIZE + 2))
+    assert storage.s3_client.upload_part.call_count == 2
+
+    url = writer.close()
+
+    assert url.endswith("/processed/a/processed_a.mp4")
+    calls = storage.s3_client.upload_part.call_args_list
+    assert [len(c.kwargs["Body"].getvalue()) for c in calls] == [S3_MIN_PART_SIZE, S3_MIN_PART_SIZE, 1]
+    assert writer.bytes_written == 2 * S3_MIN_PART_SIZE + 1
+    storage.s3_client.put_object.assert_not_called()
+
+
+def test_s3_writer_small_output_single_put_and_abort():
+    storage = make_s3_storage()
+    writer = S3MultipartWriter(storage, "processed/a/processed_a.mp4")
+    writer.write(b"small")
+    writer.close()
+    assert storage.s3_client.put_object.call_args.kwargs["Body"] == b"small"
+
+    writer = S3MultipartWriter(storage, "processed/a/processed_a.mp4")
+    writer.write(b"v" * S3_MIN_PART_SIZE)
+    writer.abort()
+    storage.s3_client.abort_multipart_upload.assert_called_once_with(
+        Bucket="test-bucket", Key="processed/a/processed_a.mp4", UploadId="up-1"
+    )
+
+
+def test_local_writer_publishes_only_on_close(tmp_path):
+    storage = LocalStorage(base_dir=str(tmp_path))
+    dest = tmp_path / "processed" / "a" / "processed_a.mp4"
+
+    writer = storage.open_writer("processed/a/processed_a.mp4")
+    writer.write(b"abc")
+    writer.write(b"def")
+    assert not dest.exists()
+    assert writer.close() == str(dest)
+    assert dest.read_bytes() == b"abcdef"
+
+    writer = storage.open_writer("processed/b/processed_b.mp4")
+    writer.write(b"abc")
+    writer.abort()
+    assert os.listdir(tmp_path / "processed" / "b") == []
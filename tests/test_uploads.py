@@ -0,0 +1,342 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+import hashlib
+import uuid
+from unittest.mock import patch
+
+from app.main import app
+from shared.db.config import Base, get_db
+from shared.db.models.user import User
+from shared.db.models.video import Video, VideoStatus
+from shared.db.models.outbox import OutboxMessage
+from shared.db.models.upload_session import UploadSession
+from app.core.security import get_password_hash
+from tests.mp4_samples import build_mp4
+
+# Configuración de base de datos de prueba
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+)
+
+
+@event.listens_for(engine, 'connect')
+def enable_foreign_keys(conn, branch):
+    conn.execute('PRAGMA foreign_keys = ON')
+
+
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+app.dependency_overrides[get_db] = override_get_db
+
+client = TestClient(app)
+
+CHUNK_SIZE = 1024
+
+
+@pytest.fixture(scope="function")
+def token():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+
+    user = User(id=str(uuid.uuid4()),
+                first_name="John",
+                last_name="Doe",
+                email="john.doe@mail.com",
+                password_hash=get_password_hash("StrongPass123"),
+                city="Bogotá",
+                country="Colombia")
+    db.add(user)
+    db.commit()
+
+    response_auth = client.post('/api/auth/login',
+                                json={'email': user.email, 'password': "StrongPass123"})
+    assert response_auth.status_code == 200
+
+    with patch('app.api.uploads_api.settings.upload_session_chunk_size', CHUNK_SIZE):
+        yield response_auth.json()['access_token']
+
+    Base.metadata.drop_all(bind=engine)
+    db.close()
+
+
+def create_session(token, content, title='Video reanudable'):
+    response = client.post('/api/videos/uploads',
+                           headers={'Authorization': f"Bearer {token}"},
+                           json={'title': title, 'filename': 'video.mp4', 'total_size': len(content)})
+    assert response.status_code == 201
+    return response.json()
+
+
+def put_chunk(token, upload_id, content, part_number):
+    offset = (part_number - 1) * CHUNK_SIZE
+    return client.put(f"/api/videos/uploads/{upload_id}/chunks/{part_number}?offset={offset}",
+                      headers={'Authorization': f"Bearer {token}"},
+                      content=content[offset:offset + CHUNK_SIZE])
+
+
+def test_resumable_upload_out_of_order_and_finalize(token):
+    """Las partes pueden llegar en cualquier orden; al finalizar se crea el video y se encola."""
+    content = build_mp4(640, 360, 20, mdat_payload=b"\1" * 3000)
+    upload = create_session(token, content)
+    upload_id = upload['upload_id']
+    assert upload['total_chunks'] == 4
+    assert upload['missing_chunks'] == [1, 2, 3, 4]
+
+    for part_number in (3, 1, 4):
+        assert put_chunk(token, upload_id, content, part_number).status_code == 200
+
+    progress = client.get(f"/api/videos/uploads/{upload_id}",
+                          headers={'Authorization': f"Bearer {token}"}).json()
+    assert progress['missing_chunks'] == [2]
+    assert progress['received_bytes'] == len(content) - CHUNK_SIZE
+
+    # Finalizar sin todas las partes
+    response = client.post(f"/api/videos/uploads/{upload_id}/complete",
+                           headers={'Authorization': f"Bearer {token}"})
+    assert response.status_code == 400
+    assert response.json()['missing_chunks'] == [2]
+
+    # Reanudar: solo se reenvía la parte faltante
+    assert put_chunk(token, upload_id, content, 2).status_code == 200
+
+    response = client.post(f"/api/videos/uploads/{upload_id}/complete",
+                           headers={'Authorization': f"Bearer {token}"})
+    assert response.status_code == 201
+
+    db = TestingSessionLocal()
+    video = db.query(Video).filter(Video.id == upload_id).first()
+    assert video.status == VideoStatus.UPLOADED.value
+    assert video.file_size_bytes == len(content)
+    assert video.original_resolution == "640x360"
+    with open(video.file_original_url, "rb") as f:
+        assert f.read() == content
+    assert db.query(OutboxMessage).filter(OutboxMessage.id_video == upload_id).count() == 1
+    assert db.query(UploadSession).count() == 0
+    db.close()
+
+
+def test_resumable_upload_rejects_wrong_offset(token):
+    """El offset debe corresponder al número de parte."""
+    content = build_mp4(mdat_payload=b"\1" * 3000)
+    upload_id = create_session(token, content)['upload_id']
+
+    response = client.put(f"/api/videos/uploads/{upload_id}/chunks/2?offset=10",
+                          headers={'Authorization': f"Bearer {token}"},
+                          content=content[10:10 + CHUNK_SIZE])
+
+    assert response.status_code == 400
+    assert response.json()['message'] == "El offset no corresponde al número de parte"
+
+
+def test_resumable_upload_rejects_too_large(token):
+    """El tamaño total declarado respeta el límite de 100MB."""
+    response = client.post('/api/videos/uploads',
+                           headers={'Authorization': f"Bearer {token}"},
+                           json={'title': 'Grande', 'filename': 'video.mp4',
+                                 'total_size': 101 * 1024 * 1024})
+
+    assert response.status_code == 400
+    assert response.json()['message'] == "El archivo excede el límite de 100MB"
+
+
+# ==================== SUBIDA DIRECTA (URL FIRMADA) ====================
+
+def test_direct_upload_signed_url_and_complete(token):
+    """El cliente sube con la URL firmada y luego confirma la subida."""
+    content = build_mp4(1280, 720, 30)
+
+    response = client.post('/api/videos/direct-uploads',
+                           headers={'Authorization': f"Bearer {token}"},
+                           json={'title': 'Video directo', 'filename': 'video.mp4'})
+    assert response.status_code == 201
+    upload = response.json()
+
+    # Confirmar antes de subir el archivo
+    response = client.post(f"/api/videos/direct-uploads/{upload['video_id']}/complete",
+                           headers={'Authorization': f"Bearer {token}"},
+                           json={'upload_token': upload['upload_token']})
+    assert response.status_code == 400
+
+    response = client.put(upload['upload_url'], content=content, headers=upload['headers'])
+    assert response.status_code == 200
+
+    with patch('app.api.direct_uploads_api.storage_manager.sha256_video') as sha256_video:
+        response = client.post(f"/api/videos/direct-uploads/{upload['video_id']}/complete",
+                               headers={'Authorization': f"Bearer {token}"},
+                               json={'upload_token': upload['upload_token']})
+        # La API no vuelve a leer el archivo completo: el hash lo calcula el worker
+        sha256_video.assert_not_called()
+    assert response.status_code == 201
+
+    db = TestingSessionLocal()
+    video = db.query(Video).filter(Video.id == upload['video_id']).first()
+    assert video.title == 'Video directo'
+    assert video.file_size_bytes == len(content)
+    assert video.original_resolution == "1280x720"
+    assert video.content_sha256 is None
+    assert db.query(OutboxMessage).filter(OutboxMessage.id_video == video.id).count() == 1
+    db.close()
+
+    # La URL sigue vigente, pero ya no alcanza al archivo confirmado
+    response = client.put(upload['upload_url'], content=build_mp4(320, 240, 10),
+                          headers=upload['headers'])
+    assert response.status_code == 200
+    with open(video.file_original_url, "rb") as f:
+        assert f.read() == content
+
+
+def test_direct_upload_rejects_invalid_signature(token):
+    """La URL firmada local no acepta firmas alteradas."""
+    response = client.post('/api/videos/direct-uploads',
+                           headers={'Authorization': f"Bearer {token}"},
+                           json={'title': 'Video directo', 'filename': 'video.mp4'})
+    upload_url = response.json()['upload_url']
+
+    response = client.put(upload_url[:-4] + "0000", content=build_mp4())
+
+    assert response.status_code == 403
+
+
+def upload_all_chunks(token, content):
+    upload_id = create_session(token, content)['upload_id']
+    for part_number in range(1, -(-len(content) // CHUNK_SIZE) + 1):
+        assert put_chunk(token, upload_id, content, part_number).status_code == 200
+    return upload_id
+
+
+def test_resumable_upload_complete_can_be_retried_after_db_error(token):
+    """Si falla el registro, las partes ya unidas se conservan y /complete se reintenta."""
+    content = build_mp4(mdat_payload=b"\2" * 3000)
+    upload_id = upload_all_chunks(token, content)
+
+    with patch('app.api.videos_api.add_processed_video'), \
+            patch('app.api.videos_api.OutboxMessage', side_effect=RuntimeError("BD caída")):
+        response = client.post(f"/api/videos/uploads/{upload_id}/complete",
+                               headers={'Authorization': f"Bearer {token}"})
+    assert response.status_code == 500
+
+    with patch('app.api.uploads_api.storage_manager.complete_video_multipart') as complete:
+        response = client.post(f"/api/videos/uploads/{upload_id}/complete",
+                               headers={'Authorization': f"Bearer {token}"})
+        complete.assert_not_called()
+    assert response.status_code == 201
+
+    db = TestingSessionLocal()
+    video = db.query(Video).filter(Video.id == upload_id).first()
+    with open(video.file_original_url, "rb") as f:
+        assert f.read() == content
+    assert db.query(UploadSession).count() == 0
+    db.close()
+
+
+def run_worker_task(video_id):
+    """Ejecuta la tarea del worker contra la BD de prueba"""
+    import os
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'app-worker'))
+    from worker.tasks import video_processing
+
+    def test_db():
+        db = TestingSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    with patch.object(video_processing, 'get_db', test_db):
+        return video_processing.process_video_task(video_id)
+
+
+def test_resumable_upload_is_deduplicated_by_the_worker(token):
+    """/complete no lee el archivo; el worker calcula el SHA-256 y reutiliza el video ya procesado."""
+    content = build_mp4(mdat_payload=b"\3" * 3000)
+    first_id = upload_all_chunks(token, content)
+    with patch('app.api.uploads_api.storage_manager.sha256_video') as sha256_video:
+        assert client.post(f"/api/videos/uploads/{first_id}/complete",
+                           headers={'Authorization': f"Bearer {token}"}).status_code == 201
+        sha256_video.assert_not_called()
+
+    db = TestingSessionLocal()
+    first = db.query(Video).filter(Video.id == first_id).first()
+    assert first.content_sha256 is None
+    # El worker ya procesó el primero (y calculó su hash)
+    first.content_sha256 = hashlib.sha256(content).hexdigest()
+    first.status = VideoStatus.PROCESSED.value
+    first.file_processed_url = "processed/first.mp4"
+    first.processed_resolution = "1280x720"
+    db.commit()
+    db.close()
+
+    second_id = upload_all_chunks(token, content)
+    response = client.post(f"/api/videos/uploads/{second_id}/complete",
+                           headers={'Authorization': f"Bearer {token}"})
+    assert response.status_code == 201
+    assert response.json()['task_id'] is not None
+
+    with patch('subprocess.run', side_effect=AssertionError("no debe ejecutar ffmpeg")):
+        result = run_worker_task(second_id)
+    assert result['status'] == "deduplicated"
+
+    db = TestingSessionLocal()
+    second = db.query(Video).filter(Video.id == second_id).first()
+    assert second.status == VideoStatus.PROCESSED.value
+    assert second.file_processed_url == "processed/first.mp4"
+    assert second.content_sha256 == hashlib.sha256(content).hexdigest()
+    assert second.processed_at is not None
+    db.close()
+
+
+def test_chunk_is_authenticated_before_reading_the_body(token):
+    """Sin sesión válida la parte se rechaza sin leer el cuerpo."""
+    content = build_mp4(mdat_payload=b"\5" * 3000)
+    upload_id = create_session(token, content)['upload_id']
+
+    def unread_body():
+        raise AssertionError("el cuerpo no debe leerse")
+        yield b""
+
+    response = client.put(f"/api/videos/uploads/{upload_id}/chunks/1?offset=0",
+                          headers={'Authorization': "Bearer token-invalido"},
+                          content=unread_body())
+    assert response.status_code == 401
+
+    response = client.put(f"/api/videos/uploads/{uuid.uuid4()}/chunks/1?offset=0",
+                          headers={'Authorization': f"Bearer {token}"},
+                          content=unread_body())
+    assert response.status_code == 404
+
+
+def test_sweeper_discards_expired_sessions(token, isolated_uploads):
+    """Las sesiones vencidas se eliminan junto con sus partes."""
+    import datetime
+    import os
+    from shared.storage.upload_sweeper import sweep_expired_sessions
+
+    content = build_mp4(mdat_payload=b"\4" * 3000)
+    expired_id = create_session(token, content)['upload_id']
+    assert put_chunk(token, expired_id, content, 1).status_code == 200
+    active_id = create_session(token, content)['upload_id']
+
+    db = TestingSessionLocal()
+    expired = db.query(UploadSession).filter(UploadSession.id == expired_id).first()
+    storage_upload_id = expired.storage_upload_id
+    expired.created_at = datetime.datetime.utcnow() - datetime.timedelta(hours=48)
+    db.commit()
+
+    assert sweep_expired_sessions(db, ttl_hours=24) == 1
+    assert [s.id for s in db.query(UploadSession).all()] == [active_id]
+    assert not os.path.exists(os.path.join(isolated_uploads, "multipart", storage_upload_id))
+    db.close()
@@ -171,3 +171,446 @@ class TestVideoProcessingSimple:
         # Verificar que es una tarea de Celery
         assert hasattr(process_video_task, 'delay')
         assert hasattr(process_video_task, 'apply_async')
+
+
+class TestSinglePassPipeline:
+    """Pruebas del pipeline de ffmpeg en una sola pasada."""
+
+    def test_single_pass_command_builds_one_filter_graph(self):
+        """Recorte en la entrada, escalado/relleno y concat en un solo comando."""
+        from worker.ffmpeg_pipeline import build_single_pass_command, MediaProbe
+
+        cmd = build_single_pass_command(
+            "/input/video.mp4", "/assets/intro.mp4", "/assets/outro.mp4",
+            "/output/video.mp4", MediaProbe(duration=95.0, has_audio=True),
+        )
+
+        assert cmd[0] == 'ffmpeg'
+        assert cmd[-1] == "/output/video.mp4"
+        # -t 30 aplica a la entrada del original (antes de su -i)
+        source_index = cmd.index("/input/video.mp4")
+        assert cmd[source_index - 3:source_index] == ["-t", "30", "-i"]
+        graph = cmd[cmd.index("-filter_complex") + 1]
+        assert graph.count("scale=1280:720:force_original_aspect_ratio=decrease") == 3
+        assert "pad=1280:720" in graph
+        assert "concat=n=3:v=1:a=1[v][a]" in graph
+        assert "anullsrc" not in ' '.join(cmd)
+
+    def test_single_pass_command_adds_silence_without_audio(self):
+        """Un original sin audio recibe silencio de la duración del recorte."""
+        from worker.ffmpeg_pipeline import build_single_pass_command, MediaProbe
+
+        cmd = build_single_pass_command(
+            "/input/video.mp4", "/assets/intro.mp4", "/assets/outro.mp4",
+            "/output/video.mp4", MediaProbe(duration=12.5, has_audio=False),
+        )
+
+        assert "anullsrc=channel_layout=stereo:sample_rate=48000" in cmd
+        assert cmd[cmd.index("lavfi") + 2] == "12.500"
+        assert "[3:a:0]aresample" in cmd[cmd.index("-filter_complex") + 1]
+
+    @patch('subprocess.run')
+    def test_process_single_pass_runs_one_ffmpeg(self, mock_subprocess):
+        """ffprobe + una sola invocación de ffmpeg."""
+        probe = MagicMock(returncode=0, stdout='{"format": {"duration": "40.0"}, '
+                                                '"streams": [{"codec_type": "video"}, {"codec_type": "audio"}]}')
+        encode = MagicMock(returncode=0)
+        mock_subprocess.side_effect = [probe, encode]
+
+        from worker.ffmpeg_pipeline import process_single_pass
+
+        assert process_single_pass("/input/video.mp4", "/output/video.mp4",
+                                   "/assets/intro.mp4", "/assets/outro.mp4") is True
+        commands = [call[0][0][0] for call in mock_subprocess.call_args_list]
+        assert commands == ["ffprobe", "ffmpeg"]
+
+    @patch('subprocess.run')
+    def test_process_single_pass_failure(self, mock_subprocess):
+        """Fallo de ffmpeg."""
+        mock_subprocess.side_effect = [
+            MagicMock(returncode=0, stdout='{"format": {}, "streams": []}'),
+            MagicMock(returncode=1, stderr="Error message"),
+        ]
+
+        from worker.ffmpeg_pipeline import process_single_pass
+
+        assert process_single_pass("/input/video.mp4", "/output/video.mp4",
+                                   "/assets/intro.mp4", "/assets/outro.mp4") is False
+
+
+def _bumpers(tmp_path):
+    """Cortinillas vacías: la unión solo verifica que existan"""
+    paths = (str(tmp_path / "intro.mp4"), str(tmp_path / "outro.mp4"))
+    for path in paths:
+        open(path, "wb").close()
+    return paths
+
+
+def _ffmpeg_creates_output(cmd, **kwargs):
+    """subprocess.run simulado: ffmpeg crea su salida (último argumento)"""
+    open(cmd[-1], "wb").close()
+    return MagicMock(returncode=0)
+
+
+class TestAssetConcatPipeline:
+    """Pruebas de las cortinillas precodificadas por perfil y la unión por copia."""
+
+    def test_clip_and_concat_commands(self):
+        """El clip se codifica con el perfil; la unión no recodifica."""
+        from worker.ffmpeg_pipeline import (
+            build_clip_command, build_concat_command, encode_args, MediaProbe, DEFAULT_PROFILE,
+        )
+
+        clip = build_clip_command("/input/video.mp4", "/tmp/clip.mp4",
+                                  MediaProbe(duration=95.0, has_audio=True))
+        assert clip[clip.index("/input/video.mp4") - 3:clip.index("/input/video.mp4")] == ["-t", "30", "-i"]
+        assert clip[-len(encode_args(DEFAULT_PROFILE)) - 1:-1] == encode_args(DEFAULT_PROFILE)
+
+        concat = build_concat_command("/tmp/list.txt", "/output/video.mp4")
+        assert concat[concat.index("-c") + 1] == "copy"
+        assert "-filter_complex" not in concat
+
+    def test_profile_key_changes_with_parameters(self):
+        """Un perfil distinto usa otro directorio de cortinillas."""
+        from worker.ffmpeg_pipeline import OutputProfile
+
+        assert OutputProfile().key == OutputProfile().key
+        assert OutputProfile().key != OutputProfile(crf=28).key
+        assert OutputProfile().key.startswith("1280x720_30fps_libx264_aac48000_")
+
+    def test_assets_are_warmed_once_before_forking(self):
+        """La codificación de cortinillas no corre en worker_process_init (alive timeout)."""
+        from celery.signals import worker_init, worker_process_init
+        from worker.tasks import video_processing
+
+        receivers = lambda signal: [r() for _, r in signal.receivers]
+        assert video_processing.warm_intro_outro_assets in receivers(worker_init)
+        assert video_processing.warm_intro_outro_assets not in receivers(worker_process_init)
+
+    @patch('subprocess.run')
+    def test_asset_cache_encodes_once_and_replaces_atomically(self, mock_subprocess, tmp_path):
+        """Se codifica a un temporal y se renombra; si ya existen no se vuelve a codificar."""
+        from worker.assets import AssetCache
+
+        def encode(cmd, **kwargs):
+            with open(cmd[-1], "wb") as f:
+                f.write(b"mp4")
+            return MagicMock(returncode=0)
+
+        mock_subprocess.side_effect = encode
+        cache = AssetCache(str(tmp_path))
+
+        intro_path, outro_path = cache.get()
+        assert os.path.exists(intro_path) and os.path.exists(outro_path)
+        assert mock_subprocess.call_count == 2
+        assert all(".tmp.mp4" in call[0][0][-1] for call in mock_subprocess.call_args_list)
+        assert not [name for name in os.listdir(os.path.dirname(intro_path)) if ".tmp" in name]
+
+        assert cache.get() == (intro_path, outro_path)
+        assert mock_subprocess.call_count == 2
+
+    @patch('subprocess.run')
+    def test_asset_cache_failure_leaves_no_asset(self, mock_subprocess, tmp_path):
+        """Una codificación fallida no deja un archivo que parezca válido."""
+        from worker.assets import AssetCache, AssetError
+
+        mock_subprocess.return_value = MagicMock(returncode=1, stderr="Error message")
+        cache = AssetCache(str(tmp_path))
+
+        with pytest.raises(AssetError):
+            cache.get()
+        assert not cache.is_ready()
+        cache.warm()  # Solo registra el error
+
+    @patch('subprocess.run')
+    def test_process_with_assets_encodes_only_the_clip(self, mock_subprocess, tmp_path):
+        """ffprobe, codificación del clip y unión por copia con las cortinillas."""
+        probe = MagicMock(returncode=0, stdout='{"format": {"duration": "40.0"}, '
+                                                '"streams": [{"codec_type": "video"}, {"codec_type": "audio"}]}')
+        lists = []
+
+        def run(cmd, **kwargs):
+            if cmd[0] == "ffprobe":
+                return probe
+            if "concat" in cmd:
+                with open(cmd[cmd.index("-i") + 1]) as f:
+                    lists.append(f.read())
+            return _ffmpeg_creates_output(cmd)
+
+        mock_subprocess.side_effect = run
+        clip_path = str(tmp_path / "clip.mp4")
+        intro_path, outro_path = _bumpers(tmp_path)
+
+        from worker.ffmpeg_pipeline import process_with_assets
+
+        assert process_with_assets("/input/video.mp4", str(tmp_path / "output.mp4"), clip_path,
+                                   intro_path, outro_path) is True
+        commands = [call[0][0] for call in mock_subprocess.call_args_list]
+        assert [cmd[0] for cmd in commands] == ["ffprobe", "ffmpeg", "ffmpeg"]
+        assert commands[1][-1] == clip_path
+        assert lists == [f"file '{intro_path}'\nfile '{clip_path}'\nfile '{outro_path}'\n"]
+
+    @patch('subprocess.run')
+    def test_process_with_assets_fails_when_a_part_is_missing(self, mock_subprocess, tmp_path):
+        """El demuxer concat no falla si no puede abrir una parte: no se ejecuta la unión."""
+        from worker.ffmpeg_pipeline import process_with_assets, MediaProbe
+
+        mock_subprocess.side_effect = _ffmpeg_creates_output
+        intro_path, outro_path = _bumpers(tmp_path)
+        os.remove(outro_path)
+
+        assert process_with_assets(
+            "/input/video.mp4", str(tmp_path / "output.mp4"), str(tmp_path / "clip.mp4"),
+            intro_path, outro_path, probe=MediaProbe(duration=40.0, has_audio=True),
+        ) is False
+        assert mock_subprocess.call_count == 1
+        assert not os.path.exists(tmp_path / "output.mp4")
+
+
+def _ffprobe_output(duration="95.0", width=1280, height=720, codec="h264", profile="High",
+                    audio_codec="aac", sample_rate="48000", audio_profile="LC",
+                    time_base="1/15360", **video):
+    import json
+    streams = [{
+        "codec_type": "video", "codec_name": codec, "profile": profile, "level": 41,
+        "width": width, "height": height, "pix_fmt": "yuv420p",
+        "avg_frame_rate": "30/1", "r_frame_rate": "30/1", "sample_aspect_ratio": "1:1",
+        "time_base": time_base, **video,
+    }]
+    if audio_codec:
+        streams.append({"codec_type": "audio", "codec_name": audio_codec, "profile": audio_profile,
+                        "sample_rate": sample_rate, "channels": 2})
+    return json.dumps({"format": {"duration": duration, "format_name": "mov,mp4,m4a,3gp,3g2,mj2"},
+                       "streams": streams})
+
+
+class TestPassthrough:
+    """Pruebas de la copia de flujos cuando el original ya cumple el perfil."""
+
+    @pytest.fixture(autouse=True)
+    def passthrough_enabled(self):
+        with patch("worker.ffmpeg_pipeline.settings.video_passthrough", True):
+            yield
+
+    def _probe(self, keyframes=None, **kwargs):
+        import json
+        from worker.ffmpeg_pipeline import MediaProbe
+        return MediaProbe.from_ffprobe(json.loads(_ffprobe_output(**kwargs)), keyframes)
+
+    def test_plan_copies_matching_streams_and_cuts_on_keyframe(self):
+        """720p H.264 + AAC 48 kHz: se copia todo y se corta en el último keyframe <= 30 s."""
+        from worker.ffmpeg_pipeline import plan_streams, build_clip_command
+
+        probe = self._probe(keyframes=[0.0, 8.0, 16.0, 24.0, 28.0, 32.0])
+        plan = plan_streams(probe)
+        assert (plan.video, plan.audio, plan.mode) == ("copy", "copy", "passthrough")
+        assert plan.cut_seconds == 28.0
+
+        cmd = build_clip_command("/input/video.mp4", "/tmp/clip.mp4", probe, plan=plan)
+        assert cmd[cmd.index("-i") - 2:cmd.index("-i")] == ["-t", "28.000"]
+        assert cmd[cmd.index("-c:v") + 1] == "copy"
+        assert cmd[cmd.index("-c:a") + 1] == "copy"
+        assert "-filter_complex" not in cmd
+
+    def test_plan_transcodes_audio_only(self):
+        """Audio 44.1 kHz: el video se copia y solo el audio se recodifica."""
+        from worker.ffmpeg_pipeline import plan_streams, build_clip_command
+
+        probe = self._probe(duration="20.0", sample_rate="44100")
+        plan = plan_streams(probe)
+        assert (plan.video, plan.audio, plan.mode) == ("copy", "transcode", "remux")
+        assert plan.cut_seconds == 20.0
+
+        cmd = build_clip_command("/input/video.mp4", "/tmp/clip.mp4", probe, plan=plan)
+        assert cmd[cmd.index("-c:v") + 1] == "copy"
+        assert cmd[cmd.index("-c:a") + 1] == "aac"
+        assert cmd[cmd.index("-ar") + 1] == "48000"
+
+    def test_plan_transcodes_when_video_differs(self):
+        """Resolución distinta, keyframe lejano o passthrough apagado: se recodifica."""
+        from worker.ffmpeg_pipeline import plan_streams
+
+        def mode(probe):
+            return plan_streams(probe).mode
+
+        assert mode(self._probe(duration="20.0", width=1920, height=1080)) == "transcode"
+        assert mode(self._probe(duration="20.0", profile="Baseline")) == "transcode"
+        # Se perderían 20 s para cortar en un keyframe
+        assert mode(self._probe(keyframes=[0.0, 10.0, 40.0])) == "transcode"
+
+        with patch("worker.ffmpeg_pipeline.settings.video_passthrough", False):
+            assert mode(self._probe(duration="20.0")) == "transcode"
+
+    def test_plan_copies_other_encoder_with_compatible_parameters(self):
+        """Otro codificador (SPS/PPS distinto al de las cortinillas, sin B-frames, timebase de
+        90 kHz) con los mismos parámetros de flujo: se copia."""
+        from worker.ffmpeg_pipeline import plan_streams
+
+        probe = self._probe(
+            duration="20.0", level=40, time_base="1/90000", has_b_frames=0, refs=1,
+            extradata_hash="SHA256:sps-pps-camara", codec_tag_string="avc1",
+        )
+        assert plan_streams(probe).mode == "passthrough"
+
+    def test_plan_transcodes_incompatible_timebase_or_level(self):
+        """Timebase en ms (Matroska/WebM: un cuadro a 30 fps no es un número entero de ticks)
+        o nivel mayor que el del perfil: se recodifica."""
+        from worker.ffmpeg_pipeline import plan_streams
+
+        assert plan_streams(self._probe(duration="20.0", time_base="1/1000")).video == "transcode"
+        assert plan_streams(self._probe(duration="20.0", time_base=None)).video == "transcode"
+        assert plan_streams(self._probe(duration="20.0", level=51)).video == "transcode"
+
+    def test_plan_transcodes_he_aac(self):
+        """HE-AAC no se copia junto al AAC-LC de las cortinillas."""
+        from worker.ffmpeg_pipeline import plan_streams
+
+        he_aac = self._probe(duration="20.0", audio_profile="HE-AAC")
+        assert plan_streams(he_aac).audio == "transcode"
+
+    @patch('subprocess.run')
+    def test_probe_cache_runs_ffprobe_once_per_video(self, mock_subprocess, tmp_path):
+        """El resultado (incluidos los keyframes) se guarda por video hasta descartarlo."""
+        from worker.ffmpeg_pipeline import ProbeCache
+
+        packets = ('{"packets": [{"pts_time": "0.000", "flags": "K__"}, '
+                   '{"pts_time": "0.033", "flags": "___"}, {"pts_time": "28.000", "flags": "K__"}]}')
+        mock_subprocess.side_effect = [
+            MagicMock(returncode=0, stdout=_ffprobe_output()),
+            MagicMock(returncode=0, stdout=packets),
+        ]
+        cache = ProbeCache(str(tmp_path / "probes"))
+
+        probe = cache.get("video-1", "/input/video.mp4")
+        assert probe.keyframes == [0.0, 28.0]
+        assert cache.get("video-1", "/input/video.mp4") == probe
+        assert mock_subprocess.call_count == 2
+
+        cache.discard("video-1")
+        assert not os.listdir(tmp_path / "probes")
+
+    @patch('worker.ffmpeg_pipeline.children_cpu_seconds')
+    @patch('subprocess.run')
+    def test_process_with_assets_records_passthrough(self, mock_subprocess, mock_cpu, tmp_path):
+        """El clip copiado suma al modo passthrough y a la CPU ahorrada."""
+        from prometheus_client import REGISTRY
+        from worker.ffmpeg_pipeline import process_with_assets
+
+        def sample(name, labels=None):
+            return REGISTRY.get_sample_value(name, labels) or 0.0
+
+        mock_subprocess.side_effect = _ffmpeg_creates_output
+        mock_cpu.side_effect = [10.0, 10.5]
+        passthrough = sample("worker_video_clip_modes_total", {"mode": "passthrough"})
+        saved = sample("worker_transcode_cpu_seconds_saved_total")
+
+        assert process_with_assets(
+            "/input/video.mp4", str(tmp_path / "output.mp4"), str(tmp_path / "clip.mp4"),
+            *_bumpers(tmp_path), probe=self._probe(duration="20.0"),
+        ) is True
+        # Sin ffprobe: el análisis llega de la caché
+        assert [call[0][0][0] for call in mock_subprocess.call_args_list] == ["ffmpeg", "ffmpeg"]
+        assert sample("worker_video_clip_modes_total", {"mode": "passthrough"}) == passthrough + 1
+        assert sample("worker_transcode_cpu_seconds_saved_total") > saved
+
+
+class TestRemoteSource:
+    """Pruebas de la lectura del original por HTTP sin descarga completa."""
+
+    def test_remote_source_gets_http_options(self):
+        """Con URL se agregan opciones de reconexión antes de la entrada."""
+        from worker.ffmpeg_pipeline import build_clip_command, MediaProbe
+
+        url = "https://bucket.s3.amazonaws.com/videos/a/a.mp4?X-Amz-Signature=secret"
+        cmd = build_clip_command(url, "/tmp/clip.mp4", MediaProbe(duration=95.0, has_audio=True))
+        source_index = cmd.index(url)
+        assert cmd[source_index - 3:source_index] == ["-t", "30", "-i"]
+        assert cmd[cmd.index("-reconnect") + 1] == "1"
+        assert cmd.index("-multiple_requests") < source_index
+
+        local = build_clip_command("/input/video.mp4", "/tmp/clip.mp4",
+                                   MediaProbe(duration=95.0, has_audio=True))
+        assert "-reconnect" not in local
+
+    @patch('subprocess.run')
+    def test_probe_error_does_not_log_signature(self, mock_subprocess):
+        """La firma de la URL no llega a los mensajes de error."""
+        from worker.ffmpeg_pipeline import probe_media
+
+        url = "https://bucket.s3.amazonaws.com/videos/a/a.mp4?X-Amz-Signature=secret"
+        mock_subprocess.return_value = MagicMock(returncode=1, stderr=f"{url}: Server returned 403 Forbidden")
+
+        with pytest.raises(RuntimeError) as error:
+            probe_media(url)
+        assert "secret" not in str(error.value)
+        assert "https://bucket.s3.amazonaws.com/videos/a/a.mp4" in str(error.value)
+        assert "-reconnect" in mock_subprocess.call_args[0][0]
+
+
+class TestStreamedOutput:
+    """Pruebas de la salida por stdout entregada al almacenamiento mientras se produce."""
+
+    class Sink:
+        def __init__(self, fail_after=None):
+            self.chunks = []
+            self.fail_after = fail_after
+
+        def write(self, data):
+            if self.fail_after is not None and len(self.chunks) >= self.fail_after:
+                raise IOError("S3 no disponible")
+            self.chunks.append(data)
+
+    def test_pipe_output_is_fragmented_mp4(self):
+        """Por stdout no hay faststart: el moov va vacío al inicio y se fragmenta."""
+        from worker.ffmpeg_pipeline import build_concat_command, PIPE_OUTPUT
+
+        cmd = build_concat_command("/tmp/list.txt", PIPE_OUTPUT)
+        assert cmd[-1] == "pipe:1"
+        assert cmd[cmd.index("-movflags") + 1] == "+frag_keyframe+empty_moov+default_base_moof"
+        assert cmd[cmd.index("-f", cmd.index("-movflags")) + 1] == "mp4"
+        assert "+faststart" in build_concat_command("/tmp/list.txt", "/output/video.mp4")
+
+    def test_stream_ffmpeg_delivers_chunks(self):
+        """Cada bloque de stdout llega al destino; el código de salida decide el resultado."""
+        from worker.ffmpeg_pipeline import stream_ffmpeg
+
+        writer = ("import sys\n"
+                  "for _ in range(5):\n"
+                  "    sys.stdout.buffer.write(b'x' * 300000); sys.stdout.buffer.flush()\n")
+        sink = self.Sink()
+        assert stream_ffmpeg([sys.executable, "-c", writer], sink, chunk_size=65536) is True
+        assert b"".join(sink.chunks) == b"x" * 1500000
+        assert max(len(chunk) for chunk in sink.chunks) <= 65536
+
+        failing = "import sys; sys.stdout.buffer.write(b'partial'); sys.stderr.write('boom'); sys.exit(1)"
+        assert stream_ffmpeg([sys.executable, "-c", failing], self.Sink()) is False
+
+    def test_stream_ffmpeg_stops_encoder_when_sink_fails(self):
+        """Si la subida falla se termina el proceso y se propaga el error."""
+        from worker.ffmpeg_pipeline import stream_ffmpeg
+
+        endless = ("import sys\n"
+                   "while True:\n"
+                   "    sys.stdout.buffer.write(b'x' * 65536); sys.stdout.buffer.flush()\n")
+        with pytest.raises(IOError):
+            stream_ffmpeg([sys.executable, "-c", endless], self.Sink(fail_after=2), chunk_size=65536)
+
+    @patch('worker.ffmpeg_pipeline.stream_ffmpeg')
+    @patch('subprocess.run')
+    def test_process_with_assets_streams_the_join(self, mock_subprocess, mock_stream, tmp_path):
+        """El clip se prepara en disco y la unión se entrega al destino por stdout."""
+        from worker.ffmpeg_pipeline import process_with_assets, MediaProbe
+
+        mock_subprocess.side_effect = _ffmpeg_creates_output
+        mock_stream.return_value = True
+        sink = self.Sink()
+
+        assert process_with_assets(
+            "/input/video.mp4", "/output/video.mp4", str(tmp_path / "clip.mp4"),
+            *_bumpers(tmp_path),
+            probe=MediaProbe(duration=40.0, has_audio=True), sink=sink,
+        ) is True
+        cmd, streamed_sink = mock_stream.call_args[0]
+        assert cmd[-1] == "pipe:1" and "concat" in cmd
+        assert streamed_sink is sink
+        assert mock_subprocess.call_count == 1
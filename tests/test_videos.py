@@ -3,9 +3,11 @@ from fastapi import Depends
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 import datetime
 import uuid
 import io
+import hashlib
 from unittest.mock import patch, MagicMock
 
 from app.main import app
@@ -13,7 +15,9 @@ from shared.db.config import Base, get_db
 from shared.db.models.user import User
 from shared.db.models.video import Video, VideoStatus
 from shared.db.models.vote import Vote
+from shared.db.models.outbox import OutboxMessage, OutboxStatus
 from app.core.security import get_password_hash
+from tests.mp4_samples import build_mp4
 
 # Configuración de base de datos de prueba (usando SQLite en memoria para simplicidad)
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -53,6 +57,7 @@ def test_data():
 
     db = TestingSessionLocal()
     db.query(Vote).delete()
+    db.query(OutboxMessage).delete()
     db.query(Video).delete()
     db.query(User).delete()
 
@@ -251,26 +256,147 @@ def test_upload_video_success(test_data):
     token = response_auth_json['access_token']
     
     # Crear archivo de prueba
-    test_video_content = b"fake video content" * 1000  # Simular contenido de video
+    test_video_content = build_mp4()  # MP4 mínimo válido
     test_file = io.BytesIO(test_video_content)
     
-    with patch('app.api.videos_api.Celery') as mock_celery:
-        mock_task = MagicMock()
-        mock_task.id = "test-task-id"
-        mock_celery.return_value.send_task.return_value = mock_task
-        
+    response = client.post(
+        "/api/videos/upload",
+        headers={'Authorization': f"Bearer {token}"},
+        data={'title': 'Video de prueba'},
+        files={'video_file': ('test_video.mp4', test_file, 'video/mp4')}
+    )
+
+    assert response.status_code == 201
+    response_json = response.json()
+    assert 'message' in response_json
+    assert 'task_id' in response_json
+    assert response_json['message'] == "Video subido correctamente. Procesamiento en curso."
+
+    # El mensaje para el broker queda en el outbox, en la misma transacción del video
+    db = TestingSessionLocal()
+    message = db.query(OutboxMessage).filter(OutboxMessage.id == response_json['task_id']).first()
+    assert message is not None
+    assert message.status == OutboxStatus.PENDING.value
+
+    video = db.query(Video).filter(Video.id == message.id_video).first()
+    assert video.celery_task_id == response_json['task_id']
+    assert video.status == VideoStatus.UPLOADED.value
+    db.close()
+
+
+def test_upload_video_stores_streamed_size(test_data):
+    """La subida por bloques guarda el tamaño real del archivo."""
+
+    response_auth = client.post('/api/auth/login',
+                                json={'email': test_data['users'][0]['email'],
+                                      'password': test_data['users'][0]['password']})
+
+    assert response_auth.status_code == 200
+    token = response_auth.json()['access_token']
+
+    test_video_content = build_mp4(mdat_payload=b"0123456789" * (300 * 1024))  # ~3MB, varios bloques
+
+    with patch('app.api.videos_api.settings.environment', 'testing'):
         response = client.post(
             "/api/videos/upload",
             headers={'Authorization': f"Bearer {token}"},
-            data={'title': 'Video de prueba'},
-            files={'video_file': ('test_video.mp4', test_file, 'video/mp4')}
+            data={'title': 'Video por bloques'},
+            files={'video_file': ('test_video.mp4', io.BytesIO(test_video_content), 'video/mp4')}
         )
-        
-        assert response.status_code == 201
-        response_json = response.json()
-        assert 'message' in response_json
-        assert 'task_id' in response_json
-        assert response_json['message'] == "Video subido correctamente. Procesamiento en curso."
+
+    assert response.status_code == 202
+
+    db = TestingSessionLocal()
+    video = db.query(Video).filter(Video.title == 'Video por bloques').first()
+    assert video is not None
+    assert video.file_size_bytes == len(test_video_content)
+    db.close()
+
+
+def test_upload_video_reuses_processed_duplicate(test_data):
+    """Un archivo idéntico a un video ya procesado no se encola de nuevo."""
+
+    response_auth = client.post('/api/auth/login',
+                                json={'email': test_data['users'][0]['email'],
+                                      'password': test_data['users'][0]['password']})
+
+    assert response_auth.status_code == 200
+    token = response_auth.json()['access_token']
+
+    test_video_content = build_mp4(mdat_payload=b"video duplicado" * 1000)
+
+    db = TestingSessionLocal()
+    processed = db.query(Video).filter(Video.id == test_data['id_videos'][1]).first()
+    processed.content_sha256 = hashlib.sha256(test_video_content).hexdigest()
+    processed.file_processed_url = "file://ruta/procesado.mp4"
+    db.commit()
+
+    response = client.post(
+        "/api/videos/upload",
+        headers={'Authorization': f"Bearer {token}"},
+        data={'title': 'Video repetido'},
+        files={'video_file': ('test_video.mp4', io.BytesIO(test_video_content), 'video/mp4')}
+    )
+
+    assert response.status_code == 201
+    assert response.json()['task_id'] is None
+
+    video = db.query(Video).filter(Video.title == 'Video repetido').first()
+    assert video.status == VideoStatus.PROCESSED.value
+    assert video.file_processed_url == "file://ruta/procesado.mp4"
+    assert db.query(OutboxMessage).filter(OutboxMessage.id_video == video.id).count() == 0
+    db.close()
+
+
+def test_upload_video_fills_metadata_from_headers(test_data):
+    """Duración y resolución original se leen de las cabeceras del MP4."""
+
+    response_auth = client.post('/api/auth/login',
+                                json={'email': test_data['users'][0]['email'],
+                                      'password': test_data['users'][0]['password']})
+
+    assert response_auth.status_code == 200
+    token = response_auth.json()['access_token']
+
+    response = client.post(
+        "/api/videos/upload",
+        headers={'Authorization': f"Bearer {token}"},
+        data={'title': 'Video con metadatos'},
+        files={'video_file': ('test_video.mp4', io.BytesIO(build_mp4(640, 360, 75)), 'video/mp4')}
+    )
+
+    assert response.status_code == 201
+
+    db = TestingSessionLocal()
+    video = db.query(Video).filter(Video.title == 'Video con metadatos').first()
+    assert video.original_duration_seconds == 75
+    assert video.original_resolution == "640x360"
+    db.close()
+
+
+def test_upload_video_not_decodable(test_data):
+    """Un archivo .mp4 que no es un video se rechaza antes de encolarlo."""
+
+    response_auth = client.post('/api/auth/login',
+                                json={'email': test_data['users'][0]['email'],
+                                      'password': test_data['users'][0]['password']})
+
+    assert response_auth.status_code == 200
+    token = response_auth.json()['access_token']
+
+    response = client.post(
+        "/api/videos/upload",
+        headers={'Authorization': f"Bearer {token}"},
+        data={'title': 'Video corrupto'},
+        files={'video_file': ('test_video.mp4', io.BytesIO(b"fake video content" * 1000), 'video/mp4')}
+    )
+
+    assert response.status_code == 400
+    assert response.json()['message'] == "El archivo no es un video MP4 válido"
+
+    db = TestingSessionLocal()
+    assert db.query(Video).filter(Video.title == 'Video corrupto').count() == 0
+    db.close()
 
 
 def test_upload_video_invalid_format(test_data):
@@ -462,3 +588,196 @@ def test_upload_video_empty_title(test_data):
     )
     
     assert response.status_code == 422  # Unprocessable Entity por título vacío
+
+
+def test_get_videos_conditional_get(test_data):
+    """Prueba de 304 con If-None-Match y nuevo ETag tras un cambio de estado."""
+
+    response_auth = client.post('/api/auth/login',
+                                json={'email': test_data['users'][0]['email'],
+                                      'password': test_data['users'][0]['password']})
+    headers = {'Authorization': f"Bearer {response_auth.json()['access_token']}"}
+
+    response = client.get("/api/videos/", headers=headers)
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "private, no-cache"
+
+    not_modified = client.get("/api/videos/", headers={**headers, "If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["ETag"] == etag
+
+    db = TestingSessionLocal()
+    db.query(Video).filter(Video.id == test_data['id_videos'][0]).update(
+        {"status": VideoStatus.FAILED.value}
+    )
+    db.commit()
+    db.close()
+
+    changed = client.get("/api/videos/", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()[0]["status"] == VideoStatus.FAILED.value
+
+
+def test_get_video_specific_conditional_get(test_data):
+    """Prueba de 304 en el detalle de un video."""
+
+    response_auth = client.post('/api/auth/login',
+                                json={'email': test_data['users'][0]['email'],
+                                      'password': test_data['users'][0]['password']})
+    headers = {'Authorization': f"Bearer {response_auth.json()['access_token']}"}
+    url = f"/api/videos/{test_data['id_videos'][0]}"
+
+    etag = client.get(url, headers=headers).headers["ETag"]
+    assert client.get(url, headers={**headers, "If-None-Match": etag}).status_code == 304
+    assert client.get(url, headers={**headers, "If-None-Match": '"otro"'}).status_code == 200
+
+    db = TestingSessionLocal()
+    db.query(Video).filter(Video.id == test_data['id_videos'][0]).update({"title": "Otro título"})
+    db.commit()
+    db.close()
+
+    changed = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["title"] == "Otro título"
+
+
+def test_get_videos_single_query_status_filter_and_pagination(test_data):
+    """Prueba de listado paginado por (status, uploaded_at) con filtro de estado."""
+
+    response_auth = client.post('/api/auth/login',
+                                json={'email': test_data['users'][0]['email'],
+                                      'password': test_data['users'][0]['password']})
+    headers = {'Authorization': f"Bearer {response_auth.json()['access_token']}"}
+
+    db = TestingSessionLocal()
+    owner = db.query(Video).filter(Video.id == test_data['id_videos'][0]).first().id_user
+    base = datetime.datetime(2025, 1, 1)
+    processed_ids = []
+    for i in range(3):
+        video = Video(id=str(uuid.uuid4()), title=f"Procesado {i}",
+                      status=VideoStatus.PROCESSED.value, id_user=owner,
+                      uploaded_at=base + datetime.timedelta(minutes=i),
+                      processed_at=base + datetime.timedelta(minutes=i + 1),
+                      file_original_url="file://ruta/video.mp4",
+                      file_processed_url=f"file://ruta/procesado_{i}.mp4")
+        db.add(video)
+        processed_ids.append(video.id)
+    db.commit()
+    db.close()
+
+    # A nivel de clase Engine: get_db puede estar sobrescrito por otro módulo de pruebas
+    def video_queries(*args, **kwargs):
+        queries = []
+        listener = lambda *event_args: queries.append(event_args[2])
+        event.listen(Engine, "before_cursor_execute", listener)
+        try:
+            response = client.get(*args, **kwargs)
+        finally:
+            event.remove(Engine, "before_cursor_execute", listener)
+        return response, [q for q in queries if "FROM videos" in q]
+
+    first, queries = video_queries("/api/videos/", params={"limit": 2}, headers=headers)
+    # El agregado del ETag y la página; el usuario viene de la caché de tokens
+    assert len(queries) == 2
+
+    assert first.status_code == 200
+    # processed antes que uploaded; dentro del estado, el más reciente primero
+    assert [v["video_id"] for v in first.json()] == processed_ids[::-1][:2]
+    assert first.json()[0]["processed_url"] == "file://ruta/procesado_2.mp4"
+
+    second = client.get("/api/videos/", params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]},
+                        headers=headers)
+    assert [v["video_id"] for v in second.json()] == [processed_ids[0], test_data['id_videos'][0]]
+    assert "X-Next-Cursor" not in second.headers
+    assert "processed_url" not in second.json()[1]
+
+    # El ETag identifica la página: otra página u otro filtro no responden 304
+    assert second.headers["ETag"] != first.headers["ETag"]
+    other_page = client.get("/api/videos/",
+                            params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]},
+                            headers={**headers, "If-None-Match": first.headers["ETag"]})
+    assert other_page.status_code == 200
+    same_page, queries = video_queries("/api/videos/", params={"limit": 2},
+                                       headers={**headers, "If-None-Match": first.headers["ETag"]})
+    assert same_page.status_code == 304
+    # El 304 solo consulta el agregado: la página no se consulta ni se serializa
+    assert len(queries) == 1 and "LIMIT" not in queries[0]
+
+    uploaded = client.get("/api/videos/", params={"status": "uploaded"}, headers=headers)
+    assert [v["video_id"] for v in uploaded.json()] == [test_data['id_videos'][0]]
+    assert client.get("/api/videos/", params={"status": "otro"}, headers=headers).status_code == 422
+
+
+def test_upgrade_schema_adds_missing_columns_and_indexes(tmp_path):
+    """Una base creada antes de content_sha256 y de los índices nuevos se completa sin perder filas."""
+    from sqlalchemy import inspect, text
+    from shared.db.schema import upgrade_schema
+
+    old_engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(bind=old_engine)
+    with old_engine.begin() as conn:
+        for index in ("ix_videos_content_sha256", "ix_videos_public_processed_at",
+                      "ix_videos_user_status_uploaded", "ix_votes_voted_at"):
+            conn.execute(text(f"DROP INDEX {index}"))
+        conn.execute(text("ALTER TABLE videos DROP COLUMN content_sha256"))
+        conn.execute(text("INSERT INTO users (id, first_name, last_name, email, password_hash) "
+                          "VALUES ('u1', 'Ana', 'Gómez', 'ana@example.com', 'x')"))
+        conn.execute(text("INSERT INTO videos (id, title, status, id_user, file_original_url, "
+                          "uploaded_at, votes) VALUES ('v1', 'Video', 'processed', 'u1', "
+                          "'file://v1.mp4', '2024-01-01 00:00:00', 0)"))
+
+    assert upgrade_schema(old_engine) == [
+        "videos.content_sha256", "ix_videos_content_sha256", "ix_videos_public_processed_at",
+        "ix_videos_user_status_uploaded", "ix_votes_voted_at",
+    ]
+    # Idempotente: una segunda ejecución no cambia nada
+    assert upgrade_schema(old_engine) == []
+
+    inspector = inspect(old_engine)
+    assert "content_sha256" in {c["name"] for c in inspector.get_columns("videos")}
+    session = sessionmaker(bind=old_engine)()
+    try:
+        assert session.query(Video).one().content_sha256 is None
+    finally:
+        session.close()
+    old_engine.dispose()
+
+
+def test_get_videos_lists_processed_first_and_failed_last(test_data):
+    """Procesados primero (como antes), luego en curso, subidos y al final los fallidos."""
+    response_auth = client.post('/api/auth/login',
+                                json={'email': test_data['users'][0]['email'],
+                                      'password': test_data['users'][0]['password']})
+    headers = {'Authorization': f"Bearer {response_auth.json()['access_token']}"}
+
+    db = TestingSessionLocal()
+    owner = db.query(Video).filter(Video.id == test_data['id_videos'][0]).first().id_user
+    db.query(Video).filter(Video.id_user == owner).delete()
+    base = datetime.datetime(2025, 1, 1)
+    # Orden alfabético del estado: failed, processed, processing, uploaded
+    ids = {}
+    for i, video_status in enumerate([VideoStatus.FAILED, VideoStatus.UPLOADED,
+                                      VideoStatus.PROCESSING, VideoStatus.PROCESSED]):
+        video = Video(id=str(uuid.uuid4()), title=video_status.value, status=video_status.value,
+                      id_user=owner, uploaded_at=base + datetime.timedelta(minutes=i),
+                      file_original_url="file://ruta/video.mp4")
+        db.add(video)
+        ids[video_status] = video.id
+    db.commit()
+    db.close()
+
+    expected = [ids[VideoStatus.PROCESSED], ids[VideoStatus.PROCESSING],
+                ids[VideoStatus.UPLOADED], ids[VideoStatus.FAILED]]
+    assert [v["video_id"] for v in client.get("/api/videos/", headers=headers).json()] == expected
+
+    # El mismo orden página a página
+    seen, cursor = [], None
+    while True:
+        page = client.get("/api/videos/", params={"limit": 1, "cursor": cursor}, headers=headers)
+        seen += [v["video_id"] for v in page.json()]
+        cursor = page.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert seen == expected